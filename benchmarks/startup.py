@@ -0,0 +1,112 @@
+"""
+Startup time budget of the gbopyrator CLI
+
+Runs each startup path several times in a fresh interpreter and fails if
+the best run, minus the bare interpreter startup, exceeds its budget.
+
+    python benchmarks/startup.py
+"""
+import os
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Budgets in seconds, on top of the bare interpreter startup
+STARTUP_BUDGETS = {
+    "help": 0.05,
+    "info": 0.15,
+}
+
+STARTUP_COMMANDS = {
+    "help": ["-m", "gbopyrator", "--help"],
+    # Everything the info path loads before talking to the device
+    "info": [
+        "-c",
+        "from gbopyrator.cartridge_utils import CartridgeReader;"
+        "from gbopyrator import load_roms_db;"
+        "CartridgeReader(quiet=True);"
+        "'TE51B49' in load_roms_db()",
+    ],
+}
+
+# Modules that must not be imported on the `--help` path
+HELP_FORBIDDEN_MODULES = ["usb", "rich", "crccheck", "pkg_resources"]
+
+
+def best_run_time(args, repeat=5):
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable] + args,
+            env=env,
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def imported_modules(args):
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime"] + args,
+        env=env,
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    ).stderr
+    return {
+        line.rsplit("|", 1)[-1].strip()
+        for line in output.splitlines()
+        if line.startswith("import time:")
+    }
+
+
+def check_startup_budgets():
+    """
+    Measure every startup path against its budget
+
+    Returns
+    -------
+    dict, timings in seconds and whether each budget is met
+    """
+    interpreter = best_run_time(["-c", "pass"])
+    results = {}
+    for name, args in STARTUP_COMMANDS.items():
+        elapsed = best_run_time(args) - interpreter
+        results[name] = {
+            "seconds": elapsed,
+            "budget": STARTUP_BUDGETS[name],
+            "ok": elapsed <= STARTUP_BUDGETS[name],
+        }
+
+    modules = imported_modules(STARTUP_COMMANDS["help"])
+    forbidden = sorted(
+        module
+        for module in modules
+        if module.split(".")[0] in HELP_FORBIDDEN_MODULES
+    )
+    results["help"]["forbidden_imports"] = forbidden
+    results["help"]["ok"] = results["help"]["ok"] and not forbidden
+    return results
+
+
+if __name__ == "__main__":
+    results = check_startup_budgets()
+    for name, result in results.items():
+        print(
+            "{:<6} {:>7.1f} ms (budget {:.0f} ms) {}".format(
+                name,
+                result["seconds"] * 1000,
+                result["budget"] * 1000,
+                "ok" if result["ok"] else "OVER BUDGET",
+            )
+        )
+        if result.get("forbidden_imports"):
+            print("       imports " + ", ".join(result["forbidden_imports"]))
+    sys.exit(0 if all(result["ok"] for result in results.values()) else 1)
@@ -0,0 +1,268 @@
+"""
+Benchmarks of the gbopyrator hot paths
+
+Transfers run against `gbopyrator.simulator.SimulatedOperator`, so no
+hardware is needed. Results are written as JSON and compared against a
+stored baseline; any regression larger than the tolerance fails the run.
+
+    python benchmarks/transfer.py                    # compare to baseline.json
+    python benchmarks/transfer.py --update-baseline  # store a new baseline
+    python benchmarks/transfer.py --latency 0.0001 --output results.json
+"""
+
+import argparse
+import atexit
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from gbopyrator import coms_utils as cu  # noqa: E402
+from gbopyrator import load_dat_index, load_roms_db  # noqa: E402
+from gbopyrator.analysis import analyze_rom  # noqa: E402
+from gbopyrator.cartridge_utils import create_crc_db, file_crc32  # noqa: E402
+from gbopyrator.simulator import SimulatedOperator, VirtualCartridge  # noqa: E402
+
+BASELINE_FILENAME = os.path.join(os.path.dirname(__file__), "baseline.json")
+GB_DAT_FILENAME = os.path.join(REPO_ROOT, "game_data", "originals", "gb_db.dat")
+
+# Relative slowdown (or memory increase) tolerated before failing
+DEFAULT_TOLERANCE = 0.25
+
+
+def _cartridge():
+    # 2 MiB MBC5 ROM with 128 KiB of RAM
+    return VirtualCartridge.generate(
+        title="BENCHMARK", mbc_type=0x1B, rom_type=0x06, ram_type=0x04
+    )
+
+
+def bench_read_rom(latency, bandwidth):
+    cartridge = _cartridge()
+    device = SimulatedOperator(cartridge, latency=latency, bandwidth=bandwidth)
+    num_bytes = len(cartridge.rom)
+    return lambda: cu.read_rom(device, num_bytes, quiet=True), num_bytes
+
+
+def bench_read_save(latency, bandwidth):
+    cartridge = _cartridge()
+    device = SimulatedOperator(cartridge, latency=latency, bandwidth=bandwidth)
+    num_bytes = len(cartridge.save)
+    return lambda: cu.read_save(device, num_bytes, quiet=True), num_bytes
+
+
+def bench_write_save(latency, bandwidth):
+    cartridge = _cartridge()
+    device = SimulatedOperator(cartridge, latency=latency, bandwidth=bandwidth)
+    data = bytes(cartridge.save)
+    return lambda: cu.write_save(device, data, quiet=True), len(data)
+
+
+def bench_trigger_framing(latency, bandwidth):
+    def run():
+        for size in range(0x8000, 0x8000 + 1000):
+            cu._craft_rom_read_trigger(size)
+            cu._craft_save_read_trigger(size)
+            cu._craft_save_write_trigger(size)
+
+    return run, None
+
+
+def bench_read_cartridge_info(latency, bandwidth):
+    device = SimulatedOperator(_cartridge(), latency=latency, bandwidth=bandwidth)
+
+    def run():
+        for _ in range(100):
+            cu.read_cartridge_info(device)
+
+    return run, None
+
+
+def bench_load_roms_db(latency, bandwidth):
+    def run():
+        roms_db = load_roms_db()
+        _ = "TE51B49" in roms_db and roms_db["TE51B49"]
+
+    return run, None
+
+
+def bench_load_dat_index(latency, bandwidth):
+    def run():
+        dat_index = load_dat_index()
+        _ = dat_index.lookup("9a024415")
+
+    return run, None
+
+
+def bench_create_crc_db(latency, bandwidth):
+    return lambda: create_crc_db(GB_DAT_FILENAME), None
+
+
+def bench_analyze_rom(latency, bandwidth):
+    # 8 MiB MBC5 ROM, the largest GB/GBC ROM size
+    rom = VirtualCartridge.generate(mbc_type=0x1B, rom_type=0x08).rom
+    return lambda: analyze_rom(rom), len(rom)
+
+
+def bench_file_crc32(latency, bandwidth):
+    num_bytes = 8 * 1024 * 1024
+    file = tempfile.NamedTemporaryFile(suffix=".gb", delete=False)
+    with file:
+        file.write(os.urandom(num_bytes))
+    atexit.register(os.remove, file.name)
+    return lambda: file_crc32(file.name), num_bytes
+
+
+BENCHMARKS = {
+    "read_bulk_in[read_rom 2 MiB]": bench_read_rom,
+    "read_bulk_in[read_save 128 KiB]": bench_read_save,
+    "write_bulk_out[write_save 128 KiB]": bench_write_save,
+    "craft_trigger+add_crc32[x3000]": bench_trigger_framing,
+    "read_cartridge_info[x100]": bench_read_cartridge_info,
+    "load_roms_db+lookup": bench_load_roms_db,
+    "load_dat_index+lookup": bench_load_dat_index,
+    "create_crc_db[gb_db.dat]": bench_create_crc_db,
+    "file_crc32[8 MiB]": bench_file_crc32,
+    "analyze_rom[8 MiB]": bench_analyze_rom,
+}
+
+
+def run_benchmark(setup, latency, bandwidth, repeat):
+    run, num_bytes = setup(latency, bandwidth)
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    run()
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {"seconds": best, "peak_memory": peak_memory}
+    if num_bytes is not None:
+        result["bytes"] = num_bytes
+        result["mb_per_s"] = num_bytes / best / 1e6
+        result["us_per_packet"] = best / (num_bytes / cu.USB_PACKET_SIZE) * 1e6
+    return result
+
+
+def run_benchmarks(latency=0.0, bandwidth=None, repeat=5, names=None):
+    """
+    Run the benchmarks
+
+    Parameters
+    ----------
+    latency : float, optional. Seconds per simulated USB transfer
+    bandwidth : float, optional. Simulated USB bandwidth in bytes per second
+    repeat : int, optional. The best time of `repeat` runs is kept
+    names : list of str, optional. Subset of `BENCHMARKS` to run
+
+    Returns
+    -------
+    dict
+    """
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        results[name] = run_benchmark(setup, latency, bandwidth, repeat)
+    return {
+        "parameters": {"latency": latency, "bandwidth": bandwidth},
+        "python": sys.version.split()[0],
+        "results": results,
+    }
+
+
+def compare_to_baseline(report, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    List the benchmarks slower or heavier than the baseline
+
+    Returns
+    -------
+    list of str
+    """
+    if report["parameters"] != baseline["parameters"]:
+        raise ValueError(
+            "Baseline was recorded with other parameters: {}".format(
+                baseline["parameters"]
+            )
+        )
+    regressions = []
+    for name, result in report["results"].items():
+        if name not in baseline["results"]:
+            continue
+        reference = baseline["results"][name]
+        for metric in ("seconds", "peak_memory"):
+            if result[metric] > reference[metric] * (1 + tolerance):
+                regressions.append(
+                    "{}: {} {:.6g} -> {:.6g} (+{:.0%})".format(
+                        name,
+                        metric,
+                        reference[metric],
+                        result[metric],
+                        result[metric] / reference[metric] - 1,
+                    )
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--bandwidth", type=float, default=None)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--output", type=str, default=None, help="Write results to file"
+    )
+    parser.add_argument("--baseline", type=str, default=BASELINE_FILENAME)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--update-baseline", action="store_true", default=False)
+    parser.add_argument("names", nargs="*", help="Benchmarks to run, all by default")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.latency, args.bandwidth, args.repeat, args.names)
+    for name, result in report["results"].items():
+        line = "{:<36} {:>10.3f} ms {:>9.1f} KiB".format(
+            name, result["seconds"] * 1000, result["peak_memory"] / 1024
+        )
+        if "mb_per_s" in result:
+            line += " {:>8.2f} MB/s {:>7.2f} us/packet".format(
+                result["mb_per_s"], result["us_per_packet"]
+            )
+        print(line)
+
+    if args.output is not None:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=4)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(report, file, indent=4)
+        print("Baseline written to " + args.baseline)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline found, run with --update-baseline to create one")
+        return 0
+    with open(args.baseline, "r") as file:
+        baseline = json.load(file)
+    regressions = compare_to_baseline(report, baseline, args.tolerance)
+    if regressions:
+        print("\nREGRESSIONS (tolerance {:.0%}):".format(args.tolerance))
+        for regression in regressions:
+            print("  " + regression)
+        return 1
+    print("\nNo regression against " + args.baseline)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,6 @@
 import re
 import json
+from gbopyrator.roms_db import build_roms_db_index
 
 ROM_INFO_SPLIT = "------------------- ROM INFO -------------------"
 
@@ -73,6 +74,7 @@ def clean_roms_db(roms_db):
 
 
 if __name__ == "__main__":
+    # Run from game_data/, with gbopyrator installed (pip install -e ..)
     with open("./originals/gb_gbc_roms_info.txt", "r") as file:
         data = file.read()
     # skip the first line
@@ -86,3 +88,6 @@ if __name__ == "__main__":
     # dump the db as json file
     with open("../gbopyrator/gb_gbc_roms_info.json", "w") as file:
         json.dump(roms_db, file, indent=4)
+
+    # build the indexed db used by `load_roms_db`
+    build_roms_db_index(roms_db, "../gbopyrator/gb_gbc_roms_info.sqlite")
@@ -1,10 +1,45 @@
-from .cartridge_utils import CartridgeReader
-from pkg_resources import resource_filename
-import json
+import os
 
 __version__ = "0.5"
 
-def load_roms_db(filename=resource_filename(__name__, "gb_gbc_roms_info.json")):
-    with open(filename, "r") as file:
-        roms_db = json.load(file)
-    return roms_db
+ROMS_DB_FILENAME = os.path.join(os.path.dirname(__file__), "gb_gbc_roms_info.sqlite")
+# CRC32 index of the No-Intro DATs, see `dat_index`
+DAT_INDEX_FILENAME = os.path.join(os.path.dirname(__file__), "no_intro_crc.sqlite")
+
+# Heavy modules (rich, pyusb) are only imported when these are first used
+_LAZY_ATTRIBUTES = {
+    "AsyncCartridgeReader": ".async_reader",
+    "CartridgeReader": ".cartridge_utils",
+    "DatIndex": ".dat_index",
+    "DevicePool": ".device_pool",
+    "RomsDatabase": ".roms_db",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        import importlib
+
+        module = importlib.import_module(_LAZY_ATTRIBUTES[name], __name__)
+        return getattr(module, name)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+def load_roms_db(filename=ROMS_DB_FILENAME):
+    # The JSON database is still supported, but is loaded fully in memory
+    if filename.endswith(".json"):
+        import json
+
+        with open(filename, "r") as file:
+            roms_db = json.load(file)
+        return roms_db
+
+    from .roms_db import RomsDatabase
+
+    return RomsDatabase(filename)
+
+
+def load_dat_index(filename=DAT_INDEX_FILENAME):
+    from .dat_index import DatIndex
+
+    return DatIndex(filename)
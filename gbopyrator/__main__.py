@@ -1,4 +1,6 @@
-from gbopyrator import main
+import sys
+
+from gbopyrator.gbopyrator import main
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
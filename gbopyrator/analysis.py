@@ -0,0 +1,262 @@
+"""
+Integrity checks of dumped GB/GBC ROM images
+
+NumPy is optional (`pip install gbopyrator[numpy]`): with it the banks are
+checked as a single 2D array, without it bank by bank.
+"""
+
+import hashlib
+import mmap
+from .constants import MBC_TYPES, RAM_SIZES, RAM_TYPES, ROM_BANK_SIZE, ROM_TYPES
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+HEADER_CHECKSUM_START = 0x134
+HEADER_CHECKSUM_END = 0x14D
+GLOBAL_CHECKSUM_OFFSET = 0x14E
+HEADER_SIZE = 0x150
+
+# Bytes summed at once by `global_checksum_matches`
+CHUNK_SIZE = 1 << 20
+
+# Odd 64-bit multipliers of the NumPy bank hash, one per 8-byte word
+_HASH_SEED = 0x9E3779B97F4A7C15
+
+
+def _bank_stats_numpy(data, num_banks):
+    words_per_bank = ROM_BANK_SIZE // 8
+    banks = numpy.frombuffer(data, dtype=numpy.uint8, count=num_banks * ROM_BANK_SIZE)
+    banks = banks.reshape(num_banks, ROM_BANK_SIZE)
+    uniform = (banks == banks[:, :1]).all(axis=1)
+
+    # Candidates only: equal hashes are confirmed by comparing the banks
+    multipliers = numpy.random.default_rng(_HASH_SEED).integers(
+        0, 1 << 63, size=words_per_bank, dtype=numpy.uint64
+    )
+    multipliers = multipliers * numpy.uint64(2) + numpy.uint64(1)
+    words = banks.view(numpy.uint64)
+    with numpy.errstate(over="ignore"):
+        hashes = (words * multipliers).sum(axis=1, dtype=numpy.uint64)
+
+    return (
+        [(int(bank), int(banks[bank, 0])) for bank in numpy.flatnonzero(uniform)],
+        hashes.tolist(),
+        int(banks.sum(dtype=numpy.uint64)),
+    )
+
+
+def _bank_stats_python(data, num_banks):
+    uniform = []
+    hashes = []
+    for bank in range(num_banks):
+        chunk = bytes(data[bank * ROM_BANK_SIZE : (bank + 1) * ROM_BANK_SIZE])
+        if chunk.count(chunk[0]) == ROM_BANK_SIZE:
+            uniform.append((bank, chunk[0]))
+        hashes.append(hashlib.sha1(chunk).digest())
+    return uniform, hashes, sum(bytes(data[: num_banks * ROM_BANK_SIZE]))
+
+
+def _bank(data, bank):
+    return bytes(data[bank * ROM_BANK_SIZE : (bank + 1) * ROM_BANK_SIZE])
+
+
+def _duplicate_banks(data, hashes):
+    groups = {}
+    for bank, bank_hash in enumerate(hashes):
+        groups.setdefault(bank_hash, []).append(bank)
+
+    duplicates = []
+    for banks in groups.values():
+        while len(banks) > 1:
+            first = _bank(data, banks[0])
+            same = [bank for bank in banks if _bank(data, bank) == first]
+            if len(same) > 1:
+                duplicates.append(same)
+            banks = [bank for bank in banks if bank not in same]
+    return sorted(duplicates)
+
+
+def _mirrored_size(data, size):
+    # Smallest prefix the whole image repeats, halving down to one bank
+    while size > ROM_BANK_SIZE and size % 2 == 0:
+        half = size // 2
+        if data[:half] != data[half:size]:
+            break
+        size = half
+    return size
+
+
+def analyze_rom(data, use_numpy=None):
+    """
+    Check the integrity of a ROM image
+
+    The header and global checksums are recomputed, the ROM and RAM sizes
+    declared by the header are checked against `constants.ROM_TYPES` and
+    `constants.RAM_TYPES`, and the 16 KiB banks are compared to find an
+    image mirrored because it was read with a wrong size, duplicate banks
+    and uniform banks (all 0xFF for instance), typical of open bus or bad
+    reads.
+
+    Parameters
+    ----------
+    data : bytes-like, such as a bytearray from `CartridgeReader.read_rom`
+        or a mmap of a dump
+    use_numpy : bool, optional. NumPy is used when it is installed by
+        default
+
+    Returns
+    -------
+    dict, with `ok` False if any `errors` were found. `warnings` list what
+    may be legitimate, like padding banks.
+    """
+    if use_numpy is None:
+        use_numpy = numpy is not None
+    elif use_numpy and numpy is None:
+        raise ImportError("NumPy is not installed, pip install gbopyrator[numpy]")
+
+    size = len(data)
+    errors = []
+    warnings = []
+    report = {"size": size, "errors": errors, "warnings": warnings}
+    if size < HEADER_SIZE:
+        errors.append(f"The image is {size} bytes, too short for a header")
+        report["ok"] = False
+        return report
+
+    header = bytes(data[:HEADER_SIZE])
+    header_checksum = 0
+    for byte in header[HEADER_CHECKSUM_START:HEADER_CHECKSUM_END]:
+        header_checksum = (header_checksum - byte - 1) & 0xFF
+    report["header_checksum"] = {
+        "stored": header[HEADER_CHECKSUM_END],
+        "computed": header_checksum,
+    }
+    if header_checksum != header[HEADER_CHECKSUM_END]:
+        errors.append(
+            "Header checksum mismatch: stored {:02x}, computed {:02x}".format(
+                header[HEADER_CHECKSUM_END], header_checksum
+            )
+        )
+
+    num_banks = size // ROM_BANK_SIZE
+    if size % ROM_BANK_SIZE:
+        errors.append(f"The image is not a whole number of {ROM_BANK_SIZE} bytes banks")
+    if num_banks:
+        bank_stats = _bank_stats_numpy if use_numpy else _bank_stats_python
+        uniform, hashes, total = bank_stats(data, num_banks)
+        total += sum(bytes(data[num_banks * ROM_BANK_SIZE :]))
+    else:
+        uniform, hashes, total = [], [], sum(bytes(data))
+
+    stored = int.from_bytes(
+        header[GLOBAL_CHECKSUM_OFFSET : GLOBAL_CHECKSUM_OFFSET + 2], "big"
+    )
+    computed = (
+        total - header[GLOBAL_CHECKSUM_OFFSET] - header[GLOBAL_CHECKSUM_OFFSET + 1]
+    ) & 0xFFFF
+    report["global_checksum"] = {"stored": stored, "computed": computed}
+    if computed != stored:
+        errors.append(
+            "Global checksum mismatch: stored {:04x}, computed {:04x}".format(
+                stored, computed
+            )
+        )
+
+    rom_type = ROM_TYPES.get(header[0x148])
+    report["declared_ROM_size"] = None
+    if rom_type is None:
+        errors.append("Unknown ROM size code {:02x}".format(header[0x148]))
+    else:
+        declared_size = rom_type["num_rom_banks"] * ROM_BANK_SIZE
+        report["declared_ROM_size"] = declared_size
+        if declared_size != size:
+            errors.append(
+                f"The header declares {declared_size} bytes of ROM, the image has {size}"
+            )
+
+    report["declared_RAM_size"] = RAM_SIZES.get(header[0x149])
+    mbc_type = MBC_TYPES.get(header[0x147])
+    if header[0x149] not in RAM_TYPES:
+        errors.append("Unknown RAM size code {:02x}".format(header[0x149]))
+    elif mbc_type is None:
+        errors.append("Unknown cartridge type {:02x}".format(header[0x147]))
+    elif mbc_type.startswith(("ROM", "MBC")) and not mbc_type.startswith(
+        ("MBC2", "MBC7")
+    ):
+        # MBC2 has its own RAM and MBC7 an EEPROM, their headers declare none
+        if ("RAM" in mbc_type) != (report["declared_RAM_size"] > 0):
+            warnings.append(
+                "The cartridge type {} does not match the RAM size {}".format(
+                    mbc_type, RAM_TYPES[header[0x149]]["SRAM_size_info"]
+                )
+            )
+
+    mirrored_size = _mirrored_size(data, num_banks * ROM_BANK_SIZE)
+    report["mirrored_size"] = mirrored_size
+    if num_banks > 1 and mirrored_size < num_banks * ROM_BANK_SIZE:
+        errors.append(
+            f"The image repeats its first {mirrored_size} bytes, "
+            "the ROM was likely read with a wrong size"
+        )
+
+    duplicates = _duplicate_banks(data, hashes)
+    report["duplicate_banks"] = duplicates
+    if duplicates and mirrored_size == num_banks * ROM_BANK_SIZE:
+        warnings.append("{} groups of identical banks".format(len(duplicates)))
+
+    report["uniform_banks"] = [
+        {"bank": bank, "value": value} for bank, value in uniform
+    ]
+    if uniform:
+        warnings.append(
+            "{} banks hold a single byte value, as read from an open bus or "
+            "blank flash".format(len(uniform))
+        )
+
+    report["ok"] = not errors
+    return report
+
+
+def global_checksum_matches(data):
+    """
+    Whether the global checksum of the header matches a ROM image
+
+    Parameters
+    ----------
+    data : bytes-like, such as a mmap of a dump
+
+    Returns
+    -------
+    bool, False for an image too short for a header
+    """
+    if len(data) < HEADER_SIZE:
+        return False
+    total = 0
+    for start in range(0, len(data), CHUNK_SIZE):
+        total += sum(bytes(data[start : start + CHUNK_SIZE]))
+    stored = data[GLOBAL_CHECKSUM_OFFSET] << 8 | data[GLOBAL_CHECKSUM_OFFSET + 1]
+    computed = (
+        total - data[GLOBAL_CHECKSUM_OFFSET] - data[GLOBAL_CHECKSUM_OFFSET + 1]
+    ) & 0xFFFF
+    return computed == stored
+
+
+def analyze_rom_file(filename, use_numpy=None):
+    """
+    Check the integrity of a ROM dump, see `analyze_rom`
+
+    The file is mapped in memory rather than read.
+    """
+    with open(filename, "rb") as file:
+        try:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty file
+            return analyze_rom(b"", use_numpy=use_numpy)
+        try:
+            return analyze_rom(data, use_numpy=use_numpy)
+        finally:
+            data.close()
@@ -0,0 +1,160 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from . import coms_utils as cu
+from .cartridge_utils import CartridgeReader
+
+# Chunks buffered between the device thread and a slow consumer
+STREAM_QUEUE_SIZE = 8
+
+_END_OF_STREAM = object()
+
+
+class _StreamClosed(Exception):
+    pass
+
+
+class AsyncCartridgeReader(object):
+    """
+    asyncio counterpart of `CartridgeReader`
+
+    Every device operation runs on a dedicated worker thread, one per
+    reader, so operations on a device never overlap and the event loop is
+    never blocked by a transfer.
+
+    Parameters
+    ----------
+    quiet : bool, optional. Progress bars are hidden by default
+    reader : CartridgeReader, optional. Wrap an existing reader
+    """
+
+    def __init__(self, quiet=True, reader=None):
+        self.reader = reader if reader is not None else CartridgeReader(quiet=quiet)
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="gbopyrator"
+        )
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs)
+        )
+
+    async def initialize_reader(self, blocking=False, timeout=0, device=None):
+        return await self._run(
+            self.reader.initialize_reader,
+            blocking=blocking,
+            timeout=timeout,
+            device=device,
+        )
+
+    def session(self):
+        """
+        Async context manager around `CartridgeReader.session`
+        """
+        return _AsyncSession(self)
+
+    async def read_cartridge_info(self):
+        return await self._run(self.reader.read_cartridge_info)
+
+    async def get_epilogue_id(self):
+        return await self._run(self.reader.get_epilogue_id)
+
+    async def read_rom(self):
+        return await self._run(self.reader.read_rom)
+
+    async def read_save(self):
+        return await self._run(self.reader.read_save)
+
+    async def write_save(self, data):
+        return await self._run(self.reader.write_save, data)
+
+    async def dump_rom(self, filename, **kwargs):
+        return await self._run(self.reader.dump_rom, filename, **kwargs)
+
+    async def dump_save(self, filename):
+        return await self._run(self.reader.dump_save, filename)
+
+    def stream_rom(self):
+        """
+        Iterate over the ROM as it is received
+
+        To stop early, call `aclose()` on the iterator: the transfer is then
+        aborted and the rest of the data drained from the device.
+
+        Yields
+        ------
+        bytes, one ACK window at a time
+        """
+        return self._stream(self.reader.read_rom)
+
+    def stream_save(self):
+        """
+        Iterate over the save as it is received, see `stream_rom`
+
+        Yields
+        ------
+        bytes
+        """
+        return self._stream(self.reader.read_save)
+
+    async def _stream(self, read):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        state = {"closed": False}
+
+        def sink(chunk):
+            if state["closed"]:
+                raise _StreamClosed()
+            # The reader reuses its buffer, copy the chunk before handing it over
+            asyncio.run_coroutine_threadsafe(queue.put(bytes(chunk)), loop).result()
+
+        future = loop.run_in_executor(
+            self._executor, functools.partial(read, sink=sink)
+        )
+        future.add_done_callback(
+            lambda _: asyncio.ensure_future(queue.put(_END_OF_STREAM))
+        )
+
+        completed = False
+        try:
+            while True:
+                chunk = await queue.get()
+                if chunk is _END_OF_STREAM:
+                    break
+                yield chunk
+            completed = True
+        finally:
+            if not completed:
+                # Unblock the device thread and let it abort the transfer
+                state["closed"] = True
+                while not future.done():
+                    try:
+                        queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        await asyncio.sleep(0.01)
+                if not future.cancelled():
+                    future.exception()
+                await self._run(cu.drain_bulk_in, self.reader.gbop_device)
+        # Raise the transfer error, if any
+        await future
+
+    async def close(self):
+        await self._run(self.reader.close)
+        self._executor.shutdown(wait=True)
+
+
+class _AsyncSession(object):
+    def __init__(self, async_reader):
+        self.async_reader = async_reader
+        self._session = None
+
+    async def __aenter__(self):
+        self._session = self.async_reader.reader.session()
+        await self.async_reader._run(self._session.__enter__)
+        return self.async_reader
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        return await self.async_reader._run(
+            self._session.__exit__, exc_type, exc_value, traceback
+        )
@@ -0,0 +1,303 @@
+import binascii
+import hashlib
+import json
+import os
+import time
+from . import load_roms_db
+from .cartridge_utils import epilogue_id_from_info
+from .file_utils import safe_filename
+
+OPERATIONS = (
+    "info",
+    "dump_rom",
+    "dump_save",
+    "write_save",
+    "verify_rom",
+    "verify_save",
+    "backup_save",
+    "restore_save",
+    "analyze_rom",
+)
+
+# Operations working on files only, without the cartridge
+FILE_OPERATIONS = ("analyze_rom",)
+
+
+def load_manifest(filename):
+    """
+    Load a batch manifest, JSON or TOML
+
+    The manifest holds an ordered list of `steps`, each with an `op` from
+    `OPERATIONS` and its arguments, and optionally `stop_on_error` (true by
+    default) and `report`, the file the report is written to. Relative
+    paths are relative to the manifest.
+
+        [[steps]]
+        op = "dump_save"
+        path = "saves/{epilogue_id}.sav"
+
+        [[steps]]
+        op = "write_save"
+        path = "patched.sav"
+
+        [[steps]]
+        op = "verify_save"
+        path = "patched.sav"
+
+    Returns
+    -------
+    dict
+    """
+    if filename.endswith(".toml"):
+        try:
+            import tomllib
+        except ImportError:
+            try:
+                import tomli as tomllib
+            except ImportError:
+                raise ImportError(
+                    "TOML manifests need Python 3.11 or the tomli package"
+                )
+        with open(filename, "rb") as file:
+            manifest = tomllib.load(file)
+    else:
+        with open(filename, "r") as file:
+            manifest = json.load(file)
+
+    steps = manifest.get("steps")
+    if not isinstance(steps, list) or not steps:
+        raise ValueError(f"{filename}: the manifest has no steps")
+    for index, step in enumerate(steps):
+        if step.get("op") not in OPERATIONS:
+            raise ValueError(
+                f"{filename}: step {index} has an unknown op {step.get('op')!r}"
+            )
+    return manifest
+
+
+class BatchRunner(object):
+    """
+    Run the steps of a manifest in a single device session
+
+    The device stays claimed for all the steps. Paths are formatted with the
+    `epilogue_id` and `title` (full title from the ROM database, or the
+    epilogue ID if unknown) of the cartridge info read at the start. Before
+    each step on the cartridge, its info is read again: the step fails if
+    the cartridge was removed or changed since the start.
+
+    Parameters
+    ----------
+    reader : CartridgeReader, initialized
+    manifest : dict, see `load_manifest`
+    base_directory : str, optional. Relative paths are resolved from there
+    save_store : SaveStore, optional. For "backup_save" and "restore_save"
+    """
+
+    def __init__(self, reader, manifest, base_directory=".", save_store=None):
+        self.reader = reader
+        self.manifest = manifest
+        self.base_directory = base_directory
+        self.save_store = save_store
+        self.cartridge_info = None
+        self.fields = None
+
+    def run(self):
+        """
+        Returns
+        -------
+        dict, report with the result, error and timing of every step
+        """
+        stop_on_error = self.manifest.get("stop_on_error", True)
+        start = time.perf_counter()
+        reports = []
+        failed = False
+        with self.reader.session():
+            try:
+                self.cartridge_info = self._read_cartridge_info()
+            except Exception as e:
+                self.reader.printer.error(f"Cartridge info: {e}")
+                return {
+                    "epilogue_id": None,
+                    "ok": False,
+                    "error": repr(e),
+                    "elapsed": time.perf_counter() - start,
+                    "steps": [
+                        {"index": index, "op": step["op"], "status": "skipped"}
+                        for index, step in enumerate(self.manifest["steps"])
+                    ],
+                }
+            epilogue_id = epilogue_id_from_info(self.cartridge_info)
+            roms_db = load_roms_db()
+            rom_info = roms_db.get(epilogue_id)
+            self.fields = {
+                "epilogue_id": epilogue_id,
+                "title": safe_filename(
+                    rom_info["full_title"] if rom_info is not None else epilogue_id
+                ),
+            }
+
+            for index, step in enumerate(self.manifest["steps"]):
+                report = {"index": index, "op": step["op"]}
+                if failed and stop_on_error:
+                    report["status"] = "skipped"
+                    reports.append(report)
+                    continue
+                step_start = time.perf_counter()
+                try:
+                    if step["op"] not in FILE_OPERATIONS:
+                        self._check_cartridge()
+                    report["result"] = getattr(self, "_" + step["op"])(step)
+                    report["status"] = "ok"
+                except Exception as e:
+                    report["status"] = "failed"
+                    report["error"] = repr(e)
+                    failed = True
+                    self.reader.printer.error(f"Step {index} ({step['op']}): {e}")
+                report["elapsed"] = time.perf_counter() - step_start
+                reports.append(report)
+
+        return {
+            "epilogue_id": epilogue_id,
+            "ok": not failed,
+            "elapsed": time.perf_counter() - start,
+            "steps": reports,
+        }
+
+    def _read_cartridge_info(self):
+        cartridge_info = self.reader.read_cartridge_info()
+        if cartridge_info is None:
+            raise ValueError("No cartridge inserted")
+        return cartridge_info
+
+    def _check_cartridge(self):
+        # Refreshes the info cached by the session
+        cartridge_info = self._read_cartridge_info()
+        if epilogue_id_from_info(cartridge_info) != self.fields["epilogue_id"]:
+            raise ValueError(
+                "The cartridge was changed since the start of the batch, "
+                "expected {}".format(self.fields["epilogue_id"])
+            )
+
+    def _path(self, step, create=False):
+        path = os.path.join(self.base_directory, step["path"].format(**self.fields))
+        if create:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def _info(self, step):
+        return dict(
+            self.cartridge_info,
+            global_checksum=bytes(self.cartridge_info["global_checksum"]).hex(),
+            epilogue_id=self.fields["epilogue_id"],
+        )
+
+    def _dump_rom(self, step):
+        path = self._path(step, create=True)
+        digests = self.reader.dump_rom(
+            path,
+            resume=step.get("resume", False),
+            spot_check=step.get("spot_check", 0),
+        )
+        return dict(digests, path=path)
+
+    def _dump_save(self, step):
+        path = self._path(step, create=True)
+        digests = self.reader.dump_save(path)
+        if digests is None:
+            raise ValueError("The cartridge has no save")
+        return dict(digests, path=path)
+
+    def _write_save(self, step):
+        path = self._path(step)
+        with open(path, "rb") as file:
+            stats = self.reader.write_save(file.read())
+        if stats is None:
+            raise ValueError("The save could not be written")
+        return dict(stats, path=path)
+
+    def _verify(self, step, read, name):
+        crc = 0
+        sha1 = hashlib.sha1()
+
+        def sink(chunk):
+            nonlocal crc
+            crc = binascii.crc32(chunk, crc)
+            sha1.update(chunk)
+
+        if read(sink=sink) is None:
+            raise ValueError(f"The cartridge has no {name}")
+        digests = {"crc32": "{:08x}".format(crc), "sha1": sha1.hexdigest()}
+
+        if "path" in step:
+            expected = hashlib.sha1()
+            with open(self._path(step), "rb") as file:
+                for chunk in iter(lambda: file.read(1 << 20), b""):
+                    expected.update(chunk)
+            expected = {"sha1": expected.hexdigest()}
+        else:
+            expected = {key: step[key] for key in ("crc32", "sha1") if key in step}
+        if not expected:
+            raise ValueError("Nothing to verify against, set path, crc32 or sha1")
+        for key, value in expected.items():
+            if digests[key] != value.lower():
+                raise ValueError(
+                    f"{key} mismatch: read {digests[key]}, expected {value}"
+                )
+        return digests
+
+    def _verify_rom(self, step):
+        return self._verify(step, self.reader.read_rom, "ROM")
+
+    def _verify_save(self, step):
+        return self._verify(step, self.reader.read_save, "save")
+
+    def _backup_save(self, step):
+        version = self.reader.backup_save(self._store())
+        if version is None:
+            raise ValueError("The cartridge has no save")
+        version.pop("blocks")
+        return version
+
+    def _restore_save(self, step):
+        stats = self.reader.restore_save(self._store(), step.get("version"))
+        if stats is None:
+            raise ValueError("The save could not be written")
+        return stats
+
+    def _analyze_rom(self, step):
+        from .analysis import analyze_rom_file
+
+        report = analyze_rom_file(self._path(step))
+        if not report["ok"]:
+            raise ValueError("; ".join(report["errors"]))
+        return report
+
+    def _store(self):
+        if self.save_store is None:
+            from .save_store import SaveStore
+
+            self.save_store = SaveStore()
+        return self.save_store
+
+
+def run_manifest(reader, filename, report_filename=None):
+    """
+    Run a manifest file
+
+    The report is written to `report_filename`, or to the `report` file of
+    the manifest if set.
+
+    Returns
+    -------
+    dict, report, see `BatchRunner.run`
+    """
+    manifest = load_manifest(filename)
+    base_directory = os.path.dirname(os.path.abspath(filename))
+    report = BatchRunner(reader, manifest, base_directory).run()
+    report["manifest"] = os.path.abspath(filename)
+    if report_filename is None and "report" in manifest:
+        report_filename = os.path.join(base_directory, manifest["report"])
+    if report_filename is not None:
+        with open(report_filename, "w") as file:
+            json.dump(report, file, indent=4)
+    return report
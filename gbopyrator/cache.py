@@ -0,0 +1,187 @@
+import json
+import os
+import threading
+import time
+from .file_utils import AtomicHashWriter
+
+# Total size of the cached ROMs, in bytes, before the least recently used
+# ones are evicted
+DEFAULT_MAX_SIZE = 1 << 30
+
+INDEX_FILENAME = "index.json"
+CHUNK_SIZE = 1 << 20
+
+
+def cache_directory():
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "gbopyrator", "roms")
+
+
+def cache_key(epilogue_id, rom_size):
+    # The epilogue ID holds the header and global checksums of the ROM
+    return f"{epilogue_id}:{rom_size}"
+
+
+class RomCache(object):
+    """
+    Content addressed store of ROM dumps
+
+    ROM images are stored once, named after their SHA-1, and indexed by
+    epilogue ID and ROM size. Images are checked against their SHA-1 every
+    time they are served. Once the images take more than `max_size` bytes,
+    the least recently used ones are evicted.
+
+    Parameters
+    ----------
+    directory : str, optional. `cache_directory()` by default
+    max_size : int, optional
+    """
+
+    def __init__(self, directory=None, max_size=DEFAULT_MAX_SIZE):
+        self.directory = directory or cache_directory()
+        self.max_size = max_size
+        self.index_filename = os.path.join(self.directory, INDEX_FILENAME)
+        self._lock = threading.Lock()
+
+    def _object_filename(self, sha1):
+        return os.path.join(self.directory, "objects", sha1[:2], sha1)
+
+    def _load_index(self):
+        try:
+            with open(self.index_filename, "r") as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_index(self, index):
+        os.makedirs(self.directory, exist_ok=True)
+        temp_filename = self.index_filename + ".tmp"
+        with open(temp_filename, "w") as file:
+            json.dump(index, file, indent=4)
+        os.replace(temp_filename, self.index_filename)
+
+    def lookup(self, epilogue_id, rom_size):
+        """
+        Cache entry of a ROM
+
+        Returns
+        -------
+        dict, size and digests of the cached image, or None
+        """
+        with self._lock:
+            entry = self._load_index().get(cache_key(epilogue_id, rom_size))
+        if entry is None or not os.path.exists(self._object_filename(entry["sha1"])):
+            return None
+        return entry
+
+    def read_prefix(self, entry, num_bytes):
+        """
+        First `num_bytes` of a cached image
+        """
+        with open(self._object_filename(entry["sha1"]), "rb") as file:
+            return file.read(num_bytes)
+
+    def fetch(self, epilogue_id, rom_size, filename):
+        """
+        Copy a cached ROM to `filename`, atomically
+
+        Returns
+        -------
+        dict, digests of the copy, or None on a cache miss or if the cached
+        image is corrupted (it is then evicted)
+        """
+        entry = self.lookup(epilogue_id, rom_size)
+        if entry is None:
+            return None
+
+        with open(self._object_filename(entry["sha1"]), "rb") as source:
+            with AtomicHashWriter(filename) as writer:
+                for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                    writer.write(chunk)
+                if writer.digests()["sha1"] != entry["sha1"]:
+                    writer.discard()
+        digests = writer.digests()
+        if digests["sha1"] != entry["sha1"]:
+            self.evict(epilogue_id, rom_size)
+            return None
+
+        with self._lock:
+            index = self._load_index()
+            key = cache_key(epilogue_id, rom_size)
+            if key in index:
+                index[key]["last_used"] = time.time()
+                self._save_index(index)
+        return digests
+
+    def store(self, epilogue_id, rom_size, filename, digests):
+        """
+        Add the dump `filename` to the cache
+
+        Parameters
+        ----------
+        epilogue_id : str
+        rom_size : int
+        filename : str
+        digests : dict, as returned by `CartridgeReader.dump_rom`
+        """
+        if digests["size"] > self.max_size:
+            return
+        object_filename = self._object_filename(digests["sha1"])
+        if not os.path.exists(object_filename):
+            os.makedirs(os.path.dirname(object_filename), exist_ok=True)
+            with open(filename, "rb") as source:
+                with AtomicHashWriter(object_filename) as writer:
+                    for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                        writer.write(chunk)
+                    if writer.digests()["sha1"] != digests["sha1"]:
+                        # The file changed since it was dumped
+                        writer.discard()
+                        return
+
+        with self._lock:
+            index = self._load_index()
+            index[cache_key(epilogue_id, rom_size)] = {
+                "size": digests["size"],
+                "crc32": digests["crc32"],
+                "md5": digests["md5"],
+                "sha1": digests["sha1"],
+                "last_used": time.time(),
+            }
+            self._evict_lru(index)
+            self._save_index(index)
+
+    def evict(self, epilogue_id, rom_size):
+        with self._lock:
+            index = self._load_index()
+            entry = index.pop(cache_key(epilogue_id, rom_size), None)
+            if entry is not None:
+                self._remove_unreferenced(index, entry["sha1"])
+                self._save_index(index)
+
+    def size(self):
+        """
+        Bytes taken by the cached images
+        """
+        with self._lock:
+            return _images_size(self._load_index())
+
+    def _evict_lru(self, index):
+        while _images_size(index) > self.max_size:
+            key = min(index, key=lambda key: index[key]["last_used"])
+            entry = index.pop(key)
+            self._remove_unreferenced(index, entry["sha1"])
+
+    def _remove_unreferenced(self, index, sha1):
+        # Several keys may share an image
+        if any(entry["sha1"] == sha1 for entry in index.values()):
+            return
+        try:
+            os.remove(self._object_filename(sha1))
+        except FileNotFoundError:
+            pass
+
+
+def _images_size(index):
+    return sum({entry["sha1"]: entry["size"] for entry in index.values()}.values())
@@ -1,11 +1,20 @@
 import binascii
+import os
+import threading
 import time
-import re
-from rich.console import Console
+import usb.core
+from contextlib import contextmanager
+from . import codec
 from . import coms_utils as cu
+from . import tuning
+from .file_utils import AtomicHashWriter, load_journal, remove_journal, save_journal
 from .printer import Printer
 import sys
 
+# Size of a ROM bank, the unit of the cache spot checks
+SPOT_CHECK_BANK_SIZE = 0x4000
+
+
 def check_initialized(func):
     def wrapper(*args, **kwargs):
         if args[0].initialized:
@@ -18,10 +27,22 @@ def check_initialized(func):
     return wrapper
 
 
+def synchronized(func):
+    def wrapper(*args, **kwargs):
+        reader = args[0]
+        # Hold the device for the whole exchange (trigger, ACK and payload)
+        with reader.device_lock:
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
 def release_device(func):
     def wrapper(*args, **kwargs):
         output = func(*args, **kwargs)
-        cu.release_gb_operator(args[0].gbop_device)
+        # Keep the interface claimed for the whole session
+        if not args[0].in_session:
+            cu.release_gb_operator(args[0].gbop_device)
         return output
 
     return wrapper
@@ -29,30 +50,140 @@ def release_device(func):
 
 def get_cartridge_info(func):
     def wrapper(*args, **kwargs):
-        cartridge_info = cu.read_cartridge_info(args[0].gbop_device)
+        reader = args[0]
+        cartridge_info = reader._cartridge_info if reader.in_session else None
         if cartridge_info is None:
-            raise Exception(
-                "Could not read cartridge info. Make sure a cartridge is inserted."
+            cartridge_info = cu.read_cartridge_info(
+                reader.gbop_device, metrics=reader.metrics
             )
+            if cartridge_info is None:
+                raise Exception(
+                    "Could not read cartridge info. Make sure a cartridge is inserted."
+                )
+            if reader.in_session:
+                reader._cartridge_info = cartridge_info
 
-        return func(*args, cartridge_info=cartridge_info, **kwargs)
+        try:
+            return func(*args, cartridge_info=cartridge_info, **kwargs)
+        except Exception:
+            # The cartridge may have been removed, read its info again next time
+            reader._cartridge_info = None
+            raise
 
     return wrapper
 
 
+class DeviceLock(object):
+    """
+    Reentrant lock serialising the operations on a device
+
+    It also records how many threads are waiting for the device and how
+    long they waited.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._stats_lock = threading.Lock()
+        self._waiting = 0
+        self._stats = {
+            "acquisitions": 0,
+            "contended": 0,
+            "max_queue_depth": 0,
+            "total_wait": 0.0,
+            "max_wait": 0.0,
+        }
+
+    def __enter__(self):
+        if self._lock.acquire(blocking=False):
+            with self._stats_lock:
+                self._stats["acquisitions"] += 1
+            return self
+
+        with self._stats_lock:
+            self._waiting += 1
+            self._stats["max_queue_depth"] = max(
+                self._stats["max_queue_depth"], self._waiting
+            )
+        start = time.perf_counter()
+        self._lock.acquire()
+        wait = time.perf_counter() - start
+        with self._stats_lock:
+            self._waiting -= 1
+            self._stats["acquisitions"] += 1
+            self._stats["contended"] += 1
+            self._stats["total_wait"] += wait
+            self._stats["max_wait"] = max(self._stats["max_wait"], wait)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._lock.release()
+
+    def stats(self):
+        """
+        Returns
+        -------
+        dict, current queue depth and wait time statistics in seconds
+        """
+        with self._stats_lock:
+            stats = dict(self._stats, queue_depth=self._waiting)
+        stats["mean_wait"] = (
+            stats["total_wait"] / stats["contended"] if stats["contended"] else 0.0
+        )
+        return stats
+
+
 class CartridgeReader(object):
-    def __init__(self, quiet=False):
+    def __init__(
+        self, quiet=False, progress=None, metrics=False, cache=None, dat_index=None
+    ):
         self.initialized = False
-        self.console = Console()
+        # Transfer progress callback, see `progress.ProgressTracker`
+        self.progress = progress
+        # Transfer instrumentation, off by default. Pass True, or a
+        # `metrics.TransferMetrics` to share between readers
+        if metrics is True:
+            from .metrics import TransferMetrics
+
+            metrics = TransferMetrics()
+        self.metrics = metrics or None
+        # ROM dumps cache, see `cache.RomCache`. Pass True for the default one
+        if cache is True:
+            from .cache import RomCache
+
+            cache = RomCache()
+        self.cache = cache or None
+        # No-Intro CRC32 index the ROM dumps are checked against, opened on
+        # the first dump. Pass False to skip the check
+        self.dat_index = dat_index
+        # Transfer settings of the device, see `tuning`
+        self.transfer_profile = dict(tuning.DEFAULT_PROFILE)
+        self.device_lock = DeviceLock()
+        self._console = None
+        self.in_session = False
+        self._session_depth = 0
+        self._cartridge_info = None
+        self.device_id = None
+        self.bytes_transferred = 0
         self.quiet = quiet
         self.printer = Printer(quiet=quiet)
 
-    def initialize_reader(self, blocking=False, timeout=0):
+    @property
+    def console(self):
+        if self._console is None:
+            from rich.console import Console
+
+            self._console = Console()
+        return self._console
+
+    @synchronized
+    def initialize_reader(self, blocking=False, timeout=0, device=None):
         if not blocking and timeout != 0:
             print("[WARNING] timeout is ignored when blocking is set to Fale",file=sys.stderr)
 
         with self.printer.status("Initializing reader..."):
-            if blocking:
+            if device is not None:
+                dev = device
+            elif blocking:
                 dev = cu.find_gb_operator_blocking(timeout=timeout)
             else:
                 dev = cu.find_gb_operator()
@@ -65,51 +196,331 @@ class CartridgeReader(object):
             )
         else:
             self.gbop_device = cu.init_gb_operator(dev)
+            self.device_id = cu.get_device_id(self.gbop_device)
+            # Reuse the settings calibrated for this device on this host
+            profile = tuning.load_profile(self.gbop_device)
+            if profile is not None:
+                self.transfer_profile = profile
+            tuning.apply_profile(self.gbop_device, self.transfer_profile)
             self.initialized = True
             self.printer.success("[bold green]Reader initialized[/bold green]")
 
         return
 
+    @check_initialized
+    @contextmanager
+    def session(self):
+        """
+        Keep the device claimed and the cartridge info cached
+
+        Inside the session the USB interface is claimed once and released
+        when the session ends, and the cartridge info is read once and
+        reused by all the operations. It is dropped when an operation fails,
+        or when a ROM read finds the header of another cartridge, and read
+        again by the next operation. `read_cartridge_info` reads it again
+        explicitly.
+
+        The device is locked for the whole session: other threads wait until
+        it ends.
+        """
+        with self.device_lock:
+            if self._session_depth == 0:
+                cu.claim_gb_operator(self.gbop_device)
+                self.in_session = True
+            self._session_depth += 1
+            try:
+                yield self
+            finally:
+                self._session_depth -= 1
+                if self._session_depth == 0:
+                    self.in_session = False
+                    self._cartridge_info = None
+                    cu.release_gb_operator(self.gbop_device)
+
+    def lock_stats(self):
+        """
+        Contention statistics of the device, see `DeviceLock.stats`
+        """
+        return self.device_lock.stats()
+
+    def get_metrics(self):
+        """
+        Transfer metrics recorded so far, see `metrics.TransferMetrics`
+
+        Returns
+        -------
+        dict, or None if the reader was created without `metrics`
+        """
+        if self.metrics is None:
+            return None
+        return self.metrics.snapshot()
+
+    def export_metrics(self, filename, format="json"):
+        """
+        Write the transfer metrics to `filename`
+
+        Parameters
+        ----------
+        filename : str
+        format : str, optional. "json" or "prometheus", for the node exporter
+            textfile collector
+        """
+        if self.metrics is None:
+            raise ValueError("Metrics are disabled, create the reader with metrics=True")
+        self.metrics.export(filename, format=format)
+
+    @synchronized
     @check_initialized
     @release_device
     def read_cartridge_info(self):
         # with self.printer.status("Reading cartridge info..."):
-        _cartridge_info = cu.read_cartridge_info(self.gbop_device)
+        _cartridge_info = cu.read_cartridge_info(
+            self.gbop_device, metrics=self.metrics
+        )
+        if self.in_session:
+            self._cartridge_info = _cartridge_info
         return _cartridge_info
 
+    @synchronized
     @check_initialized
     @release_device
     @get_cartridge_info
-    def read_rom(self, cartridge_info=None):
+    def read_rom(self, sink=None, cartridge_info=None):
         # with self.printer.status("Reading ROM..."):
         num_bytes = cartridge_info["ROM_size"]
-        return cu.read_rom(self.gbop_device, num_bytes, quiet=self.quiet)
+        rom = cu.read_rom(
+            self.gbop_device,
+            num_bytes,
+            quiet=self.quiet,
+            sink=sink,
+            progress=self.progress,
+            metrics=self.metrics,
+            transfer_packets=self.transfer_profile["transfer_packets"],
+        )
+        self.bytes_transferred += num_bytes
+        if sink is None:
+            check_same_cartridge(rom, cartridge_info)
+        return rom
 
-    def dump_rom(self, filename):
-        rom = self.read_rom()
-        with open(filename, "wb") as f:
-            f.write(rom)
+    @synchronized
+    @check_initialized
+    @release_device
+    @get_cartridge_info
+    def dump_rom(
+        self,
+        filename,
+        resume=False,
+        retries=cu.TRANSFER_RETRIES,
+        spot_check=0,
+        cartridge_info=None,
+    ):
+        num_bytes = cartridge_info["ROM_size"]
+        epilogue_id = epilogue_id_from_info(cartridge_info)
+
+        if self.cache is not None and not resume:
+            digests = self._dump_rom_from_cache(
+                filename, epilogue_id, num_bytes, spot_check
+            )
+            if digests is not None:
+                return self._check_dump(digests, filename)
+
+        journal = {
+            "epilogue_id": epilogue_id,
+            "ROM_size": num_bytes,
+            "window_crcs": [],
+        }
+        part_filename = filename + ".part"
+        resume_size = None
+
+        if resume:
+            previous_journal = load_journal(filename)
+            if previous_journal is None or not os.path.exists(part_filename):
+                self.printer.warning("No interrupted dump to resume, starting over.")
+            elif (
+                previous_journal["epilogue_id"] != journal["epilogue_id"]
+                or previous_journal["ROM_size"] != num_bytes
+            ):
+                raise ValueError(
+                    f"The interrupted dump of {filename} is from another cartridge"
+                )
+            else:
+                journal = previous_journal
+                resume_size = journal["confirmed_bytes"]
+
+        window_size = cu.ACK_PACKET_INTERVAL * cu.USB_PACKET_SIZE
+        writer = AtomicHashWriter(
+            filename,
+            temp_filename=part_filename,
+            resume_size=resume_size,
+            resume_crcs=journal["window_crcs"],
+            resume_window_size=window_size,
+        )
+        writer.keep_partial = True
+        try:
+            with writer:
+                if resume_size is not None and writer.resume_size is None:
+                    self.printer.warning(
+                        "The interrupted dump does not match its journal, starting over."
+                    )
+                    journal["window_crcs"] = []
+                cu.read_rom_with_retry(
+                    self.gbop_device,
+                    num_bytes,
+                    writer,
+                    window_crcs=journal["window_crcs"],
+                    retries=retries,
+                    quiet=self.quiet,
+                    progress=self.progress,
+                    metrics=self.metrics,
+                    transfer_packets=self.transfer_profile["transfer_packets"],
+                )
+        except (cu.TransferError, usb.core.USBError, KeyboardInterrupt):
+            confirmed_bytes = min(len(journal["window_crcs"]) * window_size, num_bytes)
+            journal["confirmed_bytes"] = confirmed_bytes
+            save_journal(filename, journal)
+            self.printer.error(
+                f"ROM dump failed, {confirmed_bytes} of {num_bytes} bytes confirmed good. "
+                "Resume it with `dump_rom(..., resume=True)`."
+            )
+            raise
+        except Exception:
+            # The partial dump can not be trusted
+            if os.path.exists(part_filename):
+                os.remove(part_filename)
+            remove_journal(filename)
+            raise
+
+        remove_journal(filename)
+        self.bytes_transferred += num_bytes
+        with open(filename, "rb") as file:
+            header = file.read(codec.HEADER_SIZE)
+        try:
+            check_same_cartridge(header, cartridge_info)
+        except Exception:
+            os.remove(filename)
+            raise
         self.printer.success(f"ROM dumped to:\t[dark_cyan]{filename}[/dark_cyan]")
+        digests = writer.digests()
+        digests["confirmed_bytes"] = writer.size
+        digests["cached"] = False
+        digests = self._check_dump(digests, filename)
+        if self.cache is not None and self._is_good_dump(digests, filename):
+            self.cache.store(epilogue_id, num_bytes, filename, digests)
+        return digests
+
+    def _check_dump(self, digests, filename):
+        # The CRC32 is computed during the transfer, no need to read the file
+        if self.dat_index is False:
+            return digests
+        if self.dat_index is None:
+            from . import load_dat_index
+
+            self.dat_index = load_dat_index()
+        matches = self.dat_index.lookup(digests["crc32"])
+        digests["verified"] = bool(matches)
+        digests["no_intro"] = matches
+        if matches:
+            self.printer.success(
+                f"Verified good dump:\t[dark_cyan]{matches[0]['title']}[/dark_cyan]"
+            )
+            return digests
+
+        # Only the header is read
+        with open(filename, "rb") as file:
+            header = file.read(codec.CGB_FLAG_OFFSET + 1)
+        platform = codec.platform_from_header(header)
+        if platform not in self.dat_index.platforms:
+            # Neither good nor bad
+            digests["verified"] = None
+            self.printer.print(
+                f"CRC32 {digests['crc32']} can not be verified, "
+                f"the bundled No-Intro DATs do not cover {platform}."
+            )
+        else:
+            self.printer.warning(
+                f"CRC32 {digests['crc32']} is not a known good dump, "
+                "the ROM may be bad or missing from the No-Intro DATs."
+            )
+        return digests
+
+    def _is_good_dump(self, digests, filename):
+        # Only good dumps are cached: a known good one, or when no DAT can
+        # tell, one matching the global checksum of its header
+        verified = digests.get("verified")
+        if verified is not None:
+            return verified
+        from .analysis import global_checksum_matches
+
+        with open(filename, "rb") as file:
+            return global_checksum_matches(file.read())
+
+    def _dump_rom_from_cache(self, filename, epilogue_id, num_bytes, spot_check):
+        entry = self.cache.lookup(epilogue_id, num_bytes)
+        if entry is None:
+            return None
+
+        if spot_check:
+            # The device always streams the ROM from its start, so the
+            # checked banks are the first ones
+            check_size = min(spot_check * SPOT_CHECK_BANK_SIZE, num_bytes)
+            prefix = cu.read_rom(
+                self.gbop_device,
+                check_size,
+                quiet=True,
+                metrics=self.metrics,
+                transfer_packets=self.transfer_profile["transfer_packets"],
+            )
+            self.bytes_transferred += check_size
+            if bytes(prefix[:check_size]) != self.cache.read_prefix(entry, check_size):
+                self.printer.warning(
+                    "The cached ROM does not match the cartridge, dumping it."
+                )
+                return None
+
+        digests = self.cache.fetch(epilogue_id, num_bytes, filename)
+        if digests is None:
+            return None
+        self.printer.success(
+            f"ROM copied from cache to:\t[dark_cyan]{filename}[/dark_cyan]"
+        )
+        digests["confirmed_bytes"] = digests["size"]
+        digests["cached"] = True
+        return digests
 
+    @synchronized
     @check_initialized
     @release_device
     @get_cartridge_info
-    def read_save(self, cartridge_info=None):
+    def read_save(self, sink=None, cartridge_info=None):
         num_bytes = cartridge_info["RAM_size"]
         if num_bytes == 0:
             self.printer.error("No RAM (save) detected on this cartridge.")
             return None
         else:
             # with self.printer.status("Reading save..."):
-            return cu.read_save(self.gbop_device, num_bytes, quiet=self.quiet)
+            save = cu.read_save(
+                self.gbop_device,
+                num_bytes,
+                quiet=self.quiet,
+                sink=sink,
+                progress=self.progress,
+                metrics=self.metrics,
+                transfer_packets=self.transfer_profile["transfer_packets"],
+            )
+            self.bytes_transferred += num_bytes
+            return save
 
+    @synchronized
     def dump_save(self, filename):
-        save = self.read_save()
-        if save is not None:
-            with open(filename, "wb") as f:
-                f.write(save)
-            self.printer.success(f"Save dumped to:\t[dark_cyan]{filename}[/dark_cyan]")
+        with AtomicHashWriter(filename) as writer:
+            save = self.read_save(sink=writer)
+            if save is None:
+                writer.discard()
+                return None
+        self.printer.success(f"Save dumped to:\t[dark_cyan]{filename}[/dark_cyan]")
+        return writer.digests()
 
+    @synchronized
     @check_initialized
     @release_device
     @get_cartridge_info
@@ -126,7 +537,123 @@ class CartridgeReader(object):
             )
             return None
         # with self.printer.status("Writing save..."):
-        return cu.write_save(self.gbop_device, data, quiet=self.quiet)
+        out = cu.write_save(
+            self.gbop_device,
+            data,
+            quiet=self.quiet,
+            window=self.transfer_profile["write_window"],
+            progress=self.progress,
+            metrics=self.metrics,
+            sleep=self.transfer_profile["write_sleep"],
+        )
+        self.bytes_transferred += num_bytes
+        return out
+
+    @synchronized
+    @check_initialized
+    @release_device
+    @get_cartridge_info
+    def calibrate(self, write=False, save=True, store=None, cartridge_info=None):
+        """
+        Measure the fastest stable transfer settings, see `tuning.calibrate`
+
+        The profile is used by this reader and, if `save` is set, stored and
+        reused by later runs with the same device on this host.
+
+        Parameters
+        ----------
+        write : bool, optional. Also calibrate save writes by writing the
+            current save back to the cartridge many times. It is backed up
+            to `store` first
+        save : bool, optional
+        store : SaveStore, optional. `SaveStore()` by default
+
+        Returns
+        -------
+        dict, profile
+        """
+        save_data = None
+        backup = None
+        if write and cartridge_info["RAM_size"] != 0:
+            save_data = bytes(
+                cu.read_save(
+                    self.gbop_device,
+                    cartridge_info["RAM_size"],
+                    quiet=True,
+                    transfer_packets=self.transfer_profile["transfer_packets"],
+                )
+            )
+            if store is None:
+                from .save_store import SaveStore
+
+                store = SaveStore()
+            backup = store.backup(epilogue_id_from_info(cartridge_info), save_data)
+            self.printer.print(
+                f"Save backed up before calibrating writes: version {backup['version']}"
+            )
+        try:
+            with self.printer.status("Calibrating transfers..."):
+                profile = tuning.calibrate(
+                    self.gbop_device,
+                    cartridge_info["ROM_size"],
+                    save_data=save_data,
+                    printer=self.printer,
+                )
+        except Exception:
+            if backup is not None:
+                self.printer.error(
+                    "Calibration failed, if the save is damaged restore it with "
+                    f"`restore_save(store, {backup['version']})`."
+                )
+            raise
+        finally:
+            tuning.apply_profile(self.gbop_device, self.transfer_profile)
+
+        self.transfer_profile = profile
+        tuning.apply_profile(self.gbop_device, profile)
+        if save:
+            tuning.save_profile(self.gbop_device, profile)
+        self.printer.success(
+            "Transfer profile: {transfer_packets} packets per transfer, "
+            "{write_window} packets in flight, {write_sleep_us:.0f} us between "
+            "packets, {timeout} ms timeout".format(
+                write_sleep_us=profile["write_sleep"] * 1e6, **profile
+            )
+        )
+        return profile
+
+    @synchronized
+    def backup_save(self, store):
+        """
+        Back up the save to a `save_store.SaveStore`
+
+        Returns
+        -------
+        dict, the stored version, or None if the cartridge has no save
+        """
+        save = self.read_save()
+        if save is None:
+            return None
+        epilogue_id = self.get_epilogue_id()
+        version = store.backup(epilogue_id, save)
+        self.printer.success(
+            f"Save backed up:\t[dark_cyan]{epilogue_id} version {version['version']}"
+            f"[/dark_cyan] ({version['new_bytes']} new bytes)"
+        )
+        return version
+
+    @synchronized
+    def restore_save(self, store, version=None):
+        """
+        Write a version of the save from a `save_store.SaveStore`
+
+        Parameters
+        ----------
+        store : SaveStore
+        version : int, optional. Latest version by default
+        """
+        data = store.restore(self.get_epilogue_id(), version)
+        return self.write_save(data)
 
     def write_save_from_file(self, filename):
         with open(filename, "rb") as f:
@@ -138,25 +665,58 @@ class CartridgeReader(object):
                 f"Save written from:\t[dark_cyan]{filename}[/dark_cyan]"
             )
 
+    @synchronized
     def close(self):
         self.gbop_device.attach_kernel_driver(0)
 
+    @synchronized
     @check_initialized
     @get_cartridge_info
     def get_epilogue_id(self, cartridge_info=None):
-        epilogue_id = (
-            cartridge_info["title_first_letter"].upper()
-            + "{:02x}".format(cartridge_info["heasder_checksum"]).upper()
-            + binascii.hexlify(cartridge_info["global_checksum"]).decode().upper()
+        return epilogue_id_from_info(cartridge_info)
+
+
+def epilogue_id_from_info(cartridge_info):
+    epilogue_id = (
+        cartridge_info["title_first_letter"].upper()
+        + "{:02x}".format(cartridge_info["heasder_checksum"]).upper()
+        + binascii.hexlify(cartridge_info["global_checksum"]).decode().upper()
+    )
+    return epilogue_id
+
+
+def check_same_cartridge(header, cartridge_info):
+    """
+    Check that a ROM header is the one of the cartridge of `cartridge_info`
+
+    A session keeps the cartridge info it read first, a ROM read with the
+    header of another cartridge tells that the cartridge was swapped.
+
+    Parameters
+    ----------
+    header : bytes-like, start of the ROM. Shorter than a header, it is not
+        checked
+    cartridge_info : dict
+
+    Raises
+    ------
+    Exception, if the header is from another cartridge
+    """
+    if len(header) < codec.HEADER_SIZE:
+        return
+    if codec.epilogue_id_from_header(header) != epilogue_id_from_info(cartridge_info):
+        raise Exception(
+            "The cartridge was changed, its info will be read again. "
+            "Run the operation again."
         )
-        return epilogue_id
 
 
-def file_crc32(filename):
+def file_crc32(filename, chunk_size=1 << 20):
+    out = 0
     with open(filename, "rb") as f:
-        data = f.read()
-    out = binascii.crc32(data) & 0xFFFFFFFF
-    return hex(out)
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            out = binascii.crc32(chunk, out)
+    return hex(out & 0xFFFFFFFF)
 
 
 def bytearray_crc32(data):
@@ -165,13 +725,7 @@ def bytearray_crc32(data):
 
 
 def create_crc_db(filename):
-    with open(filename, "r") as f:
-        content = f.read()
-    game_regex = re.compile(
-        r'game \(\n\tcomment "(.*)"\n\tpublisher "(.*)"\n\trom \( crc (.*) \)\n\)'
-    )
-    games = game_regex.findall(content)
-    db = {}
-    for game in games:
-        db[game[2]] = game
-    return db
+    # See `dat_index.DatIndex` for the prebuilt index of the bundled DATs
+    from .dat_index import parse_dat
+
+    return {game[2]: game for game in parse_dat(filename)}
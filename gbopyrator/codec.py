@@ -0,0 +1,206 @@
+import functools
+import struct
+import zlib
+from .constants import MBC_TYPES, RAM_TYPES, ROM_TYPES
+
+# Every frame is a 60 bytes payload followed by its little endian CRC32/MPEG-2
+FRAME_SIZE = 64
+PAYLOAD_SIZE = 60
+
+COMMAND_ROM_READ = 0x00
+COMMAND_SAVE_READ = 0x02
+COMMAND_SAVE_WRITE = 0x03
+COMMAND_CARTRIDGE_INFO = 0x04
+
+# Offset of the little endian size field of the triggers
+SIZE_OFFSETS = {
+    COMMAND_ROM_READ: 2,
+    COMMAND_SAVE_READ: 5,
+    COMMAND_SAVE_WRITE: 6,
+}
+
+# Sent by the host to acknowledge a ROM window
+HOST_ACK = bytes(FRAME_SIZE)
+
+# Size of the ROM header, up to the global checksum
+HEADER_SIZE = 0x150
+
+# Header byte telling whether the ROM supports the Game Boy Color
+CGB_FLAG_OFFSET = 0x143
+
+# Names of the No-Intro DATs
+GB_PLATFORM = "Nintendo - Game Boy"
+GBC_PLATFORM = "Nintendo - Game Boy Color"
+
+_SIZE = struct.Struct("<I")
+_REVERSED_BITS = bytes(int("{:08b}".format(byte)[::-1], 2) for byte in range(256))
+
+
+def _reflect32(value):
+    return int.from_bytes(
+        value.to_bytes(4, byteorder="little").translate(_REVERSED_BITS),
+        byteorder="big",
+    )
+
+
+def crc32_mpeg2(data, value=None):
+    """
+    CRC32/MPEG-2 of `data`
+
+    CRC32/MPEG-2 is the bit reflected counterpart of the zlib CRC32: the
+    bits of every byte are reversed with one table lookup pass, and the CRC
+    itself runs in zlib's C implementation, so whole payloads are cheap to
+    check.
+
+    Parameters
+    ----------
+    data : bytes-like
+    value : int, optional. CRC of the preceding data, to checksum a payload
+        in several chunks
+
+    Returns
+    -------
+    int
+    """
+    if not isinstance(data, (bytes, bytearray)):
+        data = bytes(data)
+    start = 0 if value is None else _reflect32(value ^ 0xFFFFFFFF)
+    return _reflect32(zlib.crc32(data.translate(_REVERSED_BITS), start)) ^ 0xFFFFFFFF
+
+
+def encode_frame(payload):
+    """
+    Pad `payload` to 60 bytes and append its CRC
+
+    Parameters
+    ----------
+    payload : bytes-like, at most 60 bytes
+
+    Returns
+    -------
+    bytes, 64 bytes
+    """
+    if len(payload) > PAYLOAD_SIZE:
+        raise ValueError(f"Frame payload larger than {PAYLOAD_SIZE} bytes")
+    frame = bytearray(FRAME_SIZE)
+    frame[: len(payload)] = payload
+    _SIZE.pack_into(frame, PAYLOAD_SIZE, crc32_mpeg2(bytes(frame[:PAYLOAD_SIZE])))
+    return bytes(frame)
+
+
+@functools.lru_cache(maxsize=64)
+def encode_trigger(command, size=0):
+    """
+    Trigger frame of a command
+
+    Frames are immutable and cached: the cartridge info trigger and the
+    triggers of the usual ROM and save sizes are only built once.
+
+    Parameters
+    ----------
+    command : int, one of the `COMMAND_*` constants
+    size : int, optional. Bytes to transfer
+
+    Returns
+    -------
+    bytes, 64 bytes
+    """
+    frame = bytearray(PAYLOAD_SIZE)
+    frame[0] = command
+    if command in SIZE_OFFSETS:
+        _SIZE.pack_into(frame, SIZE_OFFSETS[command], size)
+    return encode_frame(frame)
+
+
+def check_frame(frame):
+    """
+    Check the length and CRC of a frame
+
+    Parameters
+    ----------
+    frame : bytes-like
+
+    Returns
+    -------
+    bool
+    """
+    return len(frame) == FRAME_SIZE and crc32_mpeg2(
+        frame[:PAYLOAD_SIZE]
+    ) == _SIZE.unpack_from(frame, PAYLOAD_SIZE)[0]
+
+
+def decode_cartridge_info(response):
+    """
+    Decode the response to the cartridge info trigger
+
+    Parameters
+    ----------
+    response : bytes-like, at least 20 bytes
+
+    Returns
+    -------
+    dict, or None if no cartridge is inserted
+
+    Raises
+    ------
+    NotImplementedError, for GBA cartridges
+    """
+    # check if received_data is all null bytes
+    if not (response[3] or response[4]):
+        return None
+
+    if response[2] != 0x20:
+        raise NotImplementedError("GBA cartridge support not implemented yet")
+
+    return {
+        "cartridge_type": "GB/GBC",
+        "ROM_size": int.from_bytes(response[5:8], byteorder="little"),
+        "RAM_size": int.from_bytes(response[9:12], byteorder="little"),
+        "title_first_letter": chr(response[13]),
+        "MBC_type": MBC_TYPES[response[14]],
+        "ROM_type": ROM_TYPES[response[15]],
+        "RAM_type": RAM_TYPES[response[16]],
+        "heasder_checksum": response[17],
+        "global_checksum": bytearray(response[18:20]),
+    }
+
+
+def platform_from_header(header):
+    """
+    No-Intro platform of a ROM image, from the CGB flag of its header
+
+    The ROMs supporting the Game Boy Color, including the dual mode ones,
+    are listed in the Game Boy Color DAT.
+
+    Parameters
+    ----------
+    header : bytes-like, the first 0x144 bytes of the ROM. A shorter one is
+        taken for a Game Boy ROM
+
+    Returns
+    -------
+    str, `GBC_PLATFORM` or `GB_PLATFORM`
+    """
+    if len(header) > CGB_FLAG_OFFSET and header[CGB_FLAG_OFFSET] & 0x80:
+        return GBC_PLATFORM
+    return GB_PLATFORM
+
+
+def epilogue_id_from_header(header):
+    """
+    Epilogue ID of a ROM image, the same as
+    `cartridge_utils.epilogue_id_from_info` gives for its cartridge
+
+    Parameters
+    ----------
+    header : bytes-like, at least the first 0x150 bytes of the ROM
+
+    Returns
+    -------
+    str
+    """
+    return (
+        chr(header[0x134]).upper()
+        + "{:02X}".format(header[0x14D])
+        + bytes(header[0x14E:0x150]).hex().upper()
+    )
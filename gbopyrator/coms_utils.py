@@ -1,9 +1,12 @@
 import usb.core
 import time
-from crccheck.crc import Crc32Mpeg2
-from .constants import MBC_TYPES, RAM_TYPES, ROM_TYPES
-from rich.progress import Progress
+import array
+import binascii
+from . import codec
+from . import hotplug
 import warnings
+from contextlib import nullcontext
+from .progress import make_tracker
 
 
 # Endpoints definitiions for USB Bulk IN and OUT
@@ -19,91 +22,55 @@ GB_OPERATOR_PRODUCT_ID = 0x123d
 OLD_GB_OPERATOR_VENDOR_ID = 0x1D50
 OLD_GB_OPERATOR_PRODUCT_ID = 0x6018
 
-# Trigger sequence
-TRIGGER_CARTRIDGE_INFO = bytearray(
-    [
-        0x04,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-    ]
-)
-TRIGGER_SAVE_READ = bytearray(
-    [
-        0x02,
-        0x01,
-        0x00,
-        0x00,
-        0x00,
-        0x01,
-        0x00,
-        0x02,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-        0x00,
-    ]
-)
+# Size of a full speed USB bulk packet
+USB_PACKET_SIZE = 64
+
+# The GB Operator waits for an ACK every 320 packets when streaming a ROM
+ACK_PACKET_INTERVAL = 320
+
+# Number of save packets sent before their ACKs are drained. One packet
+# per ACK is the cadence the firmware is known to handle; a larger window
+# is only used once `tuning.calibrate` recorded it for the device
+WRITE_WINDOW = 1
+
+# Pause after every save packet sent (in seconds), the cadence the firmware
+# is known to handle
+WRITE_SLEEP = 0.0001
+
+# Packets requested per bulk IN transfer, at most one ACK window
+TRANSFER_PACKETS = ACK_PACKET_INTERVAL
+
+# USB timeout in milliseconds, pyusb's default
+USB_TIMEOUT = 1000
+
+# Retries of a ROM read after a USB timeout, with an exponential backoff
+TRANSFER_RETRIES = 3
+RETRY_BACKOFF = 0.5
+
+# Bounds of the backoff when polling for a GB Operator to be plugged in
+POLL_MIN_INTERVAL = 0.01
+POLL_MAX_INTERVAL = 1.0
+# With a hotplug monitor, the bus is only rescanned on its events, or after
+# this many seconds without one in case an event was lost
+HOTPLUG_RESCAN_INTERVAL = 60.0
+
+# Check the CRC of the ACKs of the device. Off by default: the framing of
+# the ACKs is only known from the simulator, not confirmed on hardware
+CHECK_ACKS = False
+
+
+class TransferError(Exception):
+    """
+    A bulk transfer did not complete
+
+    Attributes
+    ----------
+    confirmed_bytes : int, bytes received (or handed to the sink) before the failure
+    """
+
+    def __init__(self, message, confirmed_bytes=0):
+        super().__init__(message)
+        self.confirmed_bytes = confirmed_bytes
 
 
 def _craft_save_write_trigger(save_size):
@@ -116,21 +83,9 @@ def _craft_save_write_trigger(save_size):
 
     Returns
     -------
-    bytearray
+    bytes
     """
-
-    save_size_bytearray = save_size.to_bytes(
-        (save_size.bit_length() + 7) // 8, byteorder="little"
-    )
-    trigger_save_write = bytearray([0x03, 0x00, 0x00, 0x00, 0x00, 0x00])
-    trigger_save_write += save_size_bytearray
-
-    # Add 0x00 to reach 60 bytes
-    pad_legnth = 60 - len(trigger_save_write)
-    trigger_save_write += bytearray([0x00] * pad_legnth)
-    # Add CRC32
-    trigger_save_write = add_crc32(trigger_save_write)
-    return trigger_save_write
+    return codec.encode_trigger(codec.COMMAND_SAVE_WRITE, save_size)
 
 
 def _craft_rom_read_trigger(rom_size):
@@ -143,21 +98,9 @@ def _craft_rom_read_trigger(rom_size):
 
     Returns
     -------
-    bytearray
+    bytes
     """
-
-    rom_size_bytearray = rom_size.to_bytes(
-        (rom_size.bit_length() + 7) // 8, byteorder="little"
-    )
-    trigger_rom_read = bytearray([0x00, 0x00])
-    trigger_rom_read += rom_size_bytearray
-
-    # Add 0x00 to reach 60 bytes
-    pad_legnth = 60 - len(trigger_rom_read)
-    trigger_rom_read += bytearray([0x00] * pad_legnth)
-    # Add CRC32
-    trigger_rom_read = add_crc32(trigger_rom_read)
-    return trigger_rom_read
+    return codec.encode_trigger(codec.COMMAND_ROM_READ, rom_size)
 
 
 def _craft_save_read_trigger(save_size):
@@ -170,21 +113,9 @@ def _craft_save_read_trigger(save_size):
 
     Returns
     -------
-    bytearray
+    bytes
     """
-
-    save_size_bytearray = save_size.to_bytes(
-        (save_size.bit_length() + 7) // 8, byteorder="little"
-    )
-    trigger_save_read = bytearray([0x02, 0x00, 0x00, 0x00, 0x00])
-    trigger_save_read += save_size_bytearray
-
-    # Add 0x00 to reach 60 bytes
-    pad_legnth = 60 - len(trigger_save_read)
-    trigger_save_read += bytearray([0x00] * pad_legnth)
-    # Add CRC32
-    trigger_save_read = add_crc32(trigger_save_read)
-    return trigger_save_read
+    return codec.encode_trigger(codec.COMMAND_SAVE_READ, save_size)
 
 
 def add_crc32(data):
@@ -199,9 +130,7 @@ def add_crc32(data):
     -------
     bytearray
     """
-    crc = Crc32Mpeg2.calc(data)
-    bytes_crc = crc.to_bytes((crc.bit_length() + 7) // 8, byteorder="little")
-    return data + bytes_crc
+    return data + codec.crc32_mpeg2(data).to_bytes(4, byteorder="little")
 
 
 def find_gb_operator():
@@ -237,10 +166,77 @@ def find_gb_operator():
 
 
 
+def find_gb_operators():
+    """
+    Find every GB Operator device connected to the host
+
+    Returns
+    -------
+    list of usb.core.Device, devices with firmware v9.0+ first
+    """
+    found_devices = list(
+        usb.core.find(
+            find_all=True,
+            idVendor=GB_OPERATOR_VENDOR_ID,
+            idProduct=GB_OPERATOR_PRODUCT_ID,
+        )
+    )
+    found_old_devices = list(
+        usb.core.find(
+            find_all=True,
+            idVendor=OLD_GB_OPERATOR_VENDOR_ID,
+            idProduct=OLD_GB_OPERATOR_PRODUCT_ID,
+        )
+    )
+    if found_old_devices:
+        warnings.warn("Found GB Operator with old firmware. Please update it with Playback from epilogue.co")
+    return found_devices + found_old_devices
+
+
+def get_device_id(gbop_device):
+    """
+    Stable identifier of a GB Operator device
+
+    The identifier is built from the bus number and the port path, so it
+    does not change when the device is re-enumerated on the same port. The
+    serial number is appended when it can be read.
+
+    Parameters
+    ----------
+    gbop_device : usb.core.Device
+
+    Returns
+    -------
+    str, e.g. "1-3.2-0123456789"
+    """
+    try:
+        port_numbers = gbop_device.port_numbers
+    except (usb.core.USBError, NotImplementedError):
+        port_numbers = None
+    if port_numbers:
+        port_path = ".".join(str(port) for port in port_numbers)
+    else:
+        port_path = "a{}".format(gbop_device.address)
+    device_id = "{}-{}".format(gbop_device.bus, port_path)
+
+    try:
+        serial_number = gbop_device.serial_number
+    except (usb.core.USBError, ValueError, NotImplementedError):
+        serial_number = None
+    if serial_number:
+        device_id += "-" + serial_number
+    return device_id
+
+
 def find_gb_operator_blocking(timeout=0):
     """
     Block while GB Operator device if not found
 
+    On Linux the bus is only scanned again when the kernel or udev reports
+    that a GB Operator was plugged in, or every `HOTPLUG_RESCAN_INTERVAL`
+    in case an event was lost. Elsewhere the bus is polled with an
+    exponential backoff, from `POLL_MIN_INTERVAL` to `POLL_MAX_INTERVAL`.
+
     Parameters
     ----------
     timeout : int, optional. If timeout = 0, will nerver timeout
@@ -249,22 +245,38 @@ def find_gb_operator_blocking(timeout=0):
     -------
     usb.core.Device
     """
+    deadline = time.monotonic() + timeout if timeout != 0 else None
+    monitor = hotplug.open_monitor(
+        [
+            (GB_OPERATOR_VENDOR_ID, GB_OPERATOR_PRODUCT_ID),
+            (OLD_GB_OPERATOR_VENDOR_ID, OLD_GB_OPERATOR_PRODUCT_ID),
+        ]
+    )
+    interval = POLL_MIN_INTERVAL
 
-    if timeout == 0:
-        while True:
-            gbop_device = find_gb_operator()
-            if gbop_device is not None:
-                return gbop_device
-            time.sleep(1)
-    else:
-        start = time.time()
+    try:
         while True:
             gbop_device = find_gb_operator()
             if gbop_device is not None:
                 return gbop_device
-            time.sleep(1)
-            if time.time() - start > timeout:
-                raise TimeoutError("Unable to find GB Operator device")
+
+            max_wait = POLL_MAX_INTERVAL if monitor is None else HOTPLUG_RESCAN_INTERVAL
+            if deadline is None:
+                wait = max_wait
+            else:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("Unable to find GB Operator device")
+                wait = min(max_wait, remaining)
+
+            if monitor is not None:
+                monitor.wait(timeout=wait)
+            else:
+                time.sleep(min(interval, wait))
+                interval = min(interval * 2, POLL_MAX_INTERVAL)
+    finally:
+        if monitor is not None:
+            monitor.close()
 
 
 def init_gb_operator(gbop_device):
@@ -291,205 +303,603 @@ def init_gb_operator(gbop_device):
     return gbop_device
 
 
-def read_bulk_in(gbop_device, num_bytes=0, with_ack=False, quiet=False):
+def _readinto(gbop_device, view, buffers):
     """
-    Read data from GB Operator device
+    Fill `view` with one multi-packet bulk IN transfer
+
+    pyusb only reads into a whole `array.array`, from its start and for its
+    full length, and slicing an `array.array` copies it. The transfer thus
+    lands in a preallocated buffer of the transfer size, which is copied
+    once into the destination view. Buffers are kept in `buffers` by size,
+    so a read allocates one per distinct transfer size.
 
     Parameters
     ----------
     gbop_device : usb.core.Device
-    num_bytes : int, optional
+    view : memoryview
+    buffers : dict, `array.array` buffers by size, filled as needed
 
     Returns
     -------
-    bytearray
+    int, number of bytes received
+    """
+    num_bytes = len(view)
+    transfer = buffers.get(num_bytes)
+    if transfer is None:
+        transfer = buffers[num_bytes] = array.array("B", bytes(num_bytes))
+    received = gbop_device.read(IN_ENDPOINT, transfer)
+    view[:received] = memoryview(transfer)[:received]
+    return received
+
+
+def _send_trigger(gbop_device, trigger, metrics=None):
+    if metrics is None:
+        gbop_device.write(OUT_ENDPOINT, trigger)
+        return
+    start = time.perf_counter()
+    gbop_device.write(OUT_ENDPOINT, trigger)
+    metrics.observe("trigger", time.perf_counter() - start)
+
+
+def _read_ack(gbop_device, confirmed_bytes=0):
+    # The device ACKs are read in 2 times, 60 bytes then the 4 bytes CRC
+    ack = gbop_device.read(IN_ENDPOINT, 60)
+    crc = gbop_device.read(IN_ENDPOINT, 4)
+    if CHECK_ACKS and not codec.check_frame(ack + crc):
+        raise TransferError(
+            "Corrupted ACK from the GB Operator", confirmed_bytes=confirmed_bytes
+        )
+
+
+def _burn_ack(gbop_device, metrics=None):
+    if metrics is None:
+        _read_ack(gbop_device)
+        return
+    start = time.perf_counter()
+    _read_ack(gbop_device)
+    metrics.observe("ack", time.perf_counter() - start)
+
+
+def read_bulk_in(
+    gbop_device,
+    num_bytes=0,
+    with_ack=False,
+    quiet=False,
+    sink=None,
+    progress=None,
+    metrics=None,
+    transfer_packets=TRANSFER_PACKETS,
+):
     """
-    received_data = bytearray([])
+    Read data from GB Operator device
+
+    The destination buffer is allocated once and filled in place. Packets are
+    requested in multi-packet transfers of up to `transfer_packets` packets,
+    and a transfer never spans one of the ROM read ACKs.
 
-    # Read data until GB Operator stops responding
-    iteration = 0
+    When a `sink` is given, only one window is kept in memory: each window is
+    handed to `sink` as a memoryview as soon as it is received, and the
+    buffer is reused for the next one.
 
-    with Progress(disable=quiet, transient=True) as progress:
-        task = progress.add_task("Reading...", total=num_bytes)
+    Parameters
+    ----------
+    gbop_device : usb.core.Device
+    num_bytes : int, optional
+    with_ack : bool, optional. Send an ACK every `ACK_PACKET_INTERVAL` packets
+    quiet : bool, optional
+    sink : callable, optional. Called with every received chunk
+    progress : callable, optional. Called as `progress(bytes_done, total,
+        elapsed)` at a bounded rate, see `progress.ProgressTracker`. A rich
+        progress bar is displayed by default unless `quiet` is set
+    metrics : metrics.TransferMetrics, optional. Record the time spent in
+        every phase of the transfer
+    transfer_packets : int, optional. Packets per bulk IN transfer
+
+    Returns
+    -------
+    bytearray, or the number of bytes received if `sink` is set
 
-        while len(received_data) < num_bytes:
-            progress.update(task, advance=64)
+    Raises
+    ------
+    TransferError, if the device stops responding, or sends a corrupted ACK
+        when `CHECK_ACKS` is set
+    """
+    # The device only sends full packets, round up to the next packet
+    num_packets = -(-num_bytes // USB_PACKET_SIZE)
+    total_size = num_packets * USB_PACKET_SIZE
+    window_size = ACK_PACKET_INTERVAL * USB_PACKET_SIZE
+    if not 0 < transfer_packets <= ACK_PACKET_INTERVAL:
+        raise ValueError(
+            f"transfer_packets must be between 1 and {ACK_PACKET_INTERVAL}"
+        )
+    transfer_size = transfer_packets * USB_PACKET_SIZE
+
+    if sink is None:
+        received_data = bytearray(total_size)
+    else:
+        received_data = bytearray(min(window_size, total_size))
+    view = memoryview(received_data)
+    buffers = {}
+
+    tracker = make_tracker(progress, quiet, num_bytes, "Reading...")
+
+    offset = 0
+    with tracker if tracker is not None else nullcontext():
+
+        while offset < total_size:
+            # Never let a transfer run past the next ACK boundary
+            window_offset = offset % window_size
+            chunk_size = min(
+                window_size - window_offset, total_size - offset, transfer_size
+            )
+            start = offset if sink is None else window_offset
             try:
-                usbpacket_data = gbop_device.read(IN_ENDPOINT, 64)
-                received_data += bytearray(usbpacket_data)
-                iteration += 1
+                if metrics is not None:
+                    phase_start = time.perf_counter()
+                received = _readinto(
+                    gbop_device, view[start : start + chunk_size], buffers
+                )
+                if metrics is not None:
+                    metrics.observe("payload", time.perf_counter() - phase_start)
+                offset += received
+                if tracker is not None:
+                    tracker.update(min(offset, num_bytes))
+
+                if offset % window_size and offset < total_size:
+                    # Keep reading the rest of the window
+                    continue
+
+                if sink is not None:
+                    if metrics is not None:
+                        phase_start = time.perf_counter()
+                    sink(view[: window_offset + received])
+                    if metrics is not None:
+                        metrics.observe("sink", time.perf_counter() - phase_start)
+
+                if with_ack and (offset % window_size == 0):
+                    if metrics is not None:
+                        phase_start = time.perf_counter()
+                    # send ACK
+                    gbop_device.write(OUT_ENDPOINT, codec.HOST_ACK)
+                    # read ACK
+                    try:
+                        _read_ack(gbop_device, confirmed_bytes=offset)
+                    except TransferError:
+                        view.release()
+                        raise
+                    if metrics is not None:
+                        metrics.observe(
+                            "ack_window", time.perf_counter() - phase_start
+                        )
             except usb.core.USBTimeoutError:
-                print("USBTimeoutError")
-                return received_data
-            if with_ack and (iteration % 320 == 0):
-                # send ACK
-                gbop_device.write(OUT_ENDPOINT, bytearray([0x00] * 64))
-                # read ACK
-                _ = gbop_device.read(IN_ENDPOINT, 60)
-                _ = gbop_device.read(IN_ENDPOINT, 4)
-
+                if metrics is not None:
+                    metrics.increment("usb_timeouts")
+                view.release()
+                # Only complete windows have been handed to the sink
+                confirmed_bytes = offset
+                if sink is not None:
+                    confirmed_bytes -= offset % window_size
+                raise TransferError(
+                    f"USB timeout after {offset} of {total_size} bytes",
+                    confirmed_bytes=confirmed_bytes,
+                )
+
+    view.release()
+    if sink is not None:
+        return offset
     return received_data
 
 
-def write_bulk_out(gbop_device, data, qiuet=False):
+def write_bulk_out(
+    gbop_device,
+    data,
+    quiet=False,
+    window=WRITE_WINDOW,
+    progress=None,
+    metrics=None,
+    sleep=WRITE_SLEEP,
+):
     """
     Write data to GB Operator device
 
+    Up to `window` packets are sent, pausing `sleep` seconds after each of
+    them, before their ACKs are drained, in order, one 60 + 4 bytes ACK per
+    packet. The default window of one packet writes in lockstep with the
+    ACKs.
+
     Parameters
     ----------
     gbop_device : usb.core.Device
     data : bytearray
+    quiet : bool, optional
+    window : int, optional. Number of packets in flight
+    progress : callable, optional. See `read_bulk_in`
+    metrics : metrics.TransferMetrics, optional. See `read_bulk_in`
+    sleep : float, optional. Pause after every packet, in seconds
+
+    Returns
+    -------
+    dict, time spent sending data and waiting for ACKs (in seconds)
+
+    Raises
+    ------
+    TransferError, if the device sends a corrupted ACK and `CHECK_ACKS` is
+        set
     """
-    with Progress(disable=qiuet, transient=True) as progress:
-        task = progress.add_task("Writing...", total=len(data))
+    if window < 1:
+        raise ValueError("window must be at least 1")
+
+    view = memoryview(data)
+    window_size = window * USB_PACKET_SIZE
+    stats = {"bytes": len(data), "packets": 0, "send_time": 0.0, "ack_time": 0.0}
 
-        # Write data to GB Operator in chunks of 64 bytes
-        for sequence in range(0, len(data), 64):
-            progress.update(task, advance=64)
-            gbop_device.write(OUT_ENDPOINT, data[sequence : sequence + 64])
-            time.sleep(0.0001)
-            # Read 64 bytes from GB Operator
-            _ = gbop_device.read(IN_ENDPOINT, 60)
-            _ = gbop_device.read(IN_ENDPOINT, 4)
+    tracker = make_tracker(progress, quiet, len(data), "Writing...")
 
+    with tracker if tracker is not None else nullcontext():
 
-def read_cartridge_info(gbop_device):
+        start = time.perf_counter()
+        for sequence in range(0, len(data), window_size):
+            chunk = view[sequence : sequence + window_size]
+            num_packets = -(-len(chunk) // USB_PACKET_SIZE)
+
+            # Send the whole window
+            send_start = time.perf_counter()
+            for packet in range(0, len(chunk), USB_PACKET_SIZE):
+                packet_data = chunk[packet : packet + USB_PACKET_SIZE]
+                gbop_device.write(OUT_ENDPOINT, packet_data)
+                if sleep:
+                    time.sleep(sleep)
+            ack_start = time.perf_counter()
+
+            # Drain one ACK per packet sent
+            for _ in range(num_packets):
+                _read_ack(gbop_device, confirmed_bytes=sequence)
+            ack_end = time.perf_counter()
+
+            stats["packets"] += num_packets
+            stats["send_time"] += ack_start - send_start
+            stats["ack_time"] += ack_end - ack_start
+            if metrics is not None:
+                metrics.observe("write_send", ack_start - send_start)
+                metrics.observe("write_ack", ack_end - ack_start)
+            if tracker is not None:
+                tracker.update(sequence + len(chunk))
+
+        stats["total_time"] = time.perf_counter() - start
+
+    view.release()
+    return stats
+
+
+def read_cartridge_info(gbop_device, metrics=None):
     """
     Read cartridge info from GB Operator device
 
     Parameters
     ----------
     gbop_device : usb.core.Device
+    metrics : metrics.TransferMetrics, optional. See `read_bulk_in`
 
     Returns
     -------
     dict
     """
+    if metrics is not None:
+        start = time.perf_counter()
+
     # Send trigger_bytes
-    gbop_device.write(OUT_ENDPOINT, add_crc32(TRIGGER_CARTRIDGE_INFO))
+    _send_trigger(
+        gbop_device, codec.encode_trigger(codec.COMMAND_CARTRIDGE_INFO), metrics
+    )
 
     # Burn the ACK
-    _ = gbop_device.read(IN_ENDPOINT, 60)
-    _ = gbop_device.read(IN_ENDPOINT, 4)
+    _burn_ack(gbop_device, metrics)
 
     # Read card data from GB Operator
-    received_data = read_bulk_in(gbop_device, num_bytes=256, quiet=True)
-
-    # Extract card info only
-    received_data = received_data[:60]
-
-    # check if received_data is all null bytes
-    if not (received_data[3] or received_data[4]):
-        return None
-
-    if received_data[2] == 0x20:
-        # Parse data
-        cartridge_info = {
-            "cartridge_type": "GB/GBC",
-            "ROM_size": int.from_bytes(received_data[5:8], byteorder="little"),
-            "RAM_size": int.from_bytes(received_data[9:12], byteorder="little"),
-            "title_first_letter": chr(received_data[13]),
-            "MBC_type": MBC_TYPES[received_data[14]],
-            "ROM_type": ROM_TYPES[received_data[15]],
-            "RAM_type": RAM_TYPES[received_data[16]],
-            "heasder_checksum": received_data[17],
-            "global_checksum": received_data[18:20],
-        }
-    else:
-        cartridge_info = {
-            "cartridge_type": "GBA",
-            # "ROM_size": int.from_bytes(received_data[5:8], byteorder="little"),
-            # "RAM_size": int.from_bytes(received_data[9:12], byteorder="little"),
-        }
-        raise NotImplementedError("GBA cartridge support not implemented yet")
-
-    return cartridge_info
-
-
-def read_save(gbop_device, num_bytes, quiet=False):
+    received_data = read_bulk_in(
+        gbop_device, num_bytes=256, quiet=True, metrics=metrics
+    )
+    if metrics is not None:
+        metrics.record_operation(
+            "read_cartridge_info", len(received_data), time.perf_counter() - start
+        )
+
+    return codec.decode_cartridge_info(received_data)
+
+
+def read_save(
+    gbop_device,
+    num_bytes,
+    quiet=False,
+    sink=None,
+    progress=None,
+    metrics=None,
+    transfer_packets=TRANSFER_PACKETS,
+):
     """
     Dump save file from GB Operator device
 
     Parameters
     ----------
     gbop_device : usb.core.Device
-    filename : str
+    num_bytes : int
+    quiet : bool, optional
+    sink : callable, optional. Stream the save to `sink`, see `read_bulk_in`
+    progress : callable, optional. See `read_bulk_in`
+    metrics : metrics.TransferMetrics, optional. See `read_bulk_in`
+    transfer_packets : int, optional. See `read_bulk_in`
+
+    Returns
+    -------
+    bytearray, or the number of bytes received if `sink` is set
     """
+    if metrics is not None:
+        start = time.perf_counter()
+
     # craft trigger bytes
     trigger_save_read = _craft_save_read_trigger(num_bytes)
 
     # Send trigger_bytes
-    gbop_device.write(OUT_ENDPOINT, trigger_save_read)
+    _send_trigger(gbop_device, trigger_save_read, metrics)
 
     # Burn the first 64 bytes
-    # Burn first 64 bytes in 2 times
-    _ = gbop_device.read(IN_ENDPOINT, 60)
-    _ = gbop_device.read(IN_ENDPOINT, 4)
+    _burn_ack(gbop_device, metrics)
 
     # Read data from GB Operator
-    received_data = read_bulk_in(gbop_device, num_bytes=num_bytes, quiet=quiet)
+    received_data = read_bulk_in(
+        gbop_device,
+        num_bytes=num_bytes,
+        quiet=quiet,
+        sink=sink,
+        progress=progress,
+        metrics=metrics,
+        transfer_packets=transfer_packets,
+    )
 
-    return bytearray(received_data)
+    if metrics is not None:
+        metrics.record_operation("read_save", num_bytes, time.perf_counter() - start)
+    return received_data
 
 
-def write_save(gbop_device, bytearray_data, quiet=False):
+def write_save(
+    gbop_device,
+    bytearray_data,
+    quiet=False,
+    window=WRITE_WINDOW,
+    progress=None,
+    metrics=None,
+    sleep=WRITE_SLEEP,
+):
     """
     Write save file to GB Operator device
 
     Parameters
     ----------
     gbop_device : usb.core.Device
-    filename : str
+    bytearray_data : bytearray
+    quiet : bool, optional
+    window : int, optional. Number of packets in flight, see `write_bulk_out`
+    progress : callable, optional. See `read_bulk_in`
+    metrics : metrics.TransferMetrics, optional. See `read_bulk_in`
+    sleep : float, optional. Pause after every packet, see `write_bulk_out`
+
+    Returns
+    -------
+    dict, write timings as returned by `write_bulk_out`
     """
+    if metrics is not None:
+        start = time.perf_counter()
+
     # craft trigger bytes
     trigger_save_write = _craft_save_write_trigger(len(bytearray_data))
 
     # Send trigger_bytes
-    gbop_device.write(OUT_ENDPOINT, trigger_save_write)
+    _send_trigger(gbop_device, trigger_save_write, metrics)
 
     # Burn the first 64 bytes
-    # Burn first 64 bytes in 2 times
-    _ = gbop_device.read(IN_ENDPOINT, 60)
-    _ = gbop_device.read(IN_ENDPOINT, 4)
+    _burn_ack(gbop_device, metrics)
 
     # Write data to GB Operator
-    write_bulk_out(gbop_device, bytearray_data, qiuet=quiet)
-
-    return True
-
+    stats = write_bulk_out(
+        gbop_device,
+        bytearray_data,
+        quiet=quiet,
+        window=window,
+        progress=progress,
+        metrics=metrics,
+        sleep=sleep,
+    )
 
-def read_rom(gbop_device, num_bytes, quiet=False):
+    if metrics is not None:
+        metrics.record_operation(
+            "write_save", len(bytearray_data), time.perf_counter() - start
+        )
+    return stats
+
+
+def read_rom(
+    gbop_device,
+    num_bytes,
+    quiet=False,
+    sink=None,
+    progress=None,
+    metrics=None,
+    transfer_packets=TRANSFER_PACKETS,
+):
     """
     Dump ROM from GB Operator device
 
     Parameters
     ----------
     gbop_device : usb.core.Device
-    filename : str
+    num_bytes : int
+    quiet : bool, optional
+    sink : callable, optional. Stream the ROM to `sink`, see `read_bulk_in`
+    progress : callable, optional. See `read_bulk_in`
+    metrics : metrics.TransferMetrics, optional. See `read_bulk_in`
+    transfer_packets : int, optional. See `read_bulk_in`
+
+    Returns
+    -------
+    bytearray, or the number of bytes received if `sink` is set
     """
+    if metrics is not None:
+        start = time.perf_counter()
+
     # craft trigger bytes
     trigger_rom_read = _craft_rom_read_trigger(num_bytes)
 
     # Send trigger_bytes
-    gbop_device.write(OUT_ENDPOINT, trigger_rom_read)
+    _send_trigger(gbop_device, trigger_rom_read, metrics)
 
     # Burn first 64 bytes in 2 times
-    _ = gbop_device.read(IN_ENDPOINT, 60)
-    _ = gbop_device.read(IN_ENDPOINT, 4)
+    _burn_ack(gbop_device, metrics)
 
     # Send "ACK" to GB Operator
-    gbop_device.write(OUT_ENDPOINT, bytearray([0x00] * 64))
+    _send_trigger(gbop_device, codec.HOST_ACK, metrics)
 
     # Burn first 64 bytes a second time
-    _ = gbop_device.read(IN_ENDPOINT, 60)
-    _ = gbop_device.read(IN_ENDPOINT, 4)
+    _burn_ack(gbop_device, metrics)
 
     # Read data from GB Operator
     received_data = read_bulk_in(
-        gbop_device, num_bytes=num_bytes, with_ack=True, quiet=quiet
+        gbop_device,
+        num_bytes=num_bytes,
+        with_ack=True,
+        quiet=quiet,
+        sink=sink,
+        progress=progress,
+        metrics=metrics,
+        transfer_packets=transfer_packets,
     )
 
-    return bytearray(received_data)
+    if metrics is not None:
+        metrics.record_operation("read_rom", num_bytes, time.perf_counter() - start)
+    return received_data
+
+
+def claim_gb_operator(gbop_device):
+    """
+    Claim the GB Operator interface
+
+    Parameters
+    ----------
+    gbop_device : usb.core.Device
+    """
+    usb.util.claim_interface(gbop_device, 0)
+
+
+def drain_bulk_in(gbop_device, timeout=100):
+    """
+    Discard whatever the GB Operator still has to send
+
+    Parameters
+    ----------
+    gbop_device : usb.core.Device
+    timeout : int, optional. Milliseconds of silence that end the drain
+    """
+    while True:
+        try:
+            gbop_device.read(
+                IN_ENDPOINT, ACK_PACKET_INTERVAL * USB_PACKET_SIZE, timeout
+            )
+        except usb.core.USBTimeoutError:
+            return
+
+
+def read_rom_with_retry(
+    gbop_device,
+    num_bytes,
+    sink,
+    window_crcs=None,
+    retries=TRANSFER_RETRIES,
+    backoff=RETRY_BACKOFF,
+    quiet=False,
+    progress=None,
+    metrics=None,
+    transfer_packets=TRANSFER_PACKETS,
+):
+    """
+    Stream a ROM to `sink`, retrying from the last complete ACK window
+
+    Every ACK window handed to `sink` is confirmed and its CRC32 appended to
+    `window_crcs`. After a USB timeout the device is drained and the read
+    is triggered again: the trigger has no start address, so the windows
+    already confirmed are read again, checked against their CRC32 and
+    skipped. Passing the `window_crcs` of an interrupted dump resumes it.
+
+    Parameters
+    ----------
+    gbop_device : usb.core.Device
+    num_bytes : int
+    sink : callable, called with every new window
+    window_crcs : list of int, optional. CRC32 of the confirmed windows,
+        updated in place
+    retries : int, optional
+    backoff : float, optional. Seconds before the first retry, doubled after
+        each failure
+    quiet : bool, optional
+    progress : callable, optional. See `read_bulk_in`
+    metrics : metrics.TransferMetrics, optional. See `read_bulk_in`, retries
+        are counted as well
+    transfer_packets : int, optional. See `read_bulk_in`
+
+    Returns
+    -------
+    list of int, CRC32 of every window
+
+    Raises
+    ------
+    TransferError, once the retries are exhausted. Its `confirmed_bytes`
+    counts the bytes handed to the sink, including earlier attempts.
+    ValueError, if a confirmed window reads differently
+    """
+    if window_crcs is None:
+        window_crcs = []
+    window_size = ACK_PACKET_INTERVAL * USB_PACKET_SIZE
+
+    def checked_sink(chunk):
+        index = checked_sink.offset // window_size
+        checked_sink.offset += len(chunk)
+        crc = binascii.crc32(chunk)
+        if index < len(window_crcs):
+            if crc != window_crcs[index]:
+                raise ValueError(
+                    f"ROM window {index} differs from the confirmed data, "
+                    "was the cartridge changed?"
+                )
+            return
+        sink(chunk)
+        window_crcs.append(crc)
+
+    attempt = 0
+    while True:
+        checked_sink.offset = 0
+        try:
+            read_rom(
+                gbop_device,
+                num_bytes,
+                quiet=quiet,
+                sink=checked_sink,
+                progress=progress,
+                metrics=metrics,
+                transfer_packets=transfer_packets,
+            )
+            return window_crcs
+        except (TransferError, usb.core.USBTimeoutError) as e:
+            if metrics is not None and isinstance(e, usb.core.USBTimeoutError):
+                # Timeouts outside of read_bulk_in, while burning an ACK
+                metrics.increment("usb_timeouts")
+            attempt += 1
+            if attempt > retries:
+                raise TransferError(
+                    f"ROM read failed after {retries} retries: {e}",
+                    confirmed_bytes=min(len(window_crcs) * window_size, num_bytes),
+                )
+            if metrics is not None:
+                metrics.increment("retries")
+            time.sleep(backoff * 2 ** (attempt - 1))
+            drain_bulk_in(gbop_device)
 
 
 def release_gb_operator(gbop_device):
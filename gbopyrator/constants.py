@@ -48,3 +48,8 @@ RAM_TYPES = {
     0x04: {"SRAM_size_info": "128 KiB", "info": "16 banks of 8 KiB each"},
     0x05: {"SRAM_size_info": "64 KiB", "info": "8 banks of 8 KiB each"},
 }
+
+# Size in bytes of the RAM for each key of `RAM_TYPES`
+RAM_SIZES = {0x00: 0, 0x02: 0x2000, 0x03: 0x8000, 0x04: 0x20000, 0x05: 0x10000}
+
+ROM_BANK_SIZE = 0x4000
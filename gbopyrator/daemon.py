@@ -0,0 +1,285 @@
+"""
+Long-lived GB Operator daemon and its client
+
+The daemon owns the device, an open session and the ROM database for its
+whole lifetime. Clients connect to a Unix domain socket and send requests as
+JSON lines:
+
+    {"command": "dump_rom", "args": {"filename": "/abs/path/rom.gb"}}
+
+Requests are queued and run one at a time. For each request the daemon
+streams back JSON lines: a "queued" event, "progress" events, then a
+"result" or an "error" event. Several requests can be sent on the same
+connection, one after the other.
+
+This module only imports the device stack when the daemon starts, so that
+the client stays cheap to start.
+"""
+
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+
+# Seconds between two checks that the worker is alive, while a client waits
+# for the events of its request
+WORKER_CHECK_INTERVAL = 1.0
+
+COMMANDS = (
+    "info",
+    "dump_rom",
+    "dump_save",
+    "write_save",
+    "backup_save",
+    "restore_save",
+)
+
+
+class DaemonError(Exception):
+    pass
+
+
+def default_socket_path():
+    runtime_directory = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_directory:
+        return os.path.join(runtime_directory, "gbopyrator.sock")
+    return os.path.join("/tmp", "gbopyrator-{}.sock".format(os.getuid()))
+
+
+def _jsonable(value):
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex()
+    if isinstance(value, dict):
+        return {key: _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    return value
+
+
+class _Job(object):
+    def __init__(self, command, args):
+        self.command = command
+        self.args = args
+        self.events = queue.Queue()
+
+
+class GBOperatorDaemon(object):
+    """
+    Serve GB Operator requests over a Unix domain socket
+
+    Parameters
+    ----------
+    socket_path : str, optional. `default_socket_path()` by default
+    reader : CartridgeReader, optional. Initialized reader to serve, the
+        first GB Operator plugged in by default
+    """
+
+    def __init__(self, socket_path=None, reader=None):
+        self.socket_path = socket_path or default_socket_path()
+        self.reader = reader
+        self.roms_db = None
+        self.save_store = None
+        self.jobs = queue.Queue()
+        self._current_job = None
+        self._server = None
+        self._worker = None
+
+    def serve_forever(self):
+        from . import load_roms_db
+        from .cartridge_utils import CartridgeReader
+        from .save_store import SaveStore
+
+        if self.reader is None:
+            self.reader = CartridgeReader(quiet=True)
+            self.reader.initialize_reader(blocking=True)
+        # Progress events are throttled by `progress.ProgressTracker`
+        self.reader.progress = self._progress
+        self.roms_db = load_roms_db()
+        self.save_store = SaveStore()
+
+        self._remove_stale_socket()
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                daemon._handle(self.rfile, self.wfile)
+
+        # Private from the start: other users must never be able to connect,
+        # even between bind() and chmod()
+        umask = os.umask(0o077)
+        try:
+            server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        finally:
+            os.umask(umask)
+        server.daemon_threads = True
+        os.chmod(self.socket_path, 0o600)
+        self._server = server
+
+        self._worker = threading.Thread(target=self._run_jobs, name="gbopyrator-daemon")
+        self._worker.start()
+        try:
+            server.serve_forever()
+        finally:
+            self.jobs.put(None)
+            self._worker.join()
+            server.server_close()
+            os.remove(self.socket_path)
+            self.reader.close()
+
+    def shutdown(self):
+        # serve_forever must be stopped from another thread
+        threading.Thread(target=self._server.shutdown).start()
+
+    def _remove_stale_socket(self):
+        if not os.path.exists(self.socket_path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.remove(self.socket_path)
+        else:
+            raise DaemonError(f"A daemon is already listening on {self.socket_path}")
+        finally:
+            probe.close()
+
+    def _handle(self, rfile, wfile):
+        def send(event):
+            wfile.write(json.dumps(_jsonable(event)).encode() + b"\n")
+            wfile.flush()
+
+        for line in rfile:
+            try:
+                request = json.loads(line)
+                command = request["command"]
+                args = request.get("args", {})
+            except (ValueError, KeyError, TypeError):
+                send({"event": "error", "error": "Malformed request"})
+                continue
+
+            if command == "ping":
+                send({"event": "result", "result": "pong"})
+            elif command == "shutdown":
+                send({"event": "result", "result": "shutting down"})
+                self.shutdown()
+            elif command not in COMMANDS:
+                send({"event": "error", "error": f"Unknown command {command!r}"})
+            elif not self._worker.is_alive():
+                send({"event": "error", "error": "The daemon worker stopped"})
+            else:
+                job = _Job(command, args)
+                self.jobs.put(job)
+                send({"event": "queued", "position": self.jobs.qsize()})
+                while True:
+                    try:
+                        event = job.events.get(timeout=WORKER_CHECK_INTERVAL)
+                    except queue.Empty:
+                        if self._worker.is_alive():
+                            continue
+                        event = {"event": "error", "error": "The daemon worker stopped"}
+                    send(event)
+                    if event["event"] in ("result", "error"):
+                        break
+
+    def _progress(self, bytes_done, total, elapsed):
+        job = self._current_job
+        if job is not None:
+            job.events.put(
+                {
+                    "event": "progress",
+                    "bytes_done": bytes_done,
+                    "total": total,
+                    "elapsed": elapsed,
+                }
+            )
+
+    def _run_jobs(self):
+        # The worker owns the device: a single session for the daemon lifetime
+        with self.reader.session():
+            while True:
+                job = self.jobs.get()
+                if job is None:
+                    return
+                self._current_job = job
+                try:
+                    result = self._execute(job.command, job.args)
+                    job.events.put({"event": "result", "result": result})
+                except Exception as e:
+                    job.events.put({"event": "error", "error": repr(e)})
+                finally:
+                    self._current_job = None
+
+    def _execute(self, command, args):
+        reader = self.reader
+        # Cartridges may be swapped between requests
+        cartridge_info = reader.read_cartridge_info()
+        if cartridge_info is None:
+            raise DaemonError("No cartridge inserted")
+
+        if command == "info":
+            epilogue_id = reader.get_epilogue_id()
+            return {
+                "epilogue_id": epilogue_id,
+                "cartridge_info": cartridge_info,
+                "rom_info": self.roms_db.get(epilogue_id),
+            }
+        if command == "dump_rom":
+            return reader.dump_rom(
+                args["filename"],
+                resume=args.get("resume", False),
+                spot_check=args.get("spot_check", 0),
+            )
+        if command == "dump_save":
+            return reader.dump_save(args["filename"])
+        if command == "write_save":
+            with open(args["filename"], "rb") as file:
+                return reader.write_save(file.read())
+        if command == "backup_save":
+            return reader.backup_save(self.save_store)
+        if command == "restore_save":
+            return reader.restore_save(self.save_store, args.get("version"))
+
+
+def request(command, socket_path=None, on_event=None, **args):
+    """
+    Send a request to the daemon and wait for its result
+
+    Parameters
+    ----------
+    command : str
+    socket_path : str, optional. `default_socket_path()` by default
+    on_event : callable, optional. Called with every "queued" and
+        "progress" event
+    **args : arguments of the command. File names must be absolute, as the
+        daemon does not share the working directory of the client
+
+    Returns
+    -------
+    result of the command
+
+    Raises
+    ------
+    DaemonError, if the daemon is not running or the request failed
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            sock.connect(socket_path or default_socket_path())
+        except (ConnectionRefusedError, FileNotFoundError):
+            raise DaemonError("The gbopyrator daemon is not running")
+        with sock.makefile("rwb") as stream:
+            stream.write(json.dumps({"command": command, "args": args}).encode() + b"\n")
+            stream.flush()
+            for line in stream:
+                event = json.loads(line)
+                if event["event"] == "result":
+                    return event["result"]
+                if event["event"] == "error":
+                    raise DaemonError(event["error"])
+                if on_event is not None:
+                    on_event(event)
+    finally:
+        sock.close()
+    raise DaemonError("The daemon closed the connection")
@@ -0,0 +1,154 @@
+import os
+import re
+import sqlite3
+import sys
+from urllib.parse import quote
+
+DAT_FIELDS = ("title", "publisher", "platform")
+
+_HEADER_NAME = re.compile(r'^\s*name "(.*)"')
+_GAME = re.compile(
+    r'^game \(\s*comment "(.*)"\s*publisher "(.*)"\s*rom \( crc ([0-9A-Fa-f]{8}) \)',
+    re.MULTILINE,
+)
+
+_SELECT_GAMES = "SELECT {} FROM games WHERE crc32 = ?".format(", ".join(DAT_FIELDS))
+
+
+def parse_dat(filename):
+    """
+    Games of a clrmamepro DAT, such as the No-Intro ones
+
+    Returns
+    -------
+    list of tuple (title, publisher, crc), with the CRC as written in the DAT
+    """
+    with open(filename, "r") as file:
+        return _GAME.findall(file.read())
+
+
+def dat_platform(filename):
+    """
+    Name of the DAT, from its clrmamepro header
+    """
+    with open(filename, "r") as file:
+        for line in file:
+            match = _HEADER_NAME.match(line)
+            if match:
+                return match.group(1)
+            if line.startswith("game ("):
+                break
+    return os.path.splitext(os.path.basename(filename))[0]
+
+
+def _crc_value(crc32):
+    if isinstance(crc32, str):
+        return int(crc32, 16)
+    return crc32 & 0xFFFFFFFF
+
+
+class DatIndex(object):
+    """
+    Read-only CRC32 index of the known good dumps of the No-Intro DATs
+
+    Like `roms_db.RomsDatabase`, the database is only opened on the first
+    lookup, and a lookup only reads the pages of the primary key index
+    holding its CRC.
+
+    Parameters
+    ----------
+    filename : str, path to an index built with `build_dat_index`
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._connection = None
+        self._platforms = None
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            path = os.path.abspath(self.filename).replace(os.sep, "/")
+            if not path.startswith("/"):
+                path = "/" + path
+            uri = "file:{}?mode=ro&immutable=1".format(quote(path, safe="/:"))
+            self._connection = sqlite3.connect(
+                uri, uri=True, check_same_thread=False
+            )
+        return self._connection
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def lookup(self, crc32):
+        """
+        Known good dumps with this CRC32
+
+        Parameters
+        ----------
+        crc32 : int, or str in hexadecimal as in the dump digests
+
+        Returns
+        -------
+        list of dict, with the title, publisher and platform of each game. A
+        few DATs list the same image under several titles.
+        """
+        rows = self.connection.execute(_SELECT_GAMES, (_crc_value(crc32),))
+        return [dict(zip(DAT_FIELDS, row)) for row in rows]
+
+    @property
+    def platforms(self):
+        """
+        Names of the DATs in the index, a CRC32 missing from the index only
+        tells a bad dump for these platforms
+        """
+        if self._platforms is None:
+            rows = self.connection.execute("SELECT DISTINCT platform FROM games")
+            self._platforms = frozenset(row[0] for row in rows)
+        return self._platforms
+
+    def __contains__(self, crc32):
+        row = self.connection.execute(
+            "SELECT 1 FROM games WHERE crc32 = ?", (_crc_value(crc32),)
+        ).fetchone()
+        return row is not None
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+
+
+def build_dat_index(dat_filenames, filename):
+    """
+    Build the CRC32 index of DAT files
+
+    Parameters
+    ----------
+    dat_filenames : list of str, clrmamepro DAT files
+    filename : str
+    """
+    games = set()
+    for dat_filename in dat_filenames:
+        platform = dat_platform(dat_filename)
+        for title, publisher, crc in parse_dat(dat_filename):
+            games.add((int(crc, 16), title, publisher, platform))
+
+    if os.path.exists(filename):
+        os.remove(filename)
+    connection = sqlite3.connect(filename)
+    with connection:
+        connection.execute(
+            "CREATE TABLE games (crc32 INTEGER, {}, PRIMARY KEY (crc32, title)) "
+            "WITHOUT ROWID".format(", ".join(DAT_FIELDS))
+        )
+        connection.executemany(
+            "INSERT OR IGNORE INTO games VALUES (?, ?, ?, ?)", sorted(games)
+        )
+    connection.execute("VACUUM")
+    connection.close()
+
+
+if __name__ == "__main__":
+    # python -m gbopyrator.dat_index gb_db.dat gba_db.dat no_intro_crc.sqlite
+    build_dat_index(sys.argv[1:-1], sys.argv[-1])
@@ -0,0 +1,123 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from . import coms_utils as cu
+from .cartridge_utils import CartridgeReader
+
+
+class DevicePool(object):
+    """
+    Drive every GB Operator connected to the host
+
+    Each device gets its own `CartridgeReader`, keyed by the stable device
+    ID from `coms_utils.get_device_id`. Jobs run on one worker thread per
+    device, inside a device session.
+    """
+
+    def __init__(self, quiet=True):
+        self.quiet = quiet
+        self.readers = {}
+
+    def discover(self):
+        """
+        Find and initialize the GB Operators that are not in the pool yet
+
+        Returns
+        -------
+        list of str, IDs of all the devices in the pool
+        """
+        for dev in cu.find_gb_operators():
+            device_id = cu.get_device_id(dev)
+            if device_id in self.readers:
+                continue
+            reader = CartridgeReader(quiet=self.quiet)
+            reader.initialize_reader(device=dev)
+            self.readers[device_id] = reader
+        return list(self.readers)
+
+    def run(self, job):
+        """
+        Run `job` on every device at once
+
+        Parameters
+        ----------
+        job : callable, called as `job(device_id, reader)`
+
+        Returns
+        -------
+        dict, per device results and throughput, and aggregate throughput
+        """
+        if not self.readers:
+            raise ValueError("No GB Operator in the pool, call discover() first")
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(self.readers)) as executor:
+            futures = {
+                device_id: executor.submit(_run_job, job, device_id, reader)
+                for device_id, reader in self.readers.items()
+            }
+            devices = {
+                device_id: future.result() for device_id, future in futures.items()
+            }
+        elapsed = time.perf_counter() - start
+
+        total_bytes = sum(device["bytes"] for device in devices.values())
+        return {
+            "devices": devices,
+            "bytes": total_bytes,
+            "elapsed": elapsed,
+            "throughput": total_bytes / elapsed if elapsed > 0 else 0.0,
+        }
+
+    def dump_all(self, rom_template=None, save_template=None):
+        """
+        Dump the ROM and/or the save of every cartridge in the pool
+
+        Templates are formatted with `device_id` and `epilogue_id`, e.g.
+        "dumps/{epilogue_id}_{device_id}.gb".
+
+        Parameters
+        ----------
+        rom_template : str, optional
+        save_template : str, optional
+
+        Returns
+        -------
+        dict, see `run`
+        """
+
+        def dump(device_id, reader):
+            fields = {"device_id": device_id, "epilogue_id": reader.get_epilogue_id()}
+            digests = {}
+            if save_template is not None:
+                digests["save"] = reader.dump_save(save_template.format(**fields))
+            if rom_template is not None:
+                digests["rom"] = reader.dump_rom(rom_template.format(**fields))
+            return digests
+
+        return self.run(dump)
+
+    def close(self):
+        for reader in self.readers.values():
+            reader.close()
+        self.readers = {}
+
+
+def _run_job(job, device_id, reader):
+    start = time.perf_counter()
+    bytes_before = reader.bytes_transferred
+    result = None
+    error = None
+    try:
+        with reader.session():
+            result = job(device_id, reader)
+    except Exception as e:
+        error = repr(e)
+    elapsed = time.perf_counter() - start
+    num_bytes = reader.bytes_transferred - bytes_before
+    return {
+        "result": result,
+        "error": error,
+        "bytes": num_bytes,
+        "elapsed": elapsed,
+        "throughput": num_bytes / elapsed if elapsed > 0 else 0.0,
+    }
@@ -0,0 +1,215 @@
+import binascii
+import hashlib
+import json
+import os
+import re
+import uuid
+
+_UNSAFE_FILENAME_CHARACTERS = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+
+
+class AtomicHashWriter(object):
+    """
+    Write a file atomically while hashing its content
+
+    Data is written to a temporary file next to `filename`, then flushed,
+    fsynced and renamed over `filename` when the context exits without error.
+    CRC32, MD5 and SHA-1 are updated with every chunk, so the digests are
+    available as soon as the last chunk is written.
+
+    The writer is callable, so it can be used directly as the `sink` of
+    `coms_utils.read_rom` and `coms_utils.read_save`.
+
+    Parameters
+    ----------
+    filename : str
+    temp_filename : str, optional. A unique name next to `filename` by default
+    resume_size : int, optional. Keep the first `resume_size` bytes of an
+        existing `temp_filename` and append to them
+    resume_crcs : list of int, optional. CRC32 of each `resume_window_size`
+        bytes window of the kept data. The kept data is checked against them
+        on enter, and the write starts over if `temp_filename` is shorter
+        than `resume_size` or differs: `resume_size` is then None.
+    resume_window_size : int, optional
+    """
+
+    def __init__(
+        self,
+        filename,
+        temp_filename=None,
+        resume_size=None,
+        resume_crcs=None,
+        resume_window_size=None,
+    ):
+        self.filename = filename
+        self._unique_temp_filename = temp_filename is None
+        if temp_filename is None:
+            directory, basename = os.path.split(os.path.abspath(filename))
+            temp_filename = os.path.join(
+                directory, ".{}.{}.tmp".format(basename, uuid.uuid4().hex[:8])
+            )
+        self.temp_filename = temp_filename
+        self.resume_size = resume_size
+        self.resume_crcs = resume_crcs
+        self.resume_window_size = resume_window_size
+        # Keep the temporary file when the context exits with an error
+        self.keep_partial = False
+        self.file = None
+        self.size = 0
+        self._crc32 = 0
+        self._md5 = hashlib.md5()
+        self._sha1 = hashlib.sha1()
+        self._discarded = False
+
+    def __enter__(self):
+        if self.resume_size is None:
+            self.file = open(
+                self.temp_filename, "xb" if self._unique_temp_filename else "wb"
+            )
+            return self
+
+        # Hash the data kept from the interrupted write, then append to it
+        self.file = open(self.temp_filename, "r+b")
+        if self._check_resumed_data():
+            self.file.truncate(self.resume_size)
+            return self
+
+        # The kept data was lost or damaged, by a crash for instance
+        self.file.close()
+        self.file = open(self.temp_filename, "wb")
+        self.resume_size = None
+        self.size = 0
+        self._crc32 = 0
+        self._md5 = hashlib.md5()
+        self._sha1 = hashlib.sha1()
+        return self
+
+    def _check_resumed_data(self):
+        if os.fstat(self.file.fileno()).st_size < self.resume_size:
+            return False
+        chunk_size = self.resume_window_size or 1 << 20
+        index = 0
+        while self.size < self.resume_size:
+            chunk = self.file.read(min(chunk_size, self.resume_size - self.size))
+            if self.resume_crcs is not None and (
+                index >= len(self.resume_crcs)
+                or binascii.crc32(chunk) != self.resume_crcs[index]
+            ):
+                return False
+            self._update(chunk)
+            index += 1
+        return True
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None and not self._discarded:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+            os.replace(self.temp_filename, self.filename)
+            _fsync_directory(os.path.dirname(os.path.abspath(self.filename)))
+        else:
+            if self.keep_partial and not self._discarded:
+                # Durable before a journal records it as confirmed
+                self.file.flush()
+                os.fsync(self.file.fileno())
+            self.file.close()
+            if self._discarded or not self.keep_partial:
+                os.remove(self.temp_filename)
+
+    def write(self, data):
+        self.file.write(data)
+        self._update(data)
+
+    def _update(self, data):
+        self._crc32 = binascii.crc32(data, self._crc32)
+        self._md5.update(data)
+        self._sha1.update(data)
+        self.size += len(data)
+
+    __call__ = write
+
+    def discard(self):
+        """
+        Drop the temporary file instead of renaming it on exit
+        """
+        self._discarded = True
+
+    def digests(self):
+        """
+        Digests of the data written so far
+
+        Returns
+        -------
+        dict
+        """
+        return {
+            "size": self.size,
+            "crc32": "{:08x}".format(self._crc32 & 0xFFFFFFFF),
+            "md5": self._md5.hexdigest(),
+            "sha1": self._sha1.hexdigest(),
+        }
+
+
+def journal_filename(filename):
+    return filename + ".journal"
+
+
+def save_journal(filename, journal):
+    """
+    Save the resume journal of the dump of `filename`
+
+    Parameters
+    ----------
+    filename : str, dumped file
+    journal : dict
+    """
+    temp_filename = journal_filename(filename) + ".tmp"
+    with open(temp_filename, "w") as file:
+        json.dump(journal, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_filename, journal_filename(filename))
+    _fsync_directory(os.path.dirname(os.path.abspath(filename)))
+
+
+def load_journal(filename):
+    """
+    Load the resume journal of the dump of `filename`
+
+    Returns
+    -------
+    dict, or None if there is no journal
+    """
+    try:
+        with open(journal_filename(filename), "r") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def remove_journal(filename):
+    try:
+        os.remove(journal_filename(filename))
+    except FileNotFoundError:
+        pass
+
+
+def safe_filename(name):
+    """
+    `name` with the characters not allowed in file names replaced
+    """
+    return _UNSAFE_FILENAME_CHARACTERS.sub("_", name).strip() or "_"
+
+
+def _fsync_directory(directory):
+    # Make the rename durable, not supported on every platform
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
@@ -1,27 +1,168 @@
 # %%
 import argparse
-from .cartridge_utils import CartridgeReader
 from gbopyrator import load_roms_db
 
 # %%
 def main():
-    parser = argparse.ArgumentParser()
+    parser = argparse.ArgumentParser(prog="gbopyrator")
     parser.add_argument("--dump-rom", type=str, default=None, help="Dump ROM to file")
     parser.add_argument("--dump-save", type=str, default=None, help="Dump save to file")
     parser.add_argument(
         "--write-save", type=str, default=None, help="Write save from file"
     )
+    parser.add_argument(
+        "--backup-save",
+        action="store_true",
+        default=False,
+        help="Back up the save to the local versioned save store",
+    )
+    parser.add_argument(
+        "--restore-save",
+        type=str,
+        default=None,
+        metavar="VERSION",
+        help="Write a version of the save from the save store, or 'latest'",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        default=False,
+        help="Resume an interrupted ROM dump",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        default=False,
+        help="Copy known ROMs from the local dump cache instead of reading them",
+    )
+    parser.add_argument(
+        "--spot-check",
+        type=int,
+        default=0,
+        metavar="BANKS",
+        help="With --cache, read the first BANKS banks to confirm a cached ROM",
+    )
+    parser.add_argument(
+        "--calibrate",
+        action="store_true",
+        default=False,
+        help="Measure and store the fastest stable transfer settings",
+    )
+    parser.add_argument(
+        "--calibrate-write",
+        action="store_true",
+        default=False,
+        help="Calibrate, also tuning the save writes by writing the save back "
+        "to the cartridge, after backing it up to the save store",
+    )
+    parser.add_argument(
+        "--watch",
+        type=str,
+        default=None,
+        metavar="DIRECTORY",
+        help="Dump every cartridge inserted to DIRECTORY, until interrupted",
+    )
+    parser.add_argument(
+        "--rom-template",
+        type=str,
+        default=None,
+        help="ROM file name in watch mode, formatted with {epilogue_id}, {title} and {extension}",
+    )
+    parser.add_argument(
+        "--save-template",
+        type=str,
+        default=None,
+        help="Save file name in watch mode, formatted with {epilogue_id}, {title} and {save_crc32}",
+    )
+    parser.add_argument(
+        "--batch",
+        type=str,
+        default=None,
+        metavar="MANIFEST",
+        help="Run the steps of a JSON or TOML manifest in a single session",
+    )
+    parser.add_argument(
+        "--report",
+        type=str,
+        default=None,
+        help="With --batch, write the JSON report to this file instead of stdout "
+        "(the output is quiet when the report goes to stdout)",
+    )
+    parser.add_argument(
+        "--analyze",
+        type=str,
+        default=None,
+        metavar="ROM",
+        help="Check the integrity of a dumped ROM file, no device needed",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        default=False,
+        help="Keep the device open and serve requests on a local socket",
+    )
+    parser.add_argument(
+        "--connect",
+        action="store_true",
+        default=False,
+        help="Send the operations to a running daemon",
+    )
+    parser.add_argument(
+        "--socket",
+        type=str,
+        default=None,
+        help="Socket of the daemon, in $XDG_RUNTIME_DIR by default",
+    )
     parser.add_argument(
         "--quiet",
         action="store_true",
         default=False,
         help="Do not output anything to stdout",
     )
+    subparsers = parser.add_subparsers(dest="command")
+    scan_parser = subparsers.add_parser(
+        "scan", help="Index and identify the ROM files of a directory tree"
+    )
+    scan_parser.add_argument("directory", type=str)
+    scan_parser.add_argument(
+        "--index",
+        type=str,
+        default=None,
+        help="Incremental index file, scan_index.json in the directory by default",
+    )
+    scan_parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Processes hashing the files, one per CPU by default",
+    )
+    # Also accepted after the subcommand, without overriding a --quiet before it
+    scan_parser.add_argument(
+        "--quiet",
+        action="store_true",
+        default=argparse.SUPPRESS,
+        help="Do not output anything to stdout",
+    )
     args = parser.parse_args()
 
+    if args.connect:
+        # Only the lightweight client is imported
+        return run_client(args)
+    if args.analyze is not None:
+        return run_analysis(args)
+    if args.command == "scan":
+        return run_scan(args)
+
     # %%
 
-    cr = CartridgeReader(quiet=args.quiet)
+    # Imported here so that `--help` does not pay for pyusb and rich
+    from .cartridge_utils import CartridgeReader
+
+    if args.batch is not None and args.report is None:
+        # Nothing but the JSON report may go to stdout
+        args.quiet = True
+
+    cr = CartridgeReader(quiet=args.quiet, cache=args.cache)
 
     cr.printer.greetings()
 
@@ -29,60 +170,215 @@ def main():
         cr.printer.warning(
             "`dump-save` and `write-save` are both set. GBOpyrator will dump the save first and write it after."
         )
+    if args.daemon:
+        from .daemon import GBOperatorDaemon
+
+        cr.initialize_reader(blocking=True)
+        cr.quiet = True
+        cr.printer.print("Serving requests, press Ctrl+C to stop.")
+        try:
+            GBOperatorDaemon(args.socket, reader=cr).serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+
     cr.initialize_reader(blocking=True,timeout=10)
 
-    rom_epilogue_id = cr.get_epilogue_id()
-    roms_db = load_roms_db()
+    if args.batch is not None:
+        import json
+        from .batch import run_manifest
 
-    # Print cartridge info
-    if rom_epilogue_id in roms_db:
-        rom_info = roms_db[rom_epilogue_id]
-        # Center "rom info" text on =80 chars
-        cr.printer.print("")
-        cr.printer.rule("[blue_violet]CARTRIDGE INFO")
-        cr.printer.print(
-            f"""Detected game:\t[blue_violet]{rom_info['full_title']}[/blue_violet]"""
-        )
-        if rom_info["SGB_support"]:
-            cr.printer.print(f"""SGB support:\t[blue_violet]Yes[/blue_violet]""")
-        if rom_info["CGB_support"]:
-            cr.printer.print(f"""CGB support:\t[blue_violet]Yes[/blue_violet]""")
+        report = run_manifest(cr, args.batch, args.report)
+        if args.report is None:
+            print(json.dumps(report, indent=4))
+        cr.close()
+        return 0 if report["ok"] else 1
+
+    if args.watch is not None:
+        from .watch import CartridgeWatcher
+
+        templates = {}
+        if args.rom_template is not None:
+            templates["rom_template"] = args.rom_template
+        if args.save_template is not None:
+            templates["save_template"] = args.save_template
+        cr.printer.print("Watching for cartridges, press Ctrl+C to stop.")
+        stats = CartridgeWatcher(cr, args.watch, **templates).run()
         cr.printer.print(
-            f"""ROM size:\t[blue_violet]{rom_info['ROM_size']}[/blue_violet]"""
-        )
-        if rom_info["RAM_size"] != 0:
-            cr.printer.print(
-                f"""RAM size:\t[blue_violet]{rom_info['RAM_size']}[/blue_violet]"""
-            )
-    else:
-        cr.printer.warning(
-            f"ROM epilogue ID not found in the database. If you know the game, please add it to the database."
+            "{archived} archived, {skipped} skipped, {failed} failed "
+            "({per_hour:.0f} cartridges per hour)".format(**stats)
         )
+        cr.close()
+        return
 
-    # Print dumping/writing info
-    if (
+    has_operations = (
         args.dump_save is not None
         or args.dump_rom is not None
         or args.write_save is not None
-    ):
-        cr.printer.print("")
-        cr.printer.rule("[blue_violet]ROM AND SAVE OPERATIONS")
+        or args.backup_save
+        or args.restore_save is not None
+        or args.calibrate
+        or args.calibrate_write
+    )
+
+    # Claim the device and read the cartridge info only once for all steps,
+    # a ROM dump detects a cartridge swapped in between
+    with cr.session():
+        rom_epilogue_id = cr.get_epilogue_id()
+        roms_db = load_roms_db()
+
+        # Print cartridge info
+        if rom_epilogue_id in roms_db:
+            rom_info = roms_db[rom_epilogue_id]
+            # Center "rom info" text on =80 chars
+            cr.printer.print("")
+            cr.printer.rule("[blue_violet]CARTRIDGE INFO")
+            cr.printer.print(
+                f"""Detected game:\t[blue_violet]{rom_info['full_title']}[/blue_violet]"""
+            )
+            if rom_info["SGB_support"]:
+                cr.printer.print(f"""SGB support:\t[blue_violet]Yes[/blue_violet]""")
+            if rom_info["CGB_support"]:
+                cr.printer.print(f"""CGB support:\t[blue_violet]Yes[/blue_violet]""")
+            cr.printer.print(
+                f"""ROM size:\t[blue_violet]{rom_info['ROM_size']}[/blue_violet]"""
+            )
+            if rom_info["RAM_size"] != 0:
+                cr.printer.print(
+                    f"""RAM size:\t[blue_violet]{rom_info['RAM_size']}[/blue_violet]"""
+                )
+        else:
+            cr.printer.warning(
+                f"ROM epilogue ID not found in the database. If you know the game, please add it to the database."
+            )
+
+        # Print dumping/writing info
+        if has_operations:
+            cr.printer.print("")
+            cr.printer.rule("[blue_violet]ROM AND SAVE OPERATIONS")
+
+            if args.calibrate or args.calibrate_write:
+                cr.calibrate(write=args.calibrate_write)
+
+            if args.dump_save is not None:
+                cr.dump_save(args.dump_save)
 
-        if args.dump_save is not None:
-            cr.dump_save(args.dump_save)
+            if args.dump_rom is not None:
+                cr.dump_rom(
+                    args.dump_rom, resume=args.resume, spot_check=args.spot_check
+                )
 
-        if args.dump_rom is not None:
-            cr.dump_rom(args.dump_rom)
+            if args.backup_save or args.restore_save is not None:
+                from .save_store import SaveStore
 
-        if args.write_save is not None:
-            cr.write_save_from_file(args.write_save)
+                store = SaveStore()
+                if args.backup_save:
+                    cr.backup_save(store)
+                if args.restore_save is not None:
+                    version = (
+                        None if args.restore_save == "latest" else int(args.restore_save)
+                    )
+                    cr.restore_save(store, version)
 
+            if args.write_save is not None:
+                cr.write_save_from_file(args.write_save)
+
+    if has_operations:
         cr.close()
 
     cr.printer.print("")
 
 
+def run_analysis(args):
+    from .analysis import analyze_rom_file
+    from .printer import Printer
+
+    printer = Printer(quiet=args.quiet)
+    report = analyze_rom_file(args.analyze)
+    for error in report["errors"]:
+        printer.error(error)
+    for warning in report["warnings"]:
+        printer.warning(warning)
+    if report["ok"]:
+        printer.success(f"No integrity error in:\t[dark_cyan]{args.analyze}[/dark_cyan]")
+    return 0 if report["ok"] else 1
+
+
+def run_scan(args):
+    from .printer import Printer
+    from .scan import LibraryScanner
+
+    printer = Printer(quiet=args.quiet)
+    scanner = LibraryScanner(args.directory, args.index, workers=args.workers)
+    with printer.status("Scanning ROMs..."):
+        stats = scanner.scan()
+    for path, entry in scanner.index.items():
+        if "error" in entry:
+            printer.error(f"{path}: {entry['error']}")
+        elif entry["verified"] is False:
+            printer.warning(f"{path}: not a known good dump")
+    printer.success(
+        "{files} ROMs, {hashed} hashed, {known} in the ROM database, "
+        "{verified} verified good dumps, {unverifiable} not covered by the DATs "
+        "({elapsed:.1f} s)".format(**stats)
+    )
+    return 1 if stats["errors"] else 0
+
+
+def run_client(args):
+    import os
+    import sys
+    from .daemon import DaemonError, request
+
+    def on_event(event):
+        if event["event"] == "progress" and not args.quiet:
+            print(
+                "\r{bytes_done}/{total} bytes".format(**event), end="", file=sys.stderr
+            )
+
+    def run(command, **kwargs):
+        result = request(command, socket_path=args.socket, on_event=on_event, **kwargs)
+        if not args.quiet:
+            print("\r", end="", file=sys.stderr)
+            print(f"{command}: {result}")
+        return result
+
+    steps = []
+    if args.dump_save is not None:
+        steps.append(("dump_save", {"filename": os.path.abspath(args.dump_save)}))
+    if args.dump_rom is not None:
+        steps.append(
+            (
+                "dump_rom",
+                {
+                    "filename": os.path.abspath(args.dump_rom),
+                    "resume": args.resume,
+                    "spot_check": args.spot_check,
+                },
+            )
+        )
+    if args.backup_save:
+        steps.append(("backup_save", {}))
+    if args.restore_save is not None:
+        version = None if args.restore_save == "latest" else int(args.restore_save)
+        steps.append(("restore_save", {"version": version}))
+    if args.write_save is not None:
+        steps.append(("write_save", {"filename": os.path.abspath(args.write_save)}))
+    if not steps:
+        steps.append(("info", {}))
+
+    try:
+        for command, kwargs in steps:
+            run(command, **kwargs)
+    except DaemonError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
 # %%
 
 if __name__ == "__main__":
-    main()
+    import sys
+
+    sys.exit(main())
@@ -0,0 +1,127 @@
+import select
+import socket
+import struct
+import time
+
+# Netlink protocol of the kernel uevents (linux/netlink.h)
+NETLINK_KOBJECT_UEVENT = 15
+
+# Multicast groups: raw kernel events, and events re-broadcast by udev once
+# its rules (permissions) have been applied
+KERNEL_EVENTS_GROUP = 1
+UDEV_EVENTS_GROUP = 2
+
+# How long to wait for udev to apply its rules after a kernel event
+UDEV_SETTLE_TIMEOUT = 0.2
+
+_UDEV_MONITOR_PREFIX = b"libudev\x00"
+
+
+class UEventMonitor(object):
+    """
+    Wait for USB devices to be plugged in, through Linux uevents
+
+    Parameters
+    ----------
+    device_ids : list of (int, int), USB (vendor ID, product ID) to watch
+    """
+
+    def __init__(self, device_ids):
+        # The kernel formats PRODUCT as "vendor/product/bcdDevice" in hex
+        self.products = [
+            "{:x}/{:x}/".format(vendor_id, product_id)
+            for vendor_id, product_id in device_ids
+        ]
+        self.sock = socket.socket(
+            socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT
+        )
+        try:
+            self.sock.bind((0, KERNEL_EVENTS_GROUP | UDEV_EVENTS_GROUP))
+        except OSError:
+            self.sock.close()
+            raise
+
+    def close(self):
+        self.sock.close()
+
+    def wait(self, timeout=None):
+        """
+        Block until one of the watched devices is added
+
+        When the first event comes from the kernel, the monitor waits up to
+        `UDEV_SETTLE_TIMEOUT` for udev to announce the same device, so that
+        its permissions are set up when this method returns.
+
+        Parameters
+        ----------
+        timeout : float, optional. Wait forever if None
+
+        Returns
+        -------
+        bool, True if a device was added, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        added = False
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return added
+            readable, _, _ = select.select([self.sock], [], [], remaining)
+            if not readable:
+                return added
+
+            source, properties = _parse_uevent(self.sock.recv(8192))
+            if properties.get("ACTION") != "add" or not self._is_watched(properties):
+                continue
+            if source == "udev":
+                return True
+            if not added:
+                added = True
+                settle_deadline = time.monotonic() + UDEV_SETTLE_TIMEOUT
+                if deadline is None or settle_deadline < deadline:
+                    deadline = settle_deadline
+
+    def _is_watched(self, properties):
+        product = properties.get("PRODUCT", "")
+        return any(product.startswith(watched) for watched in self.products)
+
+
+def open_monitor(device_ids):
+    """
+    Open a uevent monitor if the platform supports it
+
+    Parameters
+    ----------
+    device_ids : list of (int, int), USB (vendor ID, product ID) to watch
+
+    Returns
+    -------
+    UEventMonitor, or None if uevents are not available
+    """
+    if not hasattr(socket, "AF_NETLINK"):
+        return None
+    try:
+        return UEventMonitor(device_ids)
+    except OSError:
+        return None
+
+
+def _parse_uevent(message):
+    if message.startswith(_UDEV_MONITOR_PREFIX):
+        # udev header: prefix, magic, header size, properties offset and length
+        properties_offset, properties_length = struct.unpack_from("=II", message, 16)
+        payload = message[properties_offset : properties_offset + properties_length]
+        source = "udev"
+    else:
+        # Kernel message: "action@devpath" followed by the properties
+        payload = message.split(b"\x00", 1)[-1]
+        source = "kernel"
+
+    properties = {}
+    for field in payload.split(b"\x00"):
+        key, sep, value = field.partition(b"=")
+        if sep:
+            properties[key.decode("ascii", "replace")] = value.decode(
+                "ascii", "replace"
+            )
+    return source, properties
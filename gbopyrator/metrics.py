@@ -0,0 +1,203 @@
+import bisect
+import json
+import os
+import threading
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class TransferMetrics(object):
+    """
+    Counters and latency histograms of the USB protocol
+
+    `coms_utils` records into it when it is passed as `metrics`:
+
+    - phases (histograms): `trigger` (trigger write), `ack` (60 + 4 bytes
+      ACK reads), `payload` (bulk data transfers), `ack_window` (host ACK
+      every `ACK_PACKET_INTERVAL` packets), `sink` (handing a chunk to the
+      sink, i.e. file writes and hashing for dumps), `write_send` and
+      `write_ack` (save writes)
+    - counters: `usb_timeouts`, `retries`
+    - operations: bytes, time and count per operation (`read_rom`,
+      `read_save`, `write_save`, `read_cartridge_info`)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counters = {}
+            self._histograms = {}
+            self._operations = {}
+
+    def increment(self, counter, value=1):
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + value
+
+    def observe(self, phase, seconds):
+        with self._lock:
+            histogram = self._histograms.get(phase)
+            if histogram is None:
+                histogram = self._histograms[phase] = {
+                    "buckets": [0] * (len(LATENCY_BUCKETS) + 1),
+                    "sum": 0.0,
+                    "count": 0,
+                    "max": 0.0,
+                }
+            histogram["buckets"][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+            if seconds > histogram["max"]:
+                histogram["max"] = seconds
+
+    def record_operation(self, operation, num_bytes, seconds):
+        with self._lock:
+            stats = self._operations.get(operation)
+            if stats is None:
+                stats = self._operations[operation] = {
+                    "count": 0,
+                    "bytes": 0,
+                    "seconds": 0.0,
+                }
+            stats["count"] += 1
+            stats["bytes"] += num_bytes
+            stats["seconds"] += seconds
+            stats["last_bytes_per_second"] = num_bytes / seconds if seconds > 0 else 0.0
+
+    def snapshot(self):
+        """
+        Copy of the metrics recorded so far
+
+        Returns
+        -------
+        dict
+        """
+        with self._lock:
+            histograms = {}
+            for phase, histogram in self._histograms.items():
+                histograms[phase] = {
+                    "buckets": dict(
+                        zip(
+                            [str(bound) for bound in LATENCY_BUCKETS] + ["+Inf"],
+                            histogram["buckets"],
+                        )
+                    ),
+                    "sum": histogram["sum"],
+                    "count": histogram["count"],
+                    "max": histogram["max"],
+                }
+            operations = {}
+            for operation, stats in self._operations.items():
+                operations[operation] = dict(stats)
+                operations[operation]["bytes_per_second"] = (
+                    stats["bytes"] / stats["seconds"] if stats["seconds"] > 0 else 0.0
+                )
+            return {
+                "counters": dict(self._counters),
+                "phases": histograms,
+                "operations": operations,
+            }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=4)
+
+    def to_prometheus(self):
+        """
+        Metrics in the Prometheus text exposition format
+
+        Returns
+        -------
+        str
+        """
+        snapshot = self.snapshot()
+        lines = [
+            "# HELP gbopyrator_phase_seconds Latency of the USB protocol phases",
+            "# TYPE gbopyrator_phase_seconds histogram",
+        ]
+        for phase, histogram in sorted(snapshot["phases"].items()):
+            cumulative = 0
+            for bound, count in histogram["buckets"].items():
+                cumulative += count
+                lines.append(
+                    'gbopyrator_phase_seconds_bucket{{phase="{}",le="{}"}} {}'.format(
+                        phase, bound, cumulative
+                    )
+                )
+            lines.append(
+                'gbopyrator_phase_seconds_sum{{phase="{}"}} {!r}'.format(
+                    phase, histogram["sum"]
+                )
+            )
+            lines.append(
+                'gbopyrator_phase_seconds_count{{phase="{}"}} {}'.format(
+                    phase, histogram["count"]
+                )
+            )
+
+        lines += [
+            "# HELP gbopyrator_events_total USB timeouts and retries",
+            "# TYPE gbopyrator_events_total counter",
+        ]
+        for counter, value in sorted(snapshot["counters"].items()):
+            lines.append(
+                'gbopyrator_events_total{{event="{}"}} {}'.format(counter, value)
+            )
+
+        operation_metrics = [
+            ("operations_total", "count", "counter", "Operations run"),
+            ("operation_bytes_total", "bytes", "counter", "Bytes transferred"),
+            ("operation_seconds_total", "seconds", "counter", "Time spent"),
+            ("operation_bytes_per_second", "bytes_per_second", "gauge", "Mean rate"),
+        ]
+        for name, key, metric_type, description in operation_metrics:
+            lines += [
+                "# HELP gbopyrator_{} {} per operation".format(name, description),
+                "# TYPE gbopyrator_{} {}".format(name, metric_type),
+            ]
+            for operation, stats in sorted(snapshot["operations"].items()):
+                lines.append(
+                    'gbopyrator_{}{{operation="{}"}} {!r}'.format(
+                        name, operation, stats[key]
+                    )
+                )
+        return "\n".join(lines) + "\n"
+
+    def export(self, filename, format="json"):
+        """
+        Write the metrics to a file, atomically
+
+        Parameters
+        ----------
+        filename : str
+        format : str, optional. "json" or "prometheus" (textfile collector)
+        """
+        if format == "json":
+            content = self.to_json()
+        elif format == "prometheus":
+            content = self.to_prometheus()
+        else:
+            raise ValueError(f"Unknown metrics format: {format}")
+        temp_filename = filename + ".tmp"
+        with open(temp_filename, "w") as file:
+            file.write(content)
+        os.replace(temp_filename, filename)
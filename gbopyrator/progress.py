@@ -0,0 +1,103 @@
+import time
+
+# Minimum number of seconds between two progress reports
+PROGRESS_INTERVAL = 0.1
+
+
+class ProgressTracker(object):
+    """
+    Report the progress of a transfer at a bounded rate
+
+    `callback(bytes_done, total, elapsed)` is called at most once every
+    `interval` seconds, and once more when the transfer completes. If the
+    callback has a `close` method, it is called when the tracker exits.
+
+    Parameters
+    ----------
+    callback : callable
+    total : int, number of bytes to transfer
+    interval : float, optional
+    """
+
+    def __init__(self, callback, total, interval=PROGRESS_INTERVAL):
+        self.callback = callback
+        self.total = total
+        self.interval = interval
+        self.bytes_done = 0
+        self._start = None
+        self._next_report = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        self._next_report = self._start
+        return self
+
+    def update(self, bytes_done):
+        self.bytes_done = bytes_done
+        now = time.perf_counter()
+        if now >= self._next_report:
+            self._next_report = now + self.interval
+            self.callback(bytes_done, self.total, now - self._start)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                self.callback(
+                    self.bytes_done, self.total, time.perf_counter() - self._start
+                )
+        finally:
+            close = getattr(self.callback, "close", None)
+            if close is not None:
+                close()
+
+
+class RichProgressBar(object):
+    """
+    Progress callback displaying a transient `rich` progress bar
+
+    Parameters
+    ----------
+    description : str, optional
+    """
+
+    def __init__(self, description="Transferring..."):
+        self.description = description
+        self._progress = None
+        self._task = None
+
+    def __call__(self, bytes_done, total, elapsed):
+        if self._progress is None:
+            from rich.progress import Progress
+
+            self._progress = Progress(transient=True)
+            self._progress.start()
+            self._task = self._progress.add_task(self.description, total=total)
+        self._progress.update(self._task, completed=bytes_done)
+
+    def close(self):
+        if self._progress is not None:
+            self._progress.stop()
+            self._progress = None
+
+
+def make_tracker(progress, quiet, total, description):
+    """
+    Progress tracker of a transfer, or None when nobody is watching
+
+    Parameters
+    ----------
+    progress : callable or None, see `ProgressTracker`
+    quiet : bool, without a `progress` callback, display a `rich` progress
+        bar unless `quiet` is set
+    total : int
+    description : str
+
+    Returns
+    -------
+    ProgressTracker or None
+    """
+    if progress is None:
+        if quiet:
+            return None
+        progress = RichProgressBar(description)
+    return ProgressTracker(progress, total)
@@ -0,0 +1,135 @@
+import json
+import os
+import sqlite3
+import sys
+from urllib.parse import quote
+
+ROM_INFO_FIELDS = (
+    "full_title",
+    "title",
+    "CGB_support",
+    "SGB_support",
+    "cartridge_type",
+    "ROM_size",
+    "RAM_size",
+    "destination",
+    "ROM_version",
+    "header_checksum",
+    "global_checksum",
+)
+BOOLEAN_FIELDS = ("CGB_support", "SGB_support")
+
+# Map the first pages of the database instead of reading them
+MMAP_SIZE = 1 << 24
+
+_SELECT_ROM = "SELECT {} FROM roms WHERE epilogue_id = ?".format(
+    ", ".join(ROM_INFO_FIELDS)
+)
+
+
+class RomsDatabase(object):
+    """
+    Read-only, dict-like view of the ROM database stored in SQLite
+
+    The database is only opened on the first lookup, and each lookup goes
+    through the primary key index, so only the pages holding that entry are
+    read.
+
+    Parameters
+    ----------
+    filename : str, path to a database built with `build_roms_db_index`
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._connection = None
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            path = os.path.abspath(self.filename).replace(os.sep, "/")
+            if not path.startswith("/"):
+                path = "/" + path
+            uri = "file:{}?mode=ro&immutable=1".format(quote(path, safe="/:"))
+            self._connection = sqlite3.connect(
+                uri, uri=True, check_same_thread=False
+            )
+            self._connection.execute("PRAGMA mmap_size = {}".format(MMAP_SIZE))
+        return self._connection
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def __getitem__(self, epilogue_id):
+        row = self.connection.execute(_SELECT_ROM, (epilogue_id,)).fetchone()
+        if row is None:
+            raise KeyError(epilogue_id)
+        rom_info = dict(zip(ROM_INFO_FIELDS, row))
+        for field in BOOLEAN_FIELDS:
+            rom_info[field] = bool(rom_info[field])
+        return rom_info
+
+    def get(self, epilogue_id, default=None):
+        try:
+            return self[epilogue_id]
+        except KeyError:
+            return default
+
+    def __contains__(self, epilogue_id):
+        row = self.connection.execute(
+            "SELECT 1 FROM roms WHERE epilogue_id = ?", (epilogue_id,)
+        ).fetchone()
+        return row is not None
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM roms").fetchone()[0]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def keys(self):
+        rows = self.connection.execute("SELECT epilogue_id FROM roms ORDER BY 1")
+        return [row[0] for row in rows]
+
+    def items(self):
+        return [(epilogue_id, self[epilogue_id]) for epilogue_id in self.keys()]
+
+
+def build_roms_db_index(roms_db, filename):
+    """
+    Build the SQLite ROM database
+
+    Parameters
+    ----------
+    roms_db : dict, epilogue ID -> ROM info, as in gb_gbc_roms_info.json
+    filename : str
+    """
+    if os.path.exists(filename):
+        os.remove(filename)
+    connection = sqlite3.connect(filename)
+    with connection:
+        # Untyped columns keep the original types (RAM_size is 0 or a string)
+        connection.execute(
+            "CREATE TABLE roms (epilogue_id TEXT PRIMARY KEY, {}) WITHOUT ROWID".format(
+                ", ".join(ROM_INFO_FIELDS)
+            )
+        )
+        connection.executemany(
+            "INSERT INTO roms VALUES ({})".format(
+                ", ".join(["?"] * (len(ROM_INFO_FIELDS) + 1))
+            ),
+            (
+                [epilogue_id] + [rom_info[field] for field in ROM_INFO_FIELDS]
+                for epilogue_id, rom_info in sorted(roms_db.items())
+            ),
+        )
+    connection.execute("VACUUM")
+    connection.close()
+
+
+if __name__ == "__main__":
+    # python -m gbopyrator.roms_db gb_gbc_roms_info.json gb_gbc_roms_info.sqlite
+    with open(sys.argv[1], "r") as file:
+        build_roms_db_index(json.load(file), sys.argv[2])
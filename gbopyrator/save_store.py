@@ -0,0 +1,260 @@
+import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+
+# Saves are split in blocks of this many bytes, stored once each
+BLOCK_SIZE = 1024
+
+
+def store_directory():
+    data_home = os.environ.get("XDG_DATA_HOME") or os.path.join(
+        os.path.expanduser("~"), ".local", "share"
+    )
+    return os.path.join(data_home, "gbopyrator", "saves")
+
+
+class SaveStore(object):
+    """
+    Versioned and deduplicated save backups, keyed by epilogue ID
+
+    Saves are split in fixed size blocks. Each distinct block is stored once,
+    named after its SHA-1, and a version only lists its blocks: a new backup
+    of a save costs the blocks that changed. A backup identical to the
+    latest version of the cartridge does not create a new version.
+
+    Parameters
+    ----------
+    directory : str, optional. `store_directory()` by default
+    block_size : int, optional. Only used for new backups
+    """
+
+    def __init__(self, directory=None, block_size=BLOCK_SIZE):
+        self.directory = directory or store_directory()
+        self.block_size = block_size
+        self._lock = threading.RLock()
+
+    def _block_filename(self, sha1):
+        return os.path.join(self.directory, "blocks", sha1[:2], sha1)
+
+    def _versions_filename(self, epilogue_id):
+        return os.path.join(self.directory, "versions", epilogue_id + ".json")
+
+    def _save_versions(self, epilogue_id, versions):
+        filename = self._versions_filename(epilogue_id)
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        temp_filename = filename + ".tmp"
+        with open(temp_filename, "w") as file:
+            json.dump(versions, file, indent=4)
+        os.replace(temp_filename, filename)
+
+    def _write_block(self, sha1, block):
+        filename = self._block_filename(sha1)
+        if os.path.exists(filename):
+            return 0
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        temp_filename = filename + ".tmp"
+        with open(temp_filename, "wb") as file:
+            file.write(block)
+        os.replace(temp_filename, filename)
+        return len(block)
+
+    def cartridges(self):
+        """
+        Epilogue IDs with at least one version
+        """
+        try:
+            filenames = os.listdir(os.path.join(self.directory, "versions"))
+        except FileNotFoundError:
+            return []
+        return sorted(
+            filename[: -len(".json")]
+            for filename in filenames
+            if filename.endswith(".json")
+        )
+
+    def versions(self, epilogue_id):
+        """
+        Versions of the save of a cartridge, oldest first
+
+        Returns
+        -------
+        list of dict, with the version number, timestamp, size, SHA-1 and
+        blocks of each version
+        """
+        try:
+            with open(self._versions_filename(epilogue_id), "r") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return []
+
+    def backup(self, epilogue_id, data, timestamp=None):
+        """
+        Store a new version of a save
+
+        Parameters
+        ----------
+        epilogue_id : str
+        data : bytes-like
+        timestamp : float, optional. Now by default
+
+        Returns
+        -------
+        dict, the new version, or the latest one if `data` did not change.
+        `new_bytes` counts the bytes actually added to the store.
+        """
+        data = bytes(data)
+        sha1 = hashlib.sha1(data).hexdigest()
+        with self._lock:
+            versions = self.versions(epilogue_id)
+            if versions and versions[-1]["sha1"] == sha1:
+                return dict(versions[-1], new_bytes=0)
+
+            blocks = []
+            new_bytes = 0
+            for start in range(0, len(data), self.block_size):
+                block = data[start : start + self.block_size]
+                block_sha1 = hashlib.sha1(block).hexdigest()
+                new_bytes += self._write_block(block_sha1, block)
+                blocks.append(block_sha1)
+
+            version = {
+                "version": versions[-1]["version"] + 1 if versions else 1,
+                "timestamp": time.time() if timestamp is None else timestamp,
+                "size": len(data),
+                "sha1": sha1,
+                "blocks": blocks,
+            }
+            versions.append(version)
+            self._save_versions(epilogue_id, versions)
+        return dict(version, new_bytes=new_bytes)
+
+    def restore(self, epilogue_id, version=None):
+        """
+        Content of a version of a save
+
+        Parameters
+        ----------
+        epilogue_id : str
+        version : int, optional. Latest version by default
+
+        Returns
+        -------
+        bytes
+
+        Raises
+        ------
+        KeyError, if the version does not exist
+        ValueError, if the stored blocks are corrupted
+        """
+        versions = self.versions(epilogue_id)
+        if not versions:
+            raise KeyError(f"No save backup for {epilogue_id}")
+        if version is None:
+            entry = versions[-1]
+        else:
+            matches = [entry for entry in versions if entry["version"] == version]
+            if not matches:
+                raise KeyError(f"No version {version} of the save of {epilogue_id}")
+            entry = matches[0]
+
+        chunks = []
+        for block_sha1 in entry["blocks"]:
+            with open(self._block_filename(block_sha1), "rb") as file:
+                chunks.append(file.read())
+        data = b"".join(chunks)
+        if hashlib.sha1(data).hexdigest() != entry["sha1"]:
+            raise ValueError(
+                f"Version {entry['version']} of the save of {epilogue_id} is corrupted"
+            )
+        return data
+
+    def prune(self, epilogue_id, keep_last=None, keep_daily=None, keep_weekly=None):
+        """
+        Drop the versions no retention rule keeps
+
+        `keep_last` keeps the latest versions. `keep_daily` and `keep_weekly`
+        keep the latest version of each of the most recent days or weeks
+        that have versions. The latest version is always kept. Run `gc` to
+        free the blocks no version uses anymore.
+
+        Returns
+        -------
+        list of int, removed version numbers
+        """
+        with self._lock:
+            versions = self.versions(epilogue_id)
+            if not versions:
+                return []
+
+            newest_first = versions[::-1]
+            kept = {newest_first[0]["version"]}
+            if keep_last:
+                kept.update(entry["version"] for entry in newest_first[:keep_last])
+            for count, period in ((keep_daily, _day), (keep_weekly, _week)):
+                if not count:
+                    continue
+                periods = set()
+                for entry in newest_first:
+                    key = period(entry["timestamp"])
+                    if key not in periods:
+                        if len(periods) == count:
+                            break
+                        periods.add(key)
+                        kept.add(entry["version"])
+
+            removed = [
+                entry["version"] for entry in versions if entry["version"] not in kept
+            ]
+            if removed:
+                self._save_versions(
+                    epilogue_id,
+                    [entry for entry in versions if entry["version"] in kept],
+                )
+        return removed
+
+    def gc(self):
+        """
+        Delete the blocks no version uses
+
+        Returns
+        -------
+        int, bytes freed
+        """
+        with self._lock:
+            used = set()
+            for epilogue_id in self.cartridges():
+                for entry in self.versions(epilogue_id):
+                    used.update(entry["blocks"])
+
+            freed = 0
+            blocks_directory = os.path.join(self.directory, "blocks")
+            for root, _, filenames in os.walk(blocks_directory):
+                for filename in filenames:
+                    if filename in used or filename.endswith(".tmp"):
+                        continue
+                    path = os.path.join(root, filename)
+                    freed += os.path.getsize(path)
+                    os.remove(path)
+        return freed
+
+    def size(self):
+        """
+        Bytes taken by the stored blocks
+        """
+        total = 0
+        for root, _, filenames in os.walk(os.path.join(self.directory, "blocks")):
+            total += sum(
+                os.path.getsize(os.path.join(root, filename)) for filename in filenames
+            )
+        return total
+
+
+def _day(timestamp):
+    return datetime.date.fromtimestamp(timestamp)
+
+
+def _week(timestamp):
+    return datetime.date.fromtimestamp(timestamp).isocalendar()[:2]
@@ -0,0 +1,198 @@
+import binascii
+import hashlib
+import json
+import mmap
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from .codec import GB_PLATFORM, epilogue_id_from_header, platform_from_header
+
+ROM_EXTENSIONS = (".gb", ".gbc")
+INDEX_FILENAME = "scan_index.json"
+HEADER_SIZE = 0x150
+CHUNK_SIZE = 1 << 20
+
+# Files handed to a worker at once, to amortise the inter-process calls
+WORKER_CHUNK_SIZE = 16
+
+
+def find_roms(directory):
+    """
+    Paths of the ROM files under `directory`, relative to it and sorted
+    """
+    paths = []
+    for root, _, filenames in os.walk(directory):
+        for filename in filenames:
+            if filename.lower().endswith(ROM_EXTENSIONS):
+                paths.append(os.path.relpath(os.path.join(root, filename), directory))
+    return sorted(paths)
+
+
+def scan_rom_file(filename):
+    """
+    Epilogue ID and digests of a ROM file
+
+    The file is mapped in memory: the header is read in place and the
+    digests are computed chunk by chunk, without copying the file.
+
+    Returns
+    -------
+    dict, with the epilogue ID (None if the file is too short for a
+    header), No-Intro platform, CRC32 and SHA-1, or the error if the file
+    could not be read
+    """
+    crc = 0
+    sha1 = hashlib.sha1()
+    epilogue_id = None
+    platform = GB_PLATFORM
+    try:
+        with open(filename, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            # Empty files can not be mapped
+            if size:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    view = memoryview(data)
+                    for start in range(0, size, CHUNK_SIZE):
+                        chunk = view[start : start + CHUNK_SIZE]
+                        crc = binascii.crc32(chunk, crc)
+                        sha1.update(chunk)
+                        chunk.release()
+                    if size >= HEADER_SIZE:
+                        epilogue_id = epilogue_id_from_header(view)
+                        platform = platform_from_header(view)
+                    view.release()
+    except OSError as e:
+        return {"error": repr(e)}
+    return {
+        "epilogue_id": epilogue_id,
+        "platform": platform,
+        "crc32": "{:08x}".format(crc & 0xFFFFFFFF),
+        "sha1": sha1.hexdigest(),
+    }
+
+
+class LibraryScanner(object):
+    """
+    Incremental index of a directory tree of ROM dumps
+
+    Each ROM file is identified by its epilogue ID and digests, then matched
+    against the ROM database and the No-Intro DATs. Files are hashed in a
+    process pool, and only the files whose size or modification time
+    changed since the previous scan are hashed again.
+
+    Parameters
+    ----------
+    directory : str
+    index_filename : str, optional. `INDEX_FILENAME` in `directory` by default
+    workers : int, optional. Processes hashing the files, one per CPU by
+        default
+    roms_db : dict-like, optional. `load_roms_db()` by default
+    dat_index : DatIndex, optional. `load_dat_index()` by default
+    """
+
+    def __init__(
+        self, directory, index_filename=None, workers=None, roms_db=None, dat_index=None
+    ):
+        self.directory = directory
+        self.index_filename = index_filename or os.path.join(directory, INDEX_FILENAME)
+        self.workers = workers
+        self.roms_db = roms_db
+        self.dat_index = dat_index
+        self.index = self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(self.index_filename, "r") as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_index(self):
+        temp_filename = self.index_filename + ".tmp"
+        with open(temp_filename, "w") as file:
+            json.dump(self.index, file, indent=4)
+        os.replace(temp_filename, self.index_filename)
+
+    def scan(self):
+        """
+        Update the index with the current content of the directory
+
+        Returns
+        -------
+        dict, statistics of the scan
+        """
+        from . import load_dat_index, load_roms_db
+
+        if self.roms_db is None:
+            self.roms_db = load_roms_db()
+        if self.dat_index is None:
+            self.dat_index = load_dat_index()
+
+        start = time.perf_counter()
+        index = {}
+        stale = []
+        for path in find_roms(self.directory):
+            try:
+                stat = os.stat(os.path.join(self.directory, path))
+            except OSError:
+                continue
+            entry = self.index.get(path)
+            if (
+                entry is not None
+                and "error" not in entry
+                and "platform" in entry
+                and entry["size"] == stat.st_size
+                and entry["mtime"] == stat.st_mtime_ns
+            ):
+                index[path] = entry
+            else:
+                index[path] = {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+                stale.append(path)
+
+        filenames = [os.path.join(self.directory, path) for path in stale]
+        if self.workers == 1 or len(filenames) <= 1:
+            results = map(scan_rom_file, filenames)
+            self._update(index, stale, results)
+        else:
+            with ProcessPoolExecutor(self.workers) as executor:
+                results = executor.map(
+                    scan_rom_file, filenames, chunksize=WORKER_CHUNK_SIZE
+                )
+                self._update(index, stale, results)
+
+        removed = len(set(self.index) - set(index))
+        # The databases may have changed since the previous scan
+        for entry in index.values():
+            self._match(entry)
+        self.index = index
+        self._save_index()
+
+        return {
+            "files": len(index),
+            "hashed": len(stale),
+            "removed": removed,
+            "errors": sum("error" in entry for entry in index.values()),
+            "known": sum(entry.get("title") is not None for entry in index.values()),
+            "verified": sum(entry.get("verified") is True for entry in index.values()),
+            "unverifiable": sum(
+                entry.get("verified", False) is None for entry in index.values()
+            ),
+            "elapsed": time.perf_counter() - start,
+        }
+
+    def _update(self, index, paths, results):
+        for path, result in zip(paths, results):
+            index[path].update(result)
+
+    def _match(self, entry):
+        if "error" in entry:
+            return
+        rom_info = None
+        if entry["epilogue_id"] is not None:
+            rom_info = self.roms_db.get(entry["epilogue_id"])
+        entry["title"] = None if rom_info is None else rom_info["full_title"]
+        entry["no_intro"] = self.dat_index.lookup(entry["crc32"])
+        entry["verified"] = bool(entry["no_intro"])
+        if not entry["verified"] and entry["platform"] not in self.dat_index.platforms:
+            # No bundled DAT to tell whether the dump is good
+            entry["verified"] = None
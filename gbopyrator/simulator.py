@@ -0,0 +1,323 @@
+import array
+import random
+import time
+from collections import deque
+import usb.core
+from . import codec
+from . import coms_utils as cu
+from .constants import MBC_TYPES, RAM_SIZES, RAM_TYPES, ROM_BANK_SIZE, ROM_TYPES
+
+# ACK sent by the device, a frame with an empty payload
+_ACK = codec.encode_frame(bytes(codec.PAYLOAD_SIZE))
+
+
+class VirtualCartridge(object):
+    """
+    GB/GBC cartridge backed by in-memory ROM and save data
+
+    Parameters
+    ----------
+    rom : bytes, full ROM image, its header describes the cartridge
+    save : bytes, optional. Content of the RAM, zeros by default
+    """
+
+    def __init__(self, rom, save=None):
+        self.rom = bytes(rom)
+        ram_size = RAM_SIZES.get(self.rom[0x149], 0)
+        if save is None:
+            save = bytes(ram_size)
+        self.save = bytearray(save)
+        if len(self.save) != ram_size:
+            raise ValueError(
+                f"Save size mismatch. Expected {ram_size} bytes, got {len(self.save)} bytes."
+            )
+
+    @classmethod
+    def generate(
+        cls, title="GBOPYRATOR", mbc_type=0x00, rom_type=0x00, ram_type=0x00, seed=0
+    ):
+        """
+        Create a cartridge with random content and a valid header
+
+        Parameters
+        ----------
+        title : str, optional. At most 16 ASCII characters
+        mbc_type : int, optional. Key of `MBC_TYPES`
+        rom_type : int, optional. Key of `ROM_TYPES`
+        ram_type : int, optional. Key of `RAM_TYPES`
+        seed : int, optional
+
+        Returns
+        -------
+        VirtualCartridge
+        """
+        if (
+            mbc_type not in MBC_TYPES
+            or rom_type not in ROM_TYPES
+            or ram_type not in RAM_TYPES
+        ):
+            raise ValueError("Unknown MBC, ROM or RAM type")
+
+        rng = random.Random(seed)
+        rom_size = ROM_TYPES[rom_type]["num_rom_banks"] * ROM_BANK_SIZE
+        rom = bytearray(rng.getrandbits(8 * rom_size).to_bytes(rom_size, "little"))
+
+        # Header
+        rom[0x134:0x144] = title.encode("ascii")[:16].ljust(16, b"\x00")
+        rom[0x147] = mbc_type
+        rom[0x148] = rom_type
+        rom[0x149] = ram_type
+        header_checksum = 0
+        for byte in rom[0x134:0x14D]:
+            header_checksum = (header_checksum - byte - 1) & 0xFF
+        rom[0x14D] = header_checksum
+        global_checksum = (sum(rom) - rom[0x14E] - rom[0x14F]) & 0xFFFF
+        rom[0x14E:0x150] = global_checksum.to_bytes(2, "big")
+
+        save = rng.getrandbits(8 * RAM_SIZES[ram_type]).to_bytes(
+            RAM_SIZES[ram_type], "little"
+        )
+        return cls(rom, save)
+
+    @property
+    def epilogue_id(self):
+        return codec.epilogue_id_from_header(self.rom)
+
+    def info_frame(self):
+        """
+        Cartridge info as sent by the GB Operator
+
+        Returns
+        -------
+        bytes, 256 bytes
+        """
+        frame = bytearray(256)
+        frame[2] = 0x20
+        frame[3] = 0x01
+        frame[5:8] = len(self.rom).to_bytes(3, "little")
+        frame[9:12] = len(self.save).to_bytes(3, "little")
+        frame[13] = self.rom[0x134]
+        frame[14] = self.rom[0x147]
+        frame[15] = self.rom[0x148]
+        frame[16] = self.rom[0x149]
+        frame[17] = self.rom[0x14D]
+        frame[18:20] = self.rom[0x14E:0x150]
+        return bytes(frame)
+
+
+class _SimulatedContext(object):
+    # Stands for the pyusb device context used by `usb.util`
+    def managed_claim_interface(self, device, intf):
+        device.claimed = True
+
+    def managed_release_interface(self, device, intf):
+        device.claimed = False
+
+    def dispose(self, device, close_handle=True):
+        device.claimed = False
+
+
+class SimulatedOperator(object):
+    """
+    In-process GB Operator speaking the USB bulk protocol of `coms_utils`
+
+    It implements the `usb.core.Device` methods used by `coms_utils`, so it
+    can be passed to `CartridgeReader.initialize_reader(device=...)` or to
+    any `cu.*` function in place of a real device.
+
+    Parameters
+    ----------
+    cartridge : VirtualCartridge, optional. No cartridge inserted if None
+    latency : float, optional. Seconds added to every USB transfer
+    bandwidth : float, optional. Bytes per second, unlimited if None
+    serial_number : str, optional
+    """
+
+    idVendor = cu.GB_OPERATOR_VENDOR_ID
+    idProduct = cu.GB_OPERATOR_PRODUCT_ID
+    bcdDevice = 0x0100
+
+    def __init__(
+        self, cartridge=None, latency=0.0, bandwidth=None, serial_number="SIM0001"
+    ):
+        self.cartridge = cartridge
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.serial_number = serial_number
+        self.bus = 0
+        self.address = 1
+        self.port_numbers = (1,)
+        self.claimed = False
+        self.kernel_driver_active = True
+        self._ctx = _SimulatedContext()
+        # Milliseconds, a transfer slower than this times out
+        self.default_timeout = cu.USB_TIMEOUT
+
+        self.stats = {
+            "transfers_in": 0,
+            "transfers_out": 0,
+            "bytes_in": 0,
+            "bytes_out": 0,
+            "crc_errors": 0,
+        }
+        self._packets = deque()
+        self._timeout_at = None
+        self._mode = None
+        self._rom_offset = 0
+        self._rom_size = 0
+        self._waiting_ack = False
+        self._save_write_data = None
+        self._save_write_size = 0
+
+    # usb.core.Device API
+
+    def is_kernel_driver_active(self, interface):
+        return self.kernel_driver_active
+
+    def detach_kernel_driver(self, interface):
+        self.kernel_driver_active = False
+
+    def attach_kernel_driver(self, interface):
+        self.kernel_driver_active = True
+
+    def set_configuration(self, configuration=None):
+        pass
+
+    def write(self, endpoint, data, timeout=None):
+        if endpoint != cu.OUT_ENDPOINT:
+            raise usb.core.USBError("Invalid endpoint")
+        data = bytes(data)
+        self._wait(len(data))
+        self.stats["transfers_out"] += 1
+        self.stats["bytes_out"] += len(data)
+        for start in range(0, len(data), cu.USB_PACKET_SIZE):
+            self._handle_packet(data[start : start + cu.USB_PACKET_SIZE])
+        return len(data)
+
+    def read(self, endpoint, size_or_buffer, timeout=None):
+        if endpoint != cu.IN_ENDPOINT:
+            raise usb.core.USBError("Invalid endpoint")
+        if isinstance(size_or_buffer, array.array):
+            size = len(size_or_buffer)
+        else:
+            size = size_or_buffer
+
+        if self._timeout_at is not None and self.stats["bytes_in"] >= self._timeout_at:
+            self._timeout_at = None
+            self._packets.clear()
+            self._mode = None
+            raise usb.core.USBTimeoutError("Operation timed out")
+
+        # A transfer ends when it is full or on a short packet
+        received = bytearray()
+        while self._packets and len(received) < size:
+            packet = self._packets[0]
+            if len(received) + len(packet) > size:
+                raise usb.core.USBError("Overflow")
+            received += self._packets.popleft()
+            if len(packet) < cu.USB_PACKET_SIZE:
+                break
+        if not received:
+            raise usb.core.USBTimeoutError("Operation timed out")
+
+        self._wait(len(received), timeout)
+        self.stats["transfers_in"] += 1
+        self.stats["bytes_in"] += len(received)
+        if isinstance(size_or_buffer, array.array):
+            size_or_buffer[: len(received)] = array.array("B", received)
+            return len(received)
+        return array.array("B", received)
+
+    def inject_timeout(self, after_bytes):
+        """
+        Stop responding once `after_bytes` more bytes have been sent
+
+        The pending transfer is lost and the next read times out, as when
+        the cartridge connection glitches during a dump.
+        """
+        self._timeout_at = self.stats["bytes_in"] + after_bytes
+
+    # Protocol
+
+    def _wait(self, num_bytes, timeout=None):
+        delay = self.latency
+        if self.bandwidth:
+            delay += num_bytes / self.bandwidth
+        if timeout is None:
+            timeout = self.default_timeout
+        if timeout and delay * 1000 > timeout:
+            # The transfer is cancelled and its data lost
+            time.sleep(timeout / 1000)
+            self._packets.clear()
+            self._mode = None
+            raise usb.core.USBTimeoutError("Operation timed out")
+        if delay > 0:
+            time.sleep(delay)
+
+    def _send_ack(self):
+        self._packets.append(_ACK[:60])
+        self._packets.append(_ACK[60:])
+
+    def _send_data(self, data):
+        for start in range(0, len(data), cu.USB_PACKET_SIZE):
+            self._packets.append(data[start : start + cu.USB_PACKET_SIZE])
+
+    def _handle_packet(self, packet):
+        if self._mode == "save_write":
+            remaining = self._save_write_size - len(self._save_write_data)
+            self._save_write_data += packet[:remaining]
+            self._send_ack()
+            if len(self._save_write_data) >= self._save_write_size:
+                self.cartridge.save[: self._save_write_size] = self._save_write_data
+                self._mode = None
+            return
+
+        if self._mode == "rom" and self._waiting_ack and not any(packet):
+            self._send_ack()
+            self._send_rom_window()
+            return
+
+        # Anything else is a trigger frame, which aborts a pending ROM read
+        self._mode = None
+        if not codec.check_frame(packet):
+            # The device drops invalid frames, the host will time out
+            self.stats["crc_errors"] += 1
+            return
+
+        command = packet[0]
+        if command == 0x04:
+            self._send_ack()
+            if self.cartridge is None:
+                self._send_data(bytes(256))
+            else:
+                self._send_data(self.cartridge.info_frame())
+        elif self.cartridge is None:
+            return
+        elif command == 0x00:
+            self._send_ack()
+            self._mode = "rom"
+            self._rom_size = min(
+                int.from_bytes(packet[2:6], "little"), len(self.cartridge.rom)
+            )
+            self._rom_offset = 0
+            self._waiting_ack = True
+        elif command == 0x02:
+            self._send_ack()
+            size = int.from_bytes(packet[5:9], "little")
+            self._send_data(bytes(self.cartridge.save[:size]).ljust(size, b"\x00"))
+        elif command == 0x03:
+            self._send_ack()
+            self._mode = "save_write"
+            self._save_write_size = int.from_bytes(packet[6:10], "little")
+            self._save_write_data = bytearray()
+
+    def _send_rom_window(self):
+        # Stream up to one ACK window, then wait for the host ACK again
+        window_size = cu.ACK_PACKET_INTERVAL * cu.USB_PACKET_SIZE
+        end = min(self._rom_offset + window_size, self._rom_size)
+        self._send_data(self.cartridge.rom[self._rom_offset : end])
+        full_window = end - self._rom_offset == window_size
+        self._rom_offset = end
+        self._waiting_ack = full_window
+        if not full_window:
+            self._mode = None
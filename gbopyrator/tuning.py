@@ -0,0 +1,296 @@
+import binascii
+import json
+import math
+import os
+import platform
+import time
+import usb.core
+from . import coms_utils as cu
+from .metrics import TransferMetrics
+
+PROFILE_VERSION = 1
+
+DEFAULT_PROFILE = {
+    "transfer_packets": cu.TRANSFER_PACKETS,
+    "write_window": cu.WRITE_WINDOW,
+    "write_sleep": cu.WRITE_SLEEP,
+    "timeout": cu.USB_TIMEOUT,
+}
+
+# Candidates, fastest expected first. The ACK every `ACK_PACKET_INTERVAL`
+# packets is set by the firmware and can not be tuned.
+TRANSFER_PACKETS_CANDIDATES = (320, 160, 64, 16)
+WRITE_WINDOW_CANDIDATES = (32, 16, 8, 4, 2, 1)
+# Pauses after every save packet (s), tuned with the window found
+WRITE_SLEEP_CANDIDATES = (0.0, 0.00005, cu.WRITE_SLEEP)
+
+# Bytes of ROM read by each calibration round
+CALIBRATION_BYTES = 256 * 1024
+CALIBRATION_ROUNDS = 3
+# Generous timeout (ms) used while measuring the transfer latencies
+CALIBRATION_TIMEOUT = 5000
+# The timeout is this many times the slowest transfer observed
+TIMEOUT_SAFETY_FACTOR = 4
+MIN_TIMEOUT = 100
+
+
+def profiles_filename():
+    config_home = os.environ.get("XDG_CONFIG_HOME") or os.path.join(
+        os.path.expanduser("~"), ".config"
+    )
+    return os.path.join(config_home, "gbopyrator", "profiles.json")
+
+
+def profile_key(gbop_device):
+    """
+    Key of the profile of a device: host, USB ids and firmware revision
+
+    Parameters
+    ----------
+    gbop_device : usb.core.Device
+
+    Returns
+    -------
+    str
+    """
+    return "{}/{:04x}:{:04x}/{:04x}".format(
+        platform.node(),
+        gbop_device.idVendor,
+        gbop_device.idProduct,
+        getattr(gbop_device, "bcdDevice", 0),
+    )
+
+
+def _load_profiles(filename):
+    try:
+        with open(filename, "r") as file:
+            profiles = json.load(file)
+    except (FileNotFoundError, ValueError):
+        return {}
+    if profiles.get("version") != PROFILE_VERSION:
+        return {}
+    return profiles
+
+
+def load_profile(gbop_device, filename=None):
+    """
+    Load the stored profile of a device
+
+    Parameters
+    ----------
+    gbop_device : usb.core.Device
+    filename : str, optional. `profiles_filename()` by default
+
+    Returns
+    -------
+    dict, or None if the device was never calibrated on this host
+    """
+    profiles = _load_profiles(filename or profiles_filename())
+    profile = profiles.get("profiles", {}).get(profile_key(gbop_device))
+    if profile is None:
+        return None
+    # Profiles written by older versions may lack newer settings
+    return dict(DEFAULT_PROFILE, **profile)
+
+
+def save_profile(gbop_device, profile, filename=None):
+    """
+    Store the profile of a device, replacing the previous one
+
+    Parameters
+    ----------
+    gbop_device : usb.core.Device
+    profile : dict
+    filename : str, optional. `profiles_filename()` by default
+    """
+    filename = filename or profiles_filename()
+    profiles = _load_profiles(filename)
+    profiles["version"] = PROFILE_VERSION
+    profiles.setdefault("profiles", {})[profile_key(gbop_device)] = profile
+
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    temp_filename = filename + ".tmp"
+    with open(temp_filename, "w") as file:
+        json.dump(profiles, file, indent=4)
+    os.replace(temp_filename, filename)
+
+
+def apply_profile(gbop_device, profile):
+    gbop_device.default_timeout = profile["timeout"]
+
+
+def _measure(run, rounds):
+    """
+    Run `run` `rounds` times
+
+    Returns
+    -------
+    (float, set), time of the slowest round and the CRC32 of every round, or
+    (None, None) if a round failed
+    """
+    slowest = 0.0
+    crcs = set()
+    for _ in range(rounds):
+        start = time.perf_counter()
+        try:
+            crcs.add(run())
+        except (usb.core.USBError, cu.TransferError):
+            return None, None
+        slowest = max(slowest, time.perf_counter() - start)
+    return slowest, crcs
+
+
+def calibrate(
+    gbop_device,
+    rom_size,
+    save_data=None,
+    rounds=CALIBRATION_ROUNDS,
+    printer=None,
+):
+    """
+    Find the fastest stable transfer settings of a device
+
+    A prefix of the ROM is read `rounds` times with every candidate number
+    of packets per transfer. Candidates that time out or read inconsistent
+    data are rejected, and the fastest of the others wins. The timeout is
+    then set from the slowest transfer observed, and checked.
+
+    Save writes are only calibrated when `save_data` is given: it is written
+    back with every candidate window, then every candidate pause between
+    packets, and read again to check it. Pass the current content of the
+    save, backed up first. Whatever happens, it is finally written back with
+    the default settings and checked.
+
+    Parameters
+    ----------
+    gbop_device : usb.core.Device, claimed
+    rom_size : int
+    save_data : bytes, optional
+    rounds : int, optional
+    printer : Printer, optional
+
+    Returns
+    -------
+    dict, profile
+
+    Raises
+    ------
+    RuntimeError, if no candidate is stable
+    """
+    num_bytes = min(rom_size, CALIBRATION_BYTES)
+    profile = dict(DEFAULT_PROFILE)
+    metrics = TransferMetrics()
+    gbop_device.default_timeout = CALIBRATION_TIMEOUT
+
+    def report(message):
+        if printer is not None:
+            printer.print(message)
+
+    # Packets per read transfer
+    results = {}
+    reference_crcs = None
+    for transfer_packets in TRANSFER_PACKETS_CANDIDATES:
+        slowest, crcs = _measure(
+            lambda: binascii.crc32(
+                cu.read_rom(
+                    gbop_device,
+                    num_bytes,
+                    quiet=True,
+                    metrics=metrics,
+                    transfer_packets=transfer_packets,
+                )
+            ),
+            rounds,
+        )
+        if slowest is None or len(crcs) != 1 or crcs != (reference_crcs or crcs):
+            report(f"{transfer_packets} packets per transfer: unstable")
+            cu.drain_bulk_in(gbop_device)
+            continue
+        reference_crcs = crcs
+        results[transfer_packets] = num_bytes / slowest
+        report(
+            f"{transfer_packets} packets per transfer: "
+            f"{results[transfer_packets] / 1e6:.2f} MB/s"
+        )
+    if not results:
+        raise RuntimeError("No stable read settings found")
+    profile["transfer_packets"] = max(results, key=results.get)
+
+    # Packets in flight per save write, then pause between the packets
+    if save_data is not None:
+        save_crc = binascii.crc32(save_data)
+
+        def write_and_check(window, sleep, metrics=metrics):
+            cu.write_save(
+                gbop_device,
+                save_data,
+                quiet=True,
+                window=window,
+                metrics=metrics,
+                sleep=sleep,
+            )
+            return binascii.crc32(cu.read_save(gbop_device, len(save_data), quiet=True))
+
+        def fastest(candidates, name):
+            results = {}
+            for window, sleep in candidates:
+                slowest, crcs = _measure(lambda: write_and_check(window, sleep), rounds)
+                label = name(window, sleep)
+                if slowest is None or crcs != {save_crc}:
+                    report(f"{label}: unstable")
+                    cu.drain_bulk_in(gbop_device)
+                    continue
+                results[window, sleep] = len(save_data) / slowest
+                report(f"{label}: {results[window, sleep] / 1e6:.2f} MB/s")
+            if not results:
+                raise RuntimeError("No stable write settings found")
+            return max(results, key=results.get)
+
+        try:
+            window, _ = fastest(
+                [(window, cu.WRITE_SLEEP) for window in WRITE_WINDOW_CANDIDATES],
+                lambda window, sleep: f"{window} packets in flight",
+            )
+            _, sleep = fastest(
+                [(window, sleep) for sleep in WRITE_SLEEP_CANDIDATES],
+                lambda window, sleep: f"{sleep * 1e6:.0f} us between packets",
+            )
+        finally:
+            # A failed candidate may have left the save half written
+            cu.drain_bulk_in(gbop_device)
+            written_crc = write_and_check(cu.WRITE_WINDOW, cu.WRITE_SLEEP, None)
+            if written_crc != save_crc:
+                raise RuntimeError("The save could not be written back")
+        profile["write_window"] = window
+        profile["write_sleep"] = sleep
+
+    # Timeout, from the slowest transfer of any phase
+    slowest_transfer = max(
+        phase["max"] for phase in metrics.snapshot()["phases"].values()
+    )
+    timeout = max(
+        MIN_TIMEOUT, math.ceil(slowest_transfer * 1000 * TIMEOUT_SAFETY_FACTOR)
+    )
+    while True:
+        gbop_device.default_timeout = timeout
+        slowest, crcs = _measure(
+            lambda: binascii.crc32(
+                cu.read_rom(
+                    gbop_device,
+                    num_bytes,
+                    quiet=True,
+                    transfer_packets=profile["transfer_packets"],
+                )
+            ),
+            rounds,
+        )
+        if slowest is not None and crcs == reference_crcs:
+            break
+        cu.drain_bulk_in(gbop_device)
+        if timeout >= CALIBRATION_TIMEOUT:
+            raise RuntimeError("No stable timeout found")
+        timeout = min(timeout * 2, CALIBRATION_TIMEOUT)
+    profile["timeout"] = timeout
+    report(f"Timeout: {timeout} ms")
+
+    return profile
@@ -0,0 +1,244 @@
+import binascii
+import datetime
+import hashlib
+import json
+import os
+import time
+import usb.core
+from . import codec
+from . import coms_utils as cu
+from . import load_roms_db
+from .cartridge_utils import epilogue_id_from_info
+from .file_utils import AtomicHashWriter, journal_filename, safe_filename
+
+# Seconds between two cartridge info reads
+WATCH_INTERVAL = 0.5
+# Identical info reads required before a cartridge is dumped, so that a
+# cartridge still being pushed in is not dumped
+SETTLE_POLLS = 2
+
+# Errors of a poll while a cartridge is half inserted (garbage header
+# bytes), for GBA cartridges or on a USB glitch: the slot is then treated
+# as not settled
+POLL_ERRORS = (KeyError, NotImplementedError, usb.core.USBError, cu.TransferError)
+
+# Stands for an unreadable slot, never settles as a cartridge
+_UNREADABLE = object()
+
+ARCHIVE_INDEX_FILENAME = "archive_index.json"
+DEFAULT_ROM_TEMPLATE = "{epilogue_id} - {title}.{extension}"
+DEFAULT_SAVE_TEMPLATE = "{epilogue_id} - {title} [{save_crc32}].sav"
+
+
+class CartridgeWatcher(object):
+    """
+    Dump every cartridge inserted in a GB Operator
+
+    The device stays claimed and the cartridge info is polled every
+    `interval` seconds. When a new cartridge settles, its ROM and save are
+    dumped to `directory` and recorded in an archive index there:
+
+    - a ROM is dumped once per epilogue ID,
+    - a save is dumped unless a save with the same SHA-1 was archived for
+      that epilogue ID, so several copies of a game keep their own save.
+
+    A cartridge with nothing new is skipped after a save read. An
+    interrupted ROM dump is resumed the next time the cartridge is inserted.
+
+    Templates are formatted with `epilogue_id`, `title` (full title from the
+    ROM database, or the epilogue ID if unknown) and, for saves, `save_crc32`.
+    ROM templates also get `extension`, "gbc" when the CGB flag of the dumped
+    header is set and "gb" otherwise.
+
+    Parameters
+    ----------
+    reader : CartridgeReader, initialized
+    directory : str
+    rom_template : str, optional
+    save_template : str, optional
+    interval : float, optional
+    callback : callable, optional. Called as `callback(event, epilogue_id)`
+        for every "inserted", "removed", "archived", "skipped" and "failed"
+        event
+    """
+
+    def __init__(
+        self,
+        reader,
+        directory,
+        rom_template=DEFAULT_ROM_TEMPLATE,
+        save_template=DEFAULT_SAVE_TEMPLATE,
+        interval=WATCH_INTERVAL,
+        callback=None,
+    ):
+        self.reader = reader
+        self.directory = directory
+        self.rom_template = rom_template
+        self.save_template = save_template
+        self.interval = interval
+        self.callback = callback
+        self.index_filename = os.path.join(directory, ARCHIVE_INDEX_FILENAME)
+        self.index = self._load_index()
+        self.roms_db = load_roms_db()
+        self.stats = {"archived": 0, "skipped": 0, "failed": 0}
+
+    def _load_index(self):
+        try:
+            with open(self.index_filename, "r") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+
+    def _save_index(self):
+        temp_filename = self.index_filename + ".tmp"
+        with open(temp_filename, "w") as file:
+            json.dump(self.index, file, indent=4)
+        os.replace(temp_filename, self.index_filename)
+
+    def _event(self, event, epilogue_id):
+        if self.callback is not None:
+            self.callback(event, epilogue_id)
+
+    def run(self, max_cartridges=None):
+        """
+        Watch until interrupted, or until `max_cartridges` were handled
+
+        Returns
+        -------
+        dict, number of cartridges archived, skipped and failed, and the
+        cartridges handled per hour
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        start = time.perf_counter()
+        current = None
+        candidate = None
+        settled_polls = 0
+        try:
+            with self.reader.session():
+                while max_cartridges is None or self._handled() < max_cartridges:
+                    info = self._poll()
+                    if info is _UNREADABLE:
+                        epilogue_id = _UNREADABLE
+                    else:
+                        epilogue_id = (
+                            None if info is None else epilogue_id_from_info(info)
+                        )
+
+                    if epilogue_id != candidate:
+                        candidate = epilogue_id
+                        settled_polls = 1
+                    else:
+                        settled_polls += 1
+
+                    if (
+                        settled_polls == SETTLE_POLLS
+                        and candidate is not _UNREADABLE
+                        and candidate != current
+                    ):
+                        if current is not None:
+                            self._event("removed", current)
+                        current = candidate
+                        if current is not None:
+                            self._event("inserted", current)
+                            self._archive(info)
+                    time.sleep(self.interval)
+        except KeyboardInterrupt:
+            pass
+
+        elapsed = time.perf_counter() - start
+        stats = dict(self.stats)
+        stats["per_hour"] = self._handled() / elapsed * 3600 if elapsed > 0 else 0.0
+        return stats
+
+    def _poll(self):
+        try:
+            return self.reader.read_cartridge_info()
+        except POLL_ERRORS as e:
+            self.reader.printer.warning(f"Unreadable cartridge slot: {e!r}")
+            try:
+                cu.drain_bulk_in(self.reader.gbop_device)
+            except usb.core.USBError:
+                pass
+            return _UNREADABLE
+
+    def _handled(self):
+        return sum(self.stats.values())
+
+    def _rename_rom(self, rom_filename, fields):
+        with open(rom_filename, "rb") as file:
+            header = file.read(codec.HEADER_SIZE)
+        if codec.platform_from_header(header) != codec.GBC_PLATFORM:
+            return rom_filename
+        gbc_filename = os.path.join(
+            self.directory, self.rom_template.format(extension="gbc", **fields)
+        )
+        if gbc_filename != rom_filename:
+            os.replace(rom_filename, gbc_filename)
+        return gbc_filename
+
+    def _archive(self, cartridge_info):
+        epilogue_id = epilogue_id_from_info(cartridge_info)
+        entry = self.index.setdefault(epilogue_id, {"rom": None, "saves": {}})
+        rom_info = self.roms_db.get(epilogue_id)
+        fields = {
+            "epilogue_id": epilogue_id,
+            "title": safe_filename(
+                rom_info["full_title"] if rom_info is not None else epilogue_id
+            ),
+        }
+        archived = False
+
+        try:
+            if entry["rom"] is None:
+                # The platform is only known once the header is dumped: dump
+                # under the GB name, which an interrupted dump resumes from
+                rom_filename = os.path.join(
+                    self.directory, self.rom_template.format(extension="gb", **fields)
+                )
+                digests = self.reader.dump_rom(
+                    rom_filename, resume=os.path.exists(journal_filename(rom_filename))
+                )
+                rom_filename = self._rename_rom(rom_filename, fields)
+                entry["rom"] = dict(digests, filename=os.path.basename(rom_filename))
+                archived = True
+
+            if cartridge_info["RAM_size"] != 0:
+                save = self.reader.read_save()
+                sha1 = hashlib.sha1(save).hexdigest()
+                if sha1 not in entry["saves"]:
+                    fields["save_crc32"] = "{:08x}".format(binascii.crc32(save))
+                    save_filename = os.path.join(
+                        self.directory, self.save_template.format(**fields)
+                    )
+                    with AtomicHashWriter(save_filename) as writer:
+                        writer.write(save)
+                    entry["saves"][sha1] = dict(
+                        writer.digests(),
+                        filename=os.path.basename(save_filename),
+                        archived_at=datetime.datetime.now().isoformat(
+                            timespec="seconds"
+                        ),
+                    )
+                    archived = True
+        except Exception as e:
+            self.stats["failed"] += 1
+            self.reader.printer.error(f"{epilogue_id}: {e!r}")
+            # Leave the device ready for the next cartridge
+            try:
+                cu.drain_bulk_in(self.reader.gbop_device)
+            except usb.core.USBError:
+                pass
+            self._event("failed", epilogue_id)
+            return
+        finally:
+            self._save_index()
+
+        if archived:
+            self.stats["archived"] += 1
+            self.reader.printer.success(f"{epilogue_id} archived ({fields['title']})")
+            self._event("archived", epilogue_id)
+        else:
+            self.stats["skipped"] += 1
+            self.reader.printer.print(f"{epilogue_id} already archived, skipped")
+            self._event("skipped", epilogue_id)
+
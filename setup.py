@@ -15,8 +15,15 @@ setup(
             "gbopyrator = gbopyrator.gbopyrator:main",
         ],
     },
-    package_data={"gbopyrator": ["gb_gbc_roms_info.json"]},
+    package_data={
+        "gbopyrator": [
+            "gb_gbc_roms_info.json",
+            "gb_gbc_roms_info.sqlite",
+            "no_intro_crc.sqlite",
+        ]
+    },
     install_requires=read_requirements("requirements.txt"),
+    extras_require={"numpy": ["numpy"]},
     classifiers=[
         "Development Status :: 4 - Beta",
         "Intended Audience :: Developers",
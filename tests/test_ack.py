@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+from gbopyrator import codec
+from gbopyrator import coms_utils as cu
+from gbopyrator.simulator import SimulatedOperator, VirtualCartridge
+
+
+class NoisyOperator(SimulatedOperator):
+    """Corrupts the CRC of the ACKs after the first `good_acks`"""
+
+    def __init__(self, cartridge, good_acks):
+        super().__init__(cartridge)
+        self.good_acks = good_acks
+
+    def _send_ack(self):
+        super()._send_ack()
+        if self.good_acks:
+            self.good_acks -= 1
+        else:
+            self._packets[-1] = b"\xaa" * 4
+
+
+def make_device(good_acks):
+    cartridge = VirtualCartridge.generate(
+        mbc_type=0x1B, rom_type=0x02, ram_type=0x03, seed=3
+    )
+    return cartridge, NoisyOperator(cartridge, good_acks)
+
+
+@pytest.fixture
+def check_acks(monkeypatch):
+    monkeypatch.setattr(cu, "CHECK_ACKS", True)
+
+
+def test_acks_not_checked_by_default():
+    cartridge, device = make_device(good_acks=0)
+    assert cu.read_rom(device, len(cartridge.rom), quiet=True) == cartridge.rom
+
+
+def test_rom_read_checks_acks(check_acks):
+    # Two ACKs answer the read trigger, then one per window: the second
+    # window is received but not acknowledged
+    cartridge, device = make_device(good_acks=3)
+    with pytest.raises(cu.TransferError) as excinfo:
+        cu.read_rom(device, len(cartridge.rom), quiet=True)
+    assert "ACK" in str(excinfo.value)
+    window_size = cu.ACK_PACKET_INTERVAL * cu.USB_PACKET_SIZE
+    assert excinfo.value.confirmed_bytes == 2 * window_size
+
+
+def test_save_write_checks_acks(check_acks):
+    # One ACK answers the write trigger, then one per packet
+    cartridge, device = make_device(good_acks=11)
+    with pytest.raises(cu.TransferError) as excinfo:
+        cu.write_save(device, bytearray(len(cartridge.save)), quiet=True)
+    assert excinfo.value.confirmed_bytes == 10 * cu.USB_PACKET_SIZE
+
+
+def test_valid_acks(check_acks):
+    cartridge, device = make_device(good_acks=float("inf"))
+    assert cu.read_rom(device, len(cartridge.rom), quiet=True) == cartridge.rom
+
+
+def reference_crc32_mpeg2(data):
+    # Bitwise CRC32/MPEG-2: polynomial 0x04C11DB7, not reflected, no final xor
+    crc = 0xFFFFFFFF
+    for byte in data:
+        crc ^= byte << 24
+        for _ in range(8):
+            crc = (crc << 1) ^ 0x04C11DB7 if crc & 0x80000000 else crc << 1
+            crc &= 0xFFFFFFFF
+    return crc
+
+
+def test_crc32_mpeg2_vectors():
+    assert codec.crc32_mpeg2(b"123456789") == 0x0376E6E7
+    assert codec.crc32_mpeg2(b"") == 0xFFFFFFFF
+    assert codec.crc32_mpeg2(memoryview(b"123456789")) == 0x0376E6E7
+
+    rng = random.Random(1)
+    data = bytes(rng.randrange(256) for _ in range(1000))
+    assert codec.crc32_mpeg2(data) == reference_crc32_mpeg2(data)
+    # Chunk by chunk
+    assert codec.crc32_mpeg2(data[300:], codec.crc32_mpeg2(data[:300])) == (
+        codec.crc32_mpeg2(data)
+    )
+    frame = codec.encode_frame(data[: codec.PAYLOAD_SIZE])
+    assert codec.check_frame(frame)
+    assert not codec.check_frame(frame[:-1] + bytes([frame[-1] ^ 1]))
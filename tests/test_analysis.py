@@ -0,0 +1,67 @@
+import pytest
+
+from gbopyrator import analysis
+from gbopyrator.constants import ROM_BANK_SIZE
+from gbopyrator.simulator import VirtualCartridge
+
+
+def damaged_rom():
+    rom = bytearray(
+        VirtualCartridge.generate(mbc_type=0x1B, rom_type=0x03, seed=12).rom
+    )
+    # Duplicate, uniform and blank banks
+    rom[3 * ROM_BANK_SIZE : 4 * ROM_BANK_SIZE] = rom[
+        5 * ROM_BANK_SIZE : 6 * ROM_BANK_SIZE
+    ]
+    rom[7 * ROM_BANK_SIZE : 8 * ROM_BANK_SIZE] = b"\xff" * ROM_BANK_SIZE
+    rom[9 * ROM_BANK_SIZE : 10 * ROM_BANK_SIZE] = b"\xff" * ROM_BANK_SIZE
+    rom[12 * ROM_BANK_SIZE : 13 * ROM_BANK_SIZE] = b"\x00" * ROM_BANK_SIZE
+    return rom
+
+
+@pytest.mark.parametrize(
+    "rom",
+    [
+        damaged_rom(),
+        VirtualCartridge.generate(rom_type=0x00, seed=13).rom,
+        # Mirrored image, and a truncated one
+        VirtualCartridge.generate(rom_type=0x01, seed=14).rom * 2,
+        bytes(damaged_rom()[: 5 * ROM_BANK_SIZE + 100]),
+    ],
+)
+def test_numpy_matches_python(rom):
+    pytest.importorskip("numpy")
+    assert analysis.analyze_rom(rom, use_numpy=True) == analysis.analyze_rom(
+        rom, use_numpy=False
+    )
+
+
+def test_analyze_damaged_rom():
+    report = analysis.analyze_rom(damaged_rom(), use_numpy=False)
+    assert report["duplicate_banks"] == [[3, 5], [7, 9]]
+    assert report["uniform_banks"] == [
+        {"bank": 7, "value": 0xFF},
+        {"bank": 9, "value": 0xFF},
+        {"bank": 12, "value": 0x00},
+    ]
+    assert report["errors"] == [
+        "Global checksum mismatch: stored {:04x}, computed {:04x}".format(
+            report["global_checksum"]["stored"], report["global_checksum"]["computed"]
+        )
+    ]
+
+
+@pytest.mark.parametrize("mbc_type", [0x06, 0x22])
+def test_no_ram_warning_for_builtin_ram(mbc_type):
+    # MBC2 has its own RAM, MBC7 an EEPROM: both declare no RAM
+    rom = VirtualCartridge.generate(mbc_type=mbc_type, rom_type=0x01, seed=15).rom
+    report = analysis.analyze_rom(rom, use_numpy=False)
+    assert report["ok"] and report["warnings"] == []
+
+
+def test_ram_warning():
+    rom = VirtualCartridge.generate(mbc_type=0x03, rom_type=0x01, seed=16).rom
+    report = analysis.analyze_rom(rom, use_numpy=False)
+    assert report["warnings"] == [
+        "The cartridge type MBC1+RAM+BATTERY does not match the RAM size 0"
+    ]
@@ -0,0 +1,49 @@
+import asyncio
+
+from gbopyrator import coms_utils as cu
+from gbopyrator.async_reader import AsyncCartridgeReader
+from gbopyrator.cartridge_utils import CartridgeReader
+from gbopyrator.simulator import SimulatedOperator, VirtualCartridge
+
+
+def make_reader():
+    cartridge = VirtualCartridge.generate(
+        mbc_type=0x1B, rom_type=0x02, ram_type=0x03, seed=8
+    )
+    reader = CartridgeReader(quiet=True, dat_index=False)
+    reader.initialize_reader(device=SimulatedOperator(cartridge))
+    return cartridge, AsyncCartridgeReader(reader=reader)
+
+
+def test_stream_rom_and_save():
+    cartridge, async_reader = make_reader()
+
+    async def stream():
+        async with async_reader.session():
+            rom_chunks = [chunk async for chunk in async_reader.stream_rom()]
+            save_chunks = [chunk async for chunk in async_reader.stream_save()]
+        await async_reader.close()
+        return rom_chunks, save_chunks
+
+    rom_chunks, save_chunks = asyncio.run(stream())
+    window_size = cu.ACK_PACKET_INTERVAL * cu.USB_PACKET_SIZE
+    assert len(rom_chunks) == -(-len(cartridge.rom) // window_size)
+    assert b"".join(rom_chunks) == cartridge.rom
+    assert b"".join(save_chunks) == cartridge.save
+
+
+def test_stream_stopped_early():
+    cartridge, async_reader = make_reader()
+
+    async def stream():
+        chunks = async_reader.stream_rom()
+        first = await chunks.__anext__()
+        await chunks.aclose()
+        # The device was drained, the next operation starts cleanly
+        rom = await async_reader.read_rom()
+        await async_reader.close()
+        return first, rom
+
+    first, rom = asyncio.run(stream())
+    assert first == cartridge.rom[: len(first)]
+    assert bytes(rom) == cartridge.rom
@@ -0,0 +1,82 @@
+import binascii
+import json
+import sys
+
+from gbopyrator import gbopyrator
+from gbopyrator.batch import BatchRunner
+from gbopyrator.cartridge_utils import CartridgeReader
+from gbopyrator.simulator import SimulatedOperator, VirtualCartridge
+
+
+def test_batch_report_alone_on_stdout(tmp_path, monkeypatch, capsys):
+    cartridge = VirtualCartridge.generate(mbc_type=0x1B, rom_type=0x01, seed=4)
+    initialize_reader = CartridgeReader.initialize_reader
+
+    def simulated_reader(self, blocking=False, timeout=0, device=None):
+        initialize_reader(self, device=SimulatedOperator(cartridge))
+
+    monkeypatch.setattr(CartridgeReader, "initialize_reader", simulated_reader)
+    manifest = tmp_path / "manifest.json"
+    rom_filename = tmp_path / "rom.gb"
+    manifest.write_text(
+        json.dumps({"steps": [{"op": "dump_rom", "path": str(rom_filename)}]})
+    )
+    monkeypatch.setattr(sys, "argv", ["gbopyrator", "--batch", str(manifest)])
+
+    assert gbopyrator.main() == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report["ok"]
+    assert rom_filename.read_bytes() == cartridge.rom
+
+
+def make_runner(tmp_path, cartridge, steps):
+    device = SimulatedOperator(cartridge)
+    reader = CartridgeReader(quiet=True, dat_index=False)
+    reader.initialize_reader(device=device)
+    return device, BatchRunner(reader, {"steps": steps}, str(tmp_path))
+
+
+def test_batch_verify_rom(tmp_path):
+    cartridge = VirtualCartridge.generate(seed=5)
+    crc32 = "{:08x}".format(binascii.crc32(cartridge.rom))
+    _, runner = make_runner(tmp_path, cartridge, [{"op": "verify_rom", "crc32": crc32}])
+    report = runner.run()
+    assert report["ok"]
+    assert report["steps"][0]["result"]["crc32"] == crc32
+
+
+def test_batch_without_cartridge(tmp_path):
+    device, runner = make_runner(
+        tmp_path, VirtualCartridge.generate(seed=6), [{"op": "info"}]
+    )
+    device.cartridge = None
+    report = runner.run()
+    assert not report["ok"]
+    assert "No cartridge" in report["error"]
+    assert report["steps"] == [{"index": 0, "op": "info", "status": "skipped"}]
+
+
+def test_batch_fails_steps_after_a_swap(tmp_path):
+    first = VirtualCartridge.generate(title="FIRST", seed=7)
+    second = VirtualCartridge.generate(title="SECOND", seed=8)
+    device, runner = make_runner(
+        tmp_path,
+        first,
+        [
+            {"op": "dump_rom", "path": "{epilogue_id}.gb"},
+            {"op": "dump_rom", "path": "{epilogue_id}-again.gb"},
+        ],
+    )
+    dump_rom = runner.reader.dump_rom
+
+    def dump_and_swap(*args, **kwargs):
+        digests = dump_rom(*args, **kwargs)
+        device.cartridge = second
+        return digests
+
+    runner.reader.dump_rom = dump_and_swap
+    report = runner.run()
+    assert [step["status"] for step in report["steps"]] == ["ok", "failed"]
+    assert "changed" in report["steps"][1]["error"]
+    assert (tmp_path / f"{first.epilogue_id}.gb").read_bytes() == first.rom
+    assert not (tmp_path / f"{first.epilogue_id}-again.gb").exists()
@@ -0,0 +1,55 @@
+import importlib.util
+import os
+
+import pytest
+
+TRANSFER_SCRIPT = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "benchmarks",
+    "transfer.py",
+)
+
+
+@pytest.fixture(scope="module")
+def transfer():
+    spec = importlib.util.spec_from_file_location("transfer", TRANSFER_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def report(**results):
+    return {
+        "parameters": {"latency": 0.0, "bandwidth": None},
+        "results": {
+            name: {"seconds": seconds, "peak_memory": peak_memory}
+            for name, (seconds, peak_memory) in results.items()
+        },
+    }
+
+
+def test_compare_to_baseline(transfer):
+    baseline = report(read=(1.0, 1000), write=(2.0, 1000))
+
+    # Within the tolerance, and benchmarks missing from the baseline
+    current = report(read=(1.2, 1200), write=(1.0, 500), new=(9.0, 9000))
+    assert transfer.compare_to_baseline(current, baseline, tolerance=0.25) == []
+
+    current = report(read=(1.5, 1000), write=(2.0, 2000))
+    assert transfer.compare_to_baseline(current, baseline, tolerance=0.25) == [
+        "read: seconds 1 -> 1.5 (+50%)",
+        "write: peak_memory 1000 -> 2000 (+100%)",
+    ]
+
+    current["parameters"]["latency"] = 0.001
+    with pytest.raises(ValueError):
+        transfer.compare_to_baseline(current, baseline)
+
+
+def test_run_benchmarks_subset(transfer):
+    name = "read_bulk_in[read_save 128 KiB]"
+    current = transfer.run_benchmarks(repeat=1, names=[name])
+    assert list(current["results"]) == [name]
+    result = current["results"][name]
+    assert result["bytes"] == 128 * 1024
+    assert result["seconds"] > 0 and result["peak_memory"] > 0
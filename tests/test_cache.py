@@ -0,0 +1,30 @@
+import pytest
+
+from gbopyrator.cache import RomCache
+from gbopyrator.cartridge_utils import CartridgeReader
+from gbopyrator.simulator import SimulatedOperator, VirtualCartridge
+
+
+def dump_twice(tmp_path, cartridge, dat_index):
+    reader = CartridgeReader(
+        quiet=True, cache=RomCache(str(tmp_path / "cache")), dat_index=dat_index
+    )
+    reader.initialize_reader(device=SimulatedOperator(cartridge))
+    reader.dump_rom(str(tmp_path / "first.gb"))
+    return reader.dump_rom(str(tmp_path / "second.gb"))
+
+
+@pytest.mark.parametrize("damaged, cached", [(False, True), (True, False)])
+def test_cache_checks_the_global_checksum_without_dat(tmp_path, damaged, cached):
+    rom = bytearray(VirtualCartridge.generate(rom_type=0x01, seed=9).rom)
+    if damaged:
+        rom[-1] ^= 0xFF
+    digests = dump_twice(tmp_path, VirtualCartridge(rom), dat_index=False)
+    assert digests["cached"] is cached
+
+
+def test_cache_skips_unknown_dumps(tmp_path):
+    # A Game Boy ROM missing from the No-Intro DAT is not a known good dump
+    digests = dump_twice(tmp_path, VirtualCartridge.generate(seed=9), dat_index=None)
+    assert digests["verified"] is False
+    assert digests["cached"] is False
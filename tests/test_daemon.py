@@ -0,0 +1,47 @@
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import time
+
+import pytest
+
+from gbopyrator.cartridge_utils import CartridgeReader
+from gbopyrator.daemon import DaemonError, GBOperatorDaemon, request
+from gbopyrator.simulator import SimulatedOperator, VirtualCartridge
+
+
+@pytest.fixture
+def daemon():
+    # Unix socket paths are limited to about 100 characters
+    directory = tempfile.mkdtemp(dir="/tmp")
+    cartridge = VirtualCartridge.generate(title="DAEMON", seed=3)
+    reader = CartridgeReader(quiet=True, dat_index=False)
+    reader.initialize_reader(device=SimulatedOperator(cartridge))
+    daemon = GBOperatorDaemon(os.path.join(directory, "gbopyrator.sock"), reader)
+    thread = threading.Thread(target=daemon.serve_forever)
+    thread.start()
+    while not os.path.exists(daemon.socket_path):
+        time.sleep(0.01)
+    yield daemon
+    daemon.shutdown()
+    thread.join()
+    shutil.rmtree(directory)
+
+
+def test_socket_is_private(daemon):
+    assert stat.S_IMODE(os.stat(daemon.socket_path).st_mode) == 0o600
+    assert request("ping", daemon.socket_path) == "pong"
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_dead_worker_returns_an_error(daemon, monkeypatch):
+    def crash(command, args):
+        raise SystemExit
+
+    monkeypatch.setattr(daemon, "_execute", crash)
+    with pytest.raises(DaemonError, match="worker stopped"):
+        request("info", daemon.socket_path)
+    with pytest.raises(DaemonError, match="worker stopped"):
+        request("info", daemon.socket_path)
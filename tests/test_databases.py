@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from gbopyrator import ROMS_DB_FILENAME, load_roms_db
+from gbopyrator.dat_index import DatIndex, build_dat_index
+from gbopyrator.roms_db import RomsDatabase, build_roms_db_index
+
+ROMS_DB_JSON_FILENAME = ROMS_DB_FILENAME[: -len(".sqlite")] + ".json"
+
+DAT = """clrmamepro (
+\tname "Nintendo - Game Boy"
+)
+
+game (
+\tcomment "Tetris (World) (Rev 1)"
+\tpublisher "Nintendo"
+\trom ( crc 46DF91AD )
+)
+
+game (
+\tcomment "Alleyway (World)"
+\tpublisher "Nintendo"
+\trom ( crc 0CDE91EC )
+)
+"""
+
+
+def test_roms_db_matches_json(tmp_path):
+    with open(ROMS_DB_JSON_FILENAME, "r") as file:
+        roms_json = json.load(file)
+    sample = dict(sorted(roms_json.items())[:50])
+    filename = str(tmp_path / "roms.sqlite")
+    build_roms_db_index(sample, filename)
+
+    roms_db = RomsDatabase(filename)
+    # Nothing is opened before the first lookup
+    assert roms_db._connection is None
+    assert roms_db.items() == sorted(sample.items())
+    assert len(roms_db) == len(sample)
+    assert "NOTAROM" not in roms_db
+    assert roms_db.get("NOTAROM") is None
+    with pytest.raises(KeyError):
+        roms_db["NOTAROM"]
+    roms_db.close()
+    assert roms_db._connection is None
+
+
+def test_bundled_roms_db_matches_json():
+    with open(ROMS_DB_JSON_FILENAME, "r") as file:
+        roms_json = json.load(file)
+    roms_db = load_roms_db()
+    assert len(roms_db) == len(roms_json)
+    for epilogue_id in sorted(roms_json)[::500]:
+        assert roms_db[epilogue_id] == roms_json[epilogue_id]
+    roms_db.close()
+
+
+def test_dat_index_lookup(tmp_path):
+    dat_filename = tmp_path / "gb.dat"
+    dat_filename.write_text(DAT)
+    filename = str(tmp_path / "dat.sqlite")
+    build_dat_index([str(dat_filename)], filename)
+
+    dat_index = DatIndex(filename)
+    assert dat_index._connection is None
+    assert dat_index.lookup("46df91ad") == [
+        {
+            "title": "Tetris (World) (Rev 1)",
+            "publisher": "Nintendo",
+            "platform": "Nintendo - Game Boy",
+        }
+    ]
+    assert dat_index.lookup(0x0CDE91EC)[0]["title"] == "Alleyway (World)"
+    assert dat_index.lookup(0x12345678) == []
+    assert 0x46DF91AD in dat_index and "12345678" not in dat_index
+    assert len(dat_index) == 2
+    assert dat_index.platforms == {"Nintendo - Game Boy"}
+    dat_index.close()
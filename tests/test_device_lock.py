@@ -0,0 +1,55 @@
+import threading
+import time
+
+from gbopyrator.cartridge_utils import CartridgeReader, DeviceLock
+from gbopyrator.simulator import SimulatedOperator, VirtualCartridge
+
+
+def acquire(lock):
+    with lock:
+        pass
+
+
+def test_device_lock_records_contention():
+    lock = DeviceLock()
+    with lock:
+        # Reentrant
+        with lock:
+            pass
+        thread = threading.Thread(target=acquire, args=(lock,))
+        thread.start()
+        while lock.stats()["queue_depth"] == 0:
+            time.sleep(0.001)
+        time.sleep(0.01)
+    thread.join()
+
+    stats = lock.stats()
+    assert stats["acquisitions"] == 3
+    assert stats["contended"] == 1
+    assert stats["queue_depth"] == 0
+    assert stats["max_queue_depth"] == 1
+    assert stats["max_wait"] >= 0.01
+    assert stats["mean_wait"] == stats["total_wait"] == stats["max_wait"]
+
+
+def test_threads_share_a_reader():
+    cartridge = VirtualCartridge.generate(
+        mbc_type=0x1B, rom_type=0x02, ram_type=0x03, seed=9
+    )
+    reader = CartridgeReader(quiet=True, dat_index=False)
+    reader.initialize_reader(device=SimulatedOperator(cartridge))
+
+    results = []
+
+    def work():
+        results.append(bytes(reader.read_rom()) == cartridge.rom)
+        results.append(bytes(reader.read_save()) == cartridge.save)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [True] * 8
+    assert reader.lock_stats()["acquisitions"] >= 8
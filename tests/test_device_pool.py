@@ -0,0 +1,44 @@
+from gbopyrator import coms_utils as cu
+from gbopyrator.device_pool import DevicePool
+from gbopyrator.simulator import SimulatedOperator, VirtualCartridge
+
+
+def test_pool_dumps_every_device(tmp_path, monkeypatch):
+    cartridges = [
+        VirtualCartridge.generate(title=f"POOL{port}", ram_type=0x02, seed=port)
+        for port in (1, 2)
+    ]
+    devices = []
+    for port, cartridge in enumerate(cartridges + [None], start=1):
+        device = SimulatedOperator(cartridge, serial_number=f"SIM000{port}")
+        device.port_numbers = (port,)
+        devices.append(device)
+    monkeypatch.setattr(cu, "find_gb_operators", lambda: list(devices))
+
+    pool = DevicePool()
+    device_ids = pool.discover()
+    assert device_ids == ["0-1-SIM0001", "0-2-SIM0002", "0-3-SIM0003"]
+    # Devices already in the pool are not initialized again
+    assert pool.discover() == device_ids
+
+    report = pool.dump_all(
+        rom_template=str(tmp_path / "{epilogue_id}_{device_id}.gb"),
+        save_template=str(tmp_path / "{epilogue_id}_{device_id}.sav"),
+    )
+    pool.close()
+
+    for device_id, cartridge in zip(device_ids, cartridges):
+        device = report["devices"][device_id]
+        assert device["error"] is None
+        assert device["bytes"] >= len(cartridge.rom) + len(cartridge.save)
+        prefix = str(tmp_path / f"{cartridge.epilogue_id}_{device_id}")
+        with open(prefix + ".gb", "rb") as file:
+            assert file.read() == cartridge.rom
+        with open(prefix + ".sav", "rb") as file:
+            assert file.read() == cartridge.save
+    # An empty slot fails on its own device only
+    assert report["devices"][device_ids[2]]["error"] is not None
+    assert report["bytes"] == sum(
+        device["bytes"] for device in report["devices"].values()
+    )
+    assert pool.readers == {}
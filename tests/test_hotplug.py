@@ -0,0 +1,93 @@
+import socket
+import struct
+
+from gbopyrator import coms_utils as cu
+from gbopyrator import hotplug
+
+PROPERTIES = (
+    b"ACTION=add\x00"
+    b"DEVPATH=/devices/pci0000:00/0000:00:14.0/usb1/1-3\x00"
+    b"SUBSYSTEM=usb\x00"
+    b"PRODUCT=16d0/123d/100\x00"
+)
+
+
+def test_parse_kernel_uevent():
+    message = b"add@/devices/pci0000:00/0000:00:14.0/usb1/1-3\x00" + PROPERTIES
+    source, properties = hotplug._parse_uevent(message)
+    assert source == "kernel"
+    assert properties["ACTION"] == "add"
+    assert properties["PRODUCT"] == "16d0/123d/100"
+    assert "add@/devices/pci0000:00/0000:00:14.0/usb1/1-3" not in properties
+
+
+def udev_message(properties):
+    # libudev header: prefix, magic, header size, properties offset and
+    # length, then filters up to the header size
+    header_size = 40
+    header = hotplug._UDEV_MONITOR_PREFIX + struct.pack(
+        "=IIII", 0xFEEDCAFE, header_size, header_size, len(properties)
+    )
+    return header.ljust(header_size, b"\x00") + properties + b"trailing"
+
+
+def test_parse_udev_uevent():
+    message = udev_message(PROPERTIES)
+    source, properties = hotplug._parse_uevent(message)
+    assert source == "udev"
+    assert properties == {
+        "ACTION": "add",
+        "DEVPATH": "/devices/pci0000:00/0000:00:14.0/usb1/1-3",
+        "SUBSYSTEM": "usb",
+        "PRODUCT": "16d0/123d/100",
+    }
+
+
+def test_monitor_waits_for_watched_device():
+    # A datagram socket pair stands for the netlink socket
+    receiver, sender = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    monitor = hotplug.UEventMonitor.__new__(hotplug.UEventMonitor)
+    monitor.products = ["16d0/123d/"]
+    monitor.sock = receiver
+    try:
+        assert not monitor.wait(timeout=0.01)
+        sender.send(udev_message(PROPERTIES.replace(b"123d", b"5678")))
+        sender.send(udev_message(PROPERTIES.replace(b"=add", b"=remove")))
+        assert not monitor.wait(timeout=0.01)
+        sender.send(udev_message(PROPERTIES))
+        assert monitor.wait(timeout=1)
+    finally:
+        monitor.close()
+        sender.close()
+
+
+class FakeMonitor(object):
+    def __init__(self, events):
+        self.events = list(events)
+        self.timeouts = []
+        self.closed = False
+
+    def wait(self, timeout=None):
+        self.timeouts.append(timeout)
+        return self.events.pop(0)
+
+    def close(self):
+        self.closed = True
+
+
+def test_blocking_find_rescans_on_events(monkeypatch):
+    # A lost event, then a GB Operator plugged in
+    monitor = FakeMonitor([False, True])
+    scans = []
+
+    def find_gb_operator():
+        scans.append(len(monitor.timeouts))
+        return "device" if len(monitor.timeouts) == 2 else None
+
+    monkeypatch.setattr(hotplug, "open_monitor", lambda device_ids: monitor)
+    monkeypatch.setattr(cu, "find_gb_operator", find_gb_operator)
+
+    assert cu.find_gb_operator_blocking() == "device"
+    assert scans == [0, 1, 2]
+    assert monitor.timeouts == [cu.HOTPLUG_RESCAN_INTERVAL] * 2
+    assert monitor.closed
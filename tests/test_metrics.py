@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from gbopyrator.cartridge_utils import CartridgeReader
+from gbopyrator.metrics import LATENCY_BUCKETS, TransferMetrics
+from gbopyrator.simulator import SimulatedOperator, VirtualCartridge
+
+
+def make_metrics():
+    metrics = TransferMetrics()
+    metrics.observe("payload", 0.0003)
+    metrics.observe("payload", 0.002)
+    metrics.observe("payload", 20.0)
+    metrics.increment("retries")
+    metrics.record_operation("read_rom", 1000, 0.5)
+    metrics.record_operation("read_rom", 3000, 1.5)
+    return metrics
+
+
+def test_metrics_json(tmp_path):
+    filename = str(tmp_path / "metrics.json")
+    make_metrics().export(filename)
+    with open(filename, "r") as file:
+        snapshot = json.load(file)
+
+    payload = snapshot["phases"]["payload"]
+    assert payload["count"] == 3
+    assert payload["max"] == 20.0
+    assert payload["buckets"]["0.0005"] == 1
+    assert payload["buckets"]["0.0025"] == 1
+    assert payload["buckets"]["+Inf"] == 1
+    assert sum(payload["buckets"].values()) == 3
+    assert len(payload["buckets"]) == len(LATENCY_BUCKETS) + 1
+    assert snapshot["counters"] == {"retries": 1}
+    assert snapshot["operations"]["read_rom"] == {
+        "count": 2,
+        "bytes": 4000,
+        "seconds": 2.0,
+        "last_bytes_per_second": 2000.0,
+        "bytes_per_second": 2000.0,
+    }
+
+
+def test_metrics_prometheus(tmp_path):
+    filename = str(tmp_path / "metrics.prom")
+    make_metrics().export(filename, format="prometheus")
+    with open(filename, "r") as file:
+        lines = file.read().splitlines()
+
+    # Buckets are cumulative
+    assert 'gbopyrator_phase_seconds_bucket{phase="payload",le="0.0001"} 0' in lines
+    assert 'gbopyrator_phase_seconds_bucket{phase="payload",le="0.0025"} 2' in lines
+    assert 'gbopyrator_phase_seconds_bucket{phase="payload",le="+Inf"} 3' in lines
+    assert 'gbopyrator_phase_seconds_count{phase="payload"} 3' in lines
+    assert 'gbopyrator_events_total{event="retries"} 1' in lines
+    assert 'gbopyrator_operations_total{operation="read_rom"} 2' in lines
+    assert 'gbopyrator_operation_bytes_per_second{operation="read_rom"} 2000.0' in lines
+    assert "# TYPE gbopyrator_operation_bytes_per_second gauge" in lines
+
+    with pytest.raises(ValueError):
+        make_metrics().export(filename, format="csv")
+
+
+def test_reader_records_metrics():
+    cartridge = VirtualCartridge.generate(mbc_type=0x1B, rom_type=0x02, seed=11)
+    reader = CartridgeReader(quiet=True, metrics=True, dat_index=False)
+    reader.initialize_reader(device=SimulatedOperator(cartridge))
+    reader.read_rom()
+
+    snapshot = reader.metrics.snapshot()
+    assert snapshot["operations"]["read_rom"]["bytes"] == len(cartridge.rom)
+    assert {"trigger", "payload", "ack_window"} <= set(snapshot["phases"])
@@ -0,0 +1,61 @@
+import pytest
+
+from gbopyrator import progress
+from gbopyrator.cartridge_utils import CartridgeReader
+from gbopyrator.simulator import SimulatedOperator, VirtualCartridge
+
+
+class Recorder(object):
+    def __init__(self):
+        self.reports = []
+        self.closed = False
+
+    def __call__(self, bytes_done, total, elapsed):
+        self.reports.append((bytes_done, total, elapsed))
+
+    def close(self):
+        self.closed = True
+
+
+def test_tracker_bounds_the_report_rate(monkeypatch):
+    clock = [10.0]
+    monkeypatch.setattr(progress.time, "perf_counter", lambda: clock[0])
+    recorder = Recorder()
+
+    with progress.ProgressTracker(recorder, 100, interval=0.1) as tracker:
+        for bytes_done in range(10, 101, 10):
+            tracker.update(bytes_done)
+            clock[0] += 0.04
+
+    # Every 0.1 s, then once more when the transfer completes
+    assert recorder.reports == [
+        (10, 100, 0.0),
+        (40, 100, pytest.approx(0.12)),
+        (70, 100, pytest.approx(0.24)),
+        (100, 100, pytest.approx(0.36)),
+        (100, 100, pytest.approx(0.4)),
+    ]
+    assert recorder.closed
+
+
+def test_tracker_skips_final_report_on_error():
+    recorder = Recorder()
+    with pytest.raises(RuntimeError):
+        with progress.ProgressTracker(recorder, 100) as tracker:
+            tracker.update(10)
+            raise RuntimeError
+    assert [report[0] for report in recorder.reports] == [10]
+    assert recorder.closed
+
+
+def test_reader_reports_progress():
+    cartridge = VirtualCartridge.generate(mbc_type=0x1B, rom_type=0x02, seed=10)
+    recorder = Recorder()
+    reader = CartridgeReader(quiet=True, progress=recorder, dat_index=False)
+    reader.initialize_reader(device=SimulatedOperator(cartridge))
+    assert progress.make_tracker(None, True, 100, "Reading...") is None
+
+    recorder.reports.clear()
+    reader.read_rom()
+    bytes_done, total, _ = recorder.reports[-1]
+    assert bytes_done == total == len(cartridge.rom)
@@ -0,0 +1,79 @@
+import os
+
+import pytest
+import usb.core
+
+from gbopyrator import coms_utils as cu
+from gbopyrator.cartridge_utils import CartridgeReader
+from gbopyrator.file_utils import journal_filename
+from gbopyrator.simulator import SimulatedOperator, VirtualCartridge
+
+WINDOW_SIZE = cu.ACK_PACKET_INTERVAL * cu.USB_PACKET_SIZE
+
+
+def interrupted_dump(tmp_path):
+    cartridge = VirtualCartridge.generate(mbc_type=0x1B, rom_type=0x05, seed=2)
+    device = SimulatedOperator(cartridge)
+    reader = CartridgeReader(quiet=True, dat_index=False)
+    reader.initialize_reader(device=device)
+    filename = str(tmp_path / "rom.gb")
+    device.inject_timeout(after_bytes=3 * WINDOW_SIZE + 100)
+    with pytest.raises(cu.TransferError):
+        reader.dump_rom(filename, retries=0)
+    return cartridge, reader, filename
+
+
+@pytest.mark.parametrize("damage", ["truncate", "corrupt"])
+def test_resume_starts_over_from_damaged_part_file(tmp_path, damage):
+    cartridge, reader, filename = interrupted_dump(tmp_path)
+    part_filename = filename + ".part"
+    assert os.path.getsize(part_filename) >= 3 * WINDOW_SIZE
+
+    with open(part_filename, "r+b") as file:
+        if damage == "truncate":
+            # Lost by a crash before it reached the disk
+            file.truncate(WINDOW_SIZE + 10)
+        else:
+            file.seek(2 * WINDOW_SIZE + 5)
+            file.write(b"\xaa")
+
+    digests = reader.dump_rom(filename, resume=True)
+    with open(filename, "rb") as file:
+        assert file.read() == cartridge.rom
+    assert digests["size"] == len(cartridge.rom)
+
+
+def test_resume_keeps_confirmed_windows(tmp_path):
+    cartridge, reader, filename = interrupted_dump(tmp_path)
+    digests = reader.dump_rom(filename, resume=True)
+    with open(filename, "rb") as file:
+        assert file.read() == cartridge.rom
+    assert digests["confirmed_bytes"] == len(cartridge.rom)
+
+
+class UnpluggedOperator(SimulatedOperator):
+    # Disconnected once `unplug_at` bytes were sent
+    unplug_at = None
+
+    def read(self, endpoint, size_or_buffer, timeout=None):
+        if self.unplug_at is not None and self.stats["bytes_in"] >= self.unplug_at:
+            raise usb.core.USBError("No such device")
+        return super().read(endpoint, size_or_buffer, timeout)
+
+
+def test_unplugged_dump_keeps_journal(tmp_path):
+    cartridge = VirtualCartridge.generate(mbc_type=0x1B, rom_type=0x05, seed=2)
+    device = UnpluggedOperator(cartridge)
+    reader = CartridgeReader(quiet=True, dat_index=False)
+    reader.initialize_reader(device=device)
+    filename = str(tmp_path / "rom.gb")
+    device.unplug_at = device.stats["bytes_in"] + 3 * WINDOW_SIZE + 100
+    with pytest.raises(usb.core.USBError):
+        reader.dump_rom(filename, retries=0)
+    assert os.path.exists(journal_filename(filename))
+
+    reader.initialize_reader(device=SimulatedOperator(cartridge))
+    digests = reader.dump_rom(filename, resume=True)
+    with open(filename, "rb") as file:
+        assert file.read() == cartridge.rom
+    assert digests["confirmed_bytes"] == len(cartridge.rom)
@@ -0,0 +1,59 @@
+import pytest
+
+from gbopyrator.save_store import SaveStore
+
+DAY = 24 * 3600
+# Noon UTC, so that the versions of a test day share a local date
+START = 1700000000 - 1700000000 % DAY + DAY // 2
+
+
+def test_backups_are_deduplicated(tmp_path):
+    store = SaveStore(str(tmp_path), block_size=4)
+    save = bytearray(b"AAAABBBBCCCCAAAA")
+
+    first = store.backup("GAME", save, timestamp=START)
+    # AAAA is stored once
+    assert first["new_bytes"] == 12
+    assert store.size() == 12
+    # An unchanged save does not create a version
+    assert store.backup("GAME", save)["new_bytes"] == 0
+    assert len(store.versions("GAME")) == 1
+
+    save[4:8] = b"DDDD"
+    second = store.backup("GAME", save, timestamp=START + 1)
+    assert (second["version"], second["new_bytes"]) == (2, 4)
+    assert store.restore("GAME") == bytes(save)
+    assert store.restore("GAME", version=1) == b"AAAABBBBCCCCAAAA"
+    assert store.cartridges() == ["GAME"]
+    with pytest.raises(KeyError):
+        store.restore("GAME", version=3)
+    with pytest.raises(KeyError):
+        store.restore("OTHER")
+
+
+def test_restore_detects_corrupted_blocks(tmp_path):
+    store = SaveStore(str(tmp_path), block_size=4)
+    version = store.backup("GAME", b"AAAABBBB")
+    with open(store._block_filename(version["blocks"][1]), "wb") as file:
+        file.write(b"XXXX")
+    with pytest.raises(ValueError):
+        store.restore("GAME")
+
+
+def test_prune_and_gc(tmp_path):
+    store = SaveStore(str(tmp_path), block_size=4)
+    # Two versions a day for 4 days, each with its own block
+    for number in range(8):
+        timestamp = START + (number // 2) * DAY + (number % 2) * 3600
+        store.backup("GAME", b"SAVE" + bytes([number]) * 4, timestamp=timestamp)
+
+    removed = store.prune("GAME", keep_last=1, keep_daily=2)
+    assert removed == [1, 2, 3, 4, 5, 7]
+    assert [entry["version"] for entry in store.versions("GAME")] == [6, 8]
+    assert store.restore("GAME", version=6) == b"SAVE" + bytes([5]) * 4
+
+    # The shared SAVE block stays, the 6 unused blocks are freed
+    assert store.gc() == 6 * 4
+    assert store.size() == 3 * 4
+    assert store.restore("GAME") == b"SAVE" + bytes([7]) * 4
+    assert store.prune("GAME", keep_weekly=1) == [6]
@@ -0,0 +1,63 @@
+import os
+import sys
+
+import pytest
+
+from gbopyrator import gbopyrator
+from gbopyrator.scan import LibraryScanner
+from gbopyrator.simulator import VirtualCartridge
+
+
+def write_rom(directory, name, seed):
+    rom = VirtualCartridge.generate(title=f"SCAN{seed}", seed=seed).rom
+    path = os.path.join(directory, name)
+    with open(path, "wb") as file:
+        file.write(rom)
+    return rom
+
+
+def test_rescan_only_hashes_changed_files(tmp_path):
+    directory = str(tmp_path)
+    os.makedirs(os.path.join(directory, "sub"))
+    write_rom(directory, "a.gb", 1)
+    write_rom(directory, os.path.join("sub", "b.gbc"), 2)
+    write_rom(directory, "c.gb", 3)
+    with open(os.path.join(directory, "notes.txt"), "w") as file:
+        file.write("not a ROM")
+
+    # Hashed in a process pool
+    stats = LibraryScanner(directory, workers=2).scan()
+    assert (stats["files"], stats["hashed"], stats["removed"]) == (3, 3, 0)
+
+    # A new scanner starts from the saved index
+    scanner = LibraryScanner(directory, workers=1)
+    stats = scanner.scan()
+    assert (stats["files"], stats["hashed"], stats["removed"]) == (3, 0, 0)
+
+    rom = write_rom(directory, "a.gb", 4)
+    stat = os.stat(os.path.join(directory, "a.gb"))
+    os.utime(
+        os.path.join(directory, "a.gb"), ns=(stat.st_atime_ns, stat.st_mtime_ns + 1)
+    )
+    os.remove(os.path.join(directory, "c.gb"))
+    stats = scanner.scan()
+    assert (stats["files"], stats["hashed"], stats["removed"]) == (2, 1, 1)
+
+    entry = scanner.index["a.gb"]
+    assert entry["epilogue_id"] == VirtualCartridge(rom).epilogue_id
+    assert entry["size"] == len(rom)
+    assert entry["verified"] is False
+    assert sorted(scanner.index) == ["a.gb", os.path.join("sub", "b.gbc")]
+
+
+@pytest.mark.parametrize(
+    "argv", [["scan", "DIRECTORY", "--quiet"], ["--quiet", "scan", "DIRECTORY"]]
+)
+def test_scan_cli_quiet(tmp_path, monkeypatch, capsys, argv):
+    write_rom(str(tmp_path), "a.gb", 1)
+    argv = [str(tmp_path) if arg == "DIRECTORY" else arg for arg in argv]
+    monkeypatch.setattr(sys, "argv", ["gbopyrator"] + argv)
+
+    assert gbopyrator.main() == 0
+    assert capsys.readouterr().out == ""
+    assert os.path.exists(os.path.join(str(tmp_path), "scan_index.json"))
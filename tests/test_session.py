@@ -0,0 +1,48 @@
+import pytest
+
+from gbopyrator import cartridge_utils
+from gbopyrator.cartridge_utils import CartridgeReader
+from gbopyrator.simulator import SimulatedOperator, VirtualCartridge
+
+
+def make_reader(cartridge):
+    device = SimulatedOperator(cartridge)
+    reader = CartridgeReader(quiet=True, dat_index=False)
+    reader.initialize_reader(device=device)
+    return device, reader
+
+
+def test_session_reads_the_info_once(tmp_path, monkeypatch):
+    cartridge = VirtualCartridge.generate(mbc_type=0x1B, ram_type=0x02, seed=1)
+    device, reader = make_reader(cartridge)
+    reads = []
+    read_cartridge_info = cartridge_utils.cu.read_cartridge_info
+
+    def counted(*args, **kwargs):
+        reads.append(None)
+        return read_cartridge_info(*args, **kwargs)
+
+    monkeypatch.setattr(cartridge_utils.cu, "read_cartridge_info", counted)
+    with reader.session():
+        reader.get_epilogue_id()
+        reader.dump_rom(str(tmp_path / "rom.gb"))
+        reader.dump_save(str(tmp_path / "save.sav"))
+        reader.read_rom()
+    assert len(reads) == 1
+
+
+def test_session_detects_swapped_cartridge(tmp_path):
+    small = VirtualCartridge.generate(title="SMALL", rom_type=0x01, seed=1)
+    large = VirtualCartridge.generate(title="LARGE", rom_type=0x03, seed=2)
+    device, reader = make_reader(small)
+    filename = tmp_path / "rom.gb"
+
+    with reader.session():
+        assert reader.get_epilogue_id() == small.epilogue_id
+        device.cartridge = large
+        with pytest.raises(Exception, match="cartridge was changed"):
+            reader.dump_rom(str(filename))
+        assert not filename.exists()
+        assert reader.get_epilogue_id() == large.epilogue_id
+        reader.dump_rom(str(filename))
+        assert filename.read_bytes() == large.rom
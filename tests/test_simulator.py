@@ -0,0 +1,68 @@
+import pytest
+import usb.core
+
+from gbopyrator import analysis, codec
+from gbopyrator import coms_utils as cu
+from gbopyrator.cartridge_utils import CartridgeReader
+from gbopyrator.simulator import SimulatedOperator, VirtualCartridge
+
+
+def test_generated_cartridge_has_valid_header():
+    cartridge = VirtualCartridge.generate(
+        title="HEADER", mbc_type=0x13, rom_type=0x03, ram_type=0x03, seed=5
+    )
+    assert len(cartridge.rom) == 16 * 0x4000
+    assert len(cartridge.save) == 32 * 1024
+    assert analysis.global_checksum_matches(cartridge.rom)
+    # Same content for the same seed
+    assert (
+        cartridge.rom
+        == VirtualCartridge.generate(
+            title="HEADER", mbc_type=0x13, rom_type=0x03, ram_type=0x03, seed=5
+        ).rom
+    )
+    with pytest.raises(ValueError):
+        VirtualCartridge.generate(mbc_type=0x42)
+
+
+def test_simulated_cartridge_round_trip():
+    cartridge = VirtualCartridge.generate(
+        title="ROUNDTRIP", mbc_type=0x1B, rom_type=0x01, ram_type=0x02, seed=6
+    )
+    device = SimulatedOperator(cartridge)
+    reader = CartridgeReader(quiet=True, dat_index=False)
+    reader.initialize_reader(device=device)
+
+    info = reader.read_cartridge_info()
+    assert info["ROM_size"] == len(cartridge.rom)
+    assert info["RAM_size"] == len(cartridge.save)
+    assert reader.get_epilogue_id() == cartridge.epilogue_id
+    assert bytes(reader.read_rom()) == cartridge.rom
+
+    new_save = bytes(range(256)) * (len(cartridge.save) // 256)
+    reader.write_save(new_save)
+    assert bytes(cartridge.save) == new_save
+    assert bytes(reader.read_save()) == new_save
+    assert device.stats["crc_errors"] == 0
+
+
+def test_simulated_operator_drops_corrupted_frames():
+    device = SimulatedOperator(VirtualCartridge.generate(seed=7))
+    trigger = bytearray(codec.encode_trigger(codec.COMMAND_CARTRIDGE_INFO))
+    trigger[-1] ^= 0xFF
+    device.write(cu.OUT_ENDPOINT, trigger)
+    assert device.stats["crc_errors"] == 1
+    with pytest.raises(usb.core.USBTimeoutError):
+        device.read(cu.IN_ENDPOINT, 64)
+
+
+def test_simulated_operator_without_cartridge():
+    device = SimulatedOperator()
+    device.write(cu.OUT_ENDPOINT, codec.encode_trigger(codec.COMMAND_CARTRIDGE_INFO))
+    device.read(cu.IN_ENDPOINT, 60)
+    device.read(cu.IN_ENDPOINT, 4)
+    assert bytes(device.read(cu.IN_ENDPOINT, 256)) == bytes(256)
+    # Other commands get no answer
+    device.write(cu.OUT_ENDPOINT, codec.encode_trigger(codec.COMMAND_ROM_READ, 0x8000))
+    with pytest.raises(usb.core.USBTimeoutError):
+        device.read(cu.IN_ENDPOINT, 64)
@@ -0,0 +1,20 @@
+import os
+import subprocess
+import sys
+
+STARTUP_SCRIPT = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "benchmarks",
+    "startup.py",
+)
+
+
+def test_startup_budgets():
+    # check_startup_budgets times fresh interpreters, away from the test run
+    result = subprocess.run(
+        [sys.executable, STARTUP_SCRIPT],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        universal_newlines=True,
+    )
+    assert result.returncode == 0, result.stdout
@@ -0,0 +1,51 @@
+import array
+
+import pytest
+
+from gbopyrator.cartridge_utils import CartridgeReader
+from gbopyrator.simulator import SimulatedOperator, VirtualCartridge
+
+
+@pytest.mark.parametrize("transfer_packets", [1, 64, 100, 320])
+def test_read_bulk_in_fills_buffer_in_place(transfer_packets):
+    cartridge = VirtualCartridge.generate(
+        mbc_type=0x1B, rom_type=0x02, ram_type=0x03, seed=4
+    )
+    reader = CartridgeReader(quiet=True, dat_index=False)
+    reader.initialize_reader(device=SimulatedOperator(cartridge))
+    reader.transfer_profile["transfer_packets"] = transfer_packets
+
+    assert bytes(reader.read_rom()) == cartridge.rom
+    assert bytes(reader.read_save()) == cartridge.save
+
+    chunks = []
+    received = reader.read_rom(sink=lambda chunk: chunks.append(bytes(chunk)))
+    assert received >= len(cartridge.rom)
+    assert b"".join(chunks)[: len(cartridge.rom)] == cartridge.rom
+
+
+class RecordingOperator(SimulatedOperator):
+    # Keeps every buffer handed to read
+    def __init__(self, cartridge):
+        super().__init__(cartridge)
+        self.buffers = []
+
+    def read(self, endpoint, size_or_buffer, timeout=None):
+        if isinstance(size_or_buffer, array.array):
+            self.buffers.append(size_or_buffer)
+        return super().read(endpoint, size_or_buffer, timeout)
+
+
+def test_read_bulk_in_reuses_transfer_buffers():
+    cartridge = VirtualCartridge.generate(mbc_type=0x1B, rom_type=0x02, seed=4)
+    device = RecordingOperator(cartridge)
+    reader = CartridgeReader(quiet=True, dat_index=False)
+    reader.initialize_reader(device=device)
+    # 100, 100, 100 and 20 packets per window
+    reader.transfer_profile["transfer_packets"] = 100
+
+    device.buffers.clear()
+    assert bytes(reader.read_rom()) == cartridge.rom
+    distinct = {id(buffer): buffer for buffer in device.buffers}
+    assert len(device.buffers) > len(distinct)
+    assert len(distinct) == len({len(buffer) for buffer in device.buffers})
@@ -0,0 +1,61 @@
+import sys
+
+from gbopyrator import gbopyrator, tuning
+from gbopyrator.cartridge_utils import CartridgeReader
+from gbopyrator.save_store import SaveStore
+from gbopyrator.simulator import SimulatedOperator, VirtualCartridge
+
+
+class FlakyWriter(SimulatedOperator):
+    """Damages the data of the first save write"""
+
+    damaged_writes = 1
+
+    def _handle_packet(self, packet):
+        if self._mode == "save_write" and self.damaged_writes:
+            packet = bytes([packet[0] ^ 0xFF]) + packet[1:]
+            if len(self._save_write_data) + len(packet) >= self._save_write_size:
+                self.damaged_writes -= 1
+        super()._handle_packet(packet)
+
+
+def test_calibrate_writes_backs_up_and_restores_the_save(tmp_path, monkeypatch):
+    cartridge = VirtualCartridge.generate(mbc_type=0x1B, ram_type=0x02, seed=10)
+    cartridge.save[:] = bytes(range(256)) * (len(cartridge.save) // 256)
+    original = bytes(cartridge.save)
+    reader = CartridgeReader(quiet=True, dat_index=False)
+    reader.initialize_reader(device=FlakyWriter(cartridge))
+    store = SaveStore(str(tmp_path))
+    messages = []
+    monkeypatch.setattr(reader.printer, "print", messages.append)
+
+    profile = reader.calibrate(write=True, save=False, store=store)
+
+    assert bytes(cartridge.save) == original
+    assert store.restore(cartridge.epilogue_id) == original
+    # The damaged write made the first window candidate unstable
+    window = tuning.WRITE_WINDOW_CANDIDATES[0]
+    assert f"{window} packets in flight: unstable" in messages
+    assert profile["write_window"] != window
+    assert profile["write_sleep"] in tuning.WRITE_SLEEP_CANDIDATES
+    assert reader.transfer_profile == profile
+
+
+def test_cli_calibrates_writes(tmp_path, monkeypatch):
+    cartridge = VirtualCartridge.generate(mbc_type=0x1B, ram_type=0x02, seed=11)
+    simulated_device = SimulatedOperator(cartridge)
+    initialize_reader = CartridgeReader.initialize_reader
+
+    def simulated_reader(self, blocking=False, timeout=0, device=None):
+        initialize_reader(self, device=simulated_device)
+
+    monkeypatch.setattr(CartridgeReader, "initialize_reader", simulated_reader)
+    monkeypatch.setenv("XDG_CONFIG_HOME", str(tmp_path / "config"))
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "data"))
+    monkeypatch.setattr(sys, "argv", ["gbopyrator", "--quiet", "--calibrate-write"])
+
+    gbopyrator.main()
+    profile = tuning.load_profile(simulated_device)
+    assert profile["write_window"] in tuning.WRITE_WINDOW_CANDIDATES
+    assert profile["write_sleep"] in tuning.WRITE_SLEEP_CANDIDATES
+    assert SaveStore().restore(cartridge.epilogue_id) == bytes(cartridge.save)
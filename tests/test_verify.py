@@ -0,0 +1,19 @@
+import pytest
+
+from gbopyrator import codec
+from gbopyrator.cartridge_utils import CartridgeReader
+from gbopyrator.simulator import SimulatedOperator, VirtualCartridge
+
+
+@pytest.mark.parametrize(
+    "cgb_flag, verified", [(0x00, False), (0x80, None), (0xC0, None)]
+)
+def test_unknown_dump_verification(tmp_path, cgb_flag, verified):
+    rom = bytearray(VirtualCartridge.generate(rom_type=0x01, seed=5).rom)
+    rom[codec.CGB_FLAG_OFFSET] = cgb_flag
+    reader = CartridgeReader(quiet=True)
+    reader.initialize_reader(device=SimulatedOperator(VirtualCartridge(rom)))
+
+    digests = reader.dump_rom(str(tmp_path / "rom.gb"))
+    assert digests["verified"] is verified
+    assert digests["no_intro"] == []
@@ -0,0 +1,108 @@
+import os
+
+import usb.core
+
+from gbopyrator import coms_utils as cu
+from gbopyrator.cartridge_utils import CartridgeReader
+from gbopyrator.simulator import SimulatedOperator, VirtualCartridge
+from gbopyrator.watch import CartridgeWatcher
+
+
+class HalfInsertedCartridge(VirtualCartridge):
+    # The first info reads return a garbage MBC byte, as while the cartridge
+    # is still being pushed in
+    def __init__(self, rom, save=None, bad_reads=3):
+        super().__init__(rom, save)
+        self.bad_reads = bad_reads
+
+    def info_frame(self):
+        frame = bytearray(super().info_frame())
+        if self.bad_reads:
+            self.bad_reads -= 1
+            frame[14] = 0xEE
+        return bytes(frame)
+
+
+def test_watch_survives_corrupt_info_frame(tmp_path):
+    good = VirtualCartridge.generate(
+        title="WATCH", mbc_type=0x1B, rom_type=0x01, ram_type=0x02, seed=1
+    )
+    cartridge = HalfInsertedCartridge(good.rom, good.save)
+    reader = CartridgeReader(quiet=True, dat_index=False)
+    reader.initialize_reader(device=SimulatedOperator(cartridge))
+
+    events = []
+    watcher = CartridgeWatcher(
+        reader,
+        str(tmp_path),
+        interval=0,
+        callback=lambda event, epilogue_id: events.append(event),
+    )
+    stats = watcher.run(max_cartridges=1)
+
+    assert cartridge.bad_reads == 0
+    assert stats["archived"] == 1 and stats["failed"] == 0
+    assert events == ["inserted", "archived"]
+    rom_filename = os.path.join(
+        str(tmp_path), watcher.index[good.epilogue_id]["rom"]["filename"]
+    )
+    with open(rom_filename, "rb") as file:
+        assert file.read() == good.rom
+
+
+def _color_cartridge(cartridge):
+    rom = bytearray(cartridge.rom)
+    rom[0x143] = 0x80
+    header_checksum = 0
+    for byte in rom[0x134:0x14D]:
+        header_checksum = (header_checksum - byte - 1) & 0xFF
+    rom[0x14D] = header_checksum
+    global_checksum = (sum(rom) - rom[0x14E] - rom[0x14F]) & 0xFFFF
+    rom[0x14E:0x150] = global_checksum.to_bytes(2, "big")
+    return VirtualCartridge(bytes(rom), cartridge.save)
+
+
+def test_watch_names_gbc_dumps(tmp_path):
+    cartridge = _color_cartridge(
+        VirtualCartridge.generate(title="COLOR", mbc_type=0x19, rom_type=0x01, seed=2)
+    )
+    reader = CartridgeReader(quiet=True, dat_index=False)
+    reader.initialize_reader(device=SimulatedOperator(cartridge))
+
+    watcher = CartridgeWatcher(reader, str(tmp_path), interval=0)
+    watcher.run(max_cartridges=1)
+
+    rom_filename = watcher.index[cartridge.epilogue_id]["rom"]["filename"]
+    assert rom_filename.endswith(".gbc")
+    assert sorted(os.listdir(str(tmp_path))) == sorted(
+        [rom_filename, "archive_index.json"]
+    )
+    with open(os.path.join(str(tmp_path), rom_filename), "rb") as file:
+        assert file.read() == cartridge.rom
+
+
+def test_watch_survives_failed_drain(tmp_path, monkeypatch):
+    cartridge = VirtualCartridge.generate(title="DRAIN", seed=3)
+    reader = CartridgeReader(quiet=True, dat_index=False)
+    reader.initialize_reader(device=SimulatedOperator(cartridge))
+
+    def broken_dump(*args, **kwargs):
+        raise cu.TransferError("Interrupted dump")
+
+    def unplugged_drain(gbop_device, timeout=100):
+        raise usb.core.USBError("No such device")
+
+    monkeypatch.setattr(reader, "dump_rom", broken_dump)
+    monkeypatch.setattr(cu, "drain_bulk_in", unplugged_drain)
+
+    events = []
+    watcher = CartridgeWatcher(
+        reader,
+        str(tmp_path),
+        interval=0,
+        callback=lambda event, epilogue_id: events.append(event),
+    )
+    stats = watcher.run(max_cartridges=1)
+
+    assert stats["failed"] == 1
+    assert events == ["inserted", "failed"]